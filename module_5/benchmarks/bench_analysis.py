@@ -0,0 +1,76 @@
+"""
+bench_analysis.py - /analysis latency: eleven sequential queries vs. get_analysis()
+
+Loads --rows synthetic applicants (replacing the table), then times the
+question set three ways over --runs repetitions:
+  sequential, new connection per query   (the original get_cursor() behaviour)
+  sequential, pooled connections
+  concurrent get_analysis()              (QUERY_WORKERS threads, pooled)
+
+Usage (from module_5/, PG* / DB_* variables set):
+    python benchmarks/bench_analysis.py --rows 200000 --runs 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_normalize import synthetic_rows  # noqa: E402
+import db  # noqa: E402
+import load_data  # noqa: E402
+import query_data  # noqa: E402
+
+
+def _fresh_connections() -> None:
+    for query in query_data.QUERIES:
+        db.close_pools()
+        query()
+
+
+def _pooled_sequential() -> None:
+    for query in query_data.QUERIES:
+        query()
+
+
+def samples_ms(func, runs: int) -> list:
+    """Sorted wall times in ms of `runs` calls, after one warm-up call."""
+    func()  # warm-up (pool fill, caches)
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append(1000 * (time.perf_counter() - started))
+    return sorted(samples)
+
+
+def _time(label: str, func, runs: int) -> None:
+    samples = samples_ms(func, runs)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{label:<40} p50 {statistics.median(samples):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+def main() -> None:
+    """Load synthetic rows, then time the three strategies."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_data.load_rows(synthetic_rows(args.rows), reset=True)
+    print(f"{args.rows:,} rows, {len(query_data.QUERIES)} questions, "
+          f"QUERY_WORKERS={query_data.QUERY_WORKERS}")
+    _time("sequential, new connection per query", _fresh_connections, args.runs)
+    _time("sequential, pooled", _pooled_sequential, args.runs)
+    _time("concurrent get_analysis()", query_data.get_analysis, args.runs)
+
+
+if __name__ == "__main__":
+    main()
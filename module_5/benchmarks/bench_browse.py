@@ -0,0 +1,71 @@
+"""
+bench_browse.py - /api/applicants keyset pages vs. LIMIT/OFFSET at depth
+
+Fills applicants with --rows generated rows (bench_export.fill_table,
+generate_series), then times fetching one --page-rows page at several depths:
+  keyset   browse_data.get_page() after the key of the row just above the page
+  offset   the same SELECT with OFFSET <depth> instead of the keyset bound
+Keyset pages cost the same at any depth; OFFSET reads and discards every
+row above the page.
+
+Usage (from module_5/, PG* / DB_* variables set):
+    python benchmarks/bench_browse.py --rows 1000000 --runs 20
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from psycopg import sql  # noqa: E402
+from bench_analysis import samples_ms  # noqa: E402
+from bench_export import fill_table  # noqa: E402
+import browse_data  # noqa: E402
+from db import get_pooled_cursor  # noqa: E402
+from query_data import ALL_APPLICANTS  # noqa: E402
+
+FIELDS = ["p_id", "university", "program", "date_added", "status", "gpa"]
+
+
+def _cursor_at(depth: int) -> tuple:
+    """The keyset cursor of the row just above `depth` (what page depth/size would get)."""
+    query, params = browse_data.page_query(["p_id"], ALL_APPLICANTS, None)
+    with get_pooled_cursor() as cur:
+        cur.execute(query + sql.SQL(" OFFSET %s"), params + [1, depth - 1])
+        p_id, day = cur.fetchone()
+    return (day.isoformat() if day else browse_data.NO_DATE, p_id)
+
+
+def _offset_page(depth: int, page_rows: int) -> None:
+    query, params = browse_data.page_query(FIELDS, ALL_APPLICANTS, None)
+    with get_pooled_cursor() as cur:
+        cur.execute(query + sql.SQL(" OFFSET %s"), params + [page_rows, depth])
+        cur.fetchall()
+
+
+def main() -> None:
+    """Fill the table, then time one page per depth both ways."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--page-rows", type=int, default=browse_data.DEFAULT_PAGE_ROWS)
+    args = parser.parse_args()
+
+    fill_table(args.rows)
+    print(f"{args.rows:,} rows, {args.page_rows} per page; p50 ms over {args.runs} runs")
+    print(f"{'depth':>10} {'keyset':>9} {'offset':>9}")
+    for depth in (0, 10_000, 100_000, args.rows // 2, args.rows - args.page_rows):
+        after = _cursor_at(depth) if depth else None
+        keyset = statistics.median(samples_ms(
+            lambda after=after: browse_data.get_page(FIELDS, ALL_APPLICANTS, after,
+                                                     args.page_rows), args.runs))
+        offset = statistics.median(samples_ms(
+            lambda depth=depth: _offset_page(depth, args.page_rows), args.runs))
+        print(f"{depth:>10,} {keyset:9.2f} {offset:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+bench_columnar.py - q1-q11 from PostgreSQL vs. the NumPy column store
+
+Loads --rows synthetic applicants (replacing the table), builds the
+column store once, then times over --runs repetitions:
+  SQL get_analysis()       (concurrent, pooled; the default engine)
+  column store, all eleven questions
+  column store, per question
+The store's build time (one SELECT + encoding) is what each load pays.
+
+Usage (from module_5/, PG* / DB_* variables set):
+    python benchmarks/bench_columnar.py --rows 200000 --runs 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_analysis import samples_ms  # noqa: E402
+from bench_normalize import synthetic_rows  # noqa: E402
+import columnar  # noqa: E402
+import load_data  # noqa: E402
+import query_data  # noqa: E402
+
+
+def _p50(func, runs: int) -> float:
+    return statistics.median(samples_ms(func, runs))
+
+
+def main() -> None:
+    """Load synthetic rows, then time both engines."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_data.load_rows(synthetic_rows(args.rows), reset=True)
+    started = time.perf_counter()
+    store = columnar.build_store()
+    print(f"{args.rows:,} rows; column store built in "
+          f"{1000 * (time.perf_counter() - started):.0f} ms")
+
+    fetch = query_data.columnar_fetch(store)
+    sql_ms = _p50(query_data.get_analysis, max(1, args.runs // 10))
+    store_ms = _p50(lambda: [query(fetch) for query in query_data.QUERIES], args.runs)
+    print(f"{'SQL get_analysis()':<32} p50 {sql_ms:9.3f} ms")
+    print(f"{'column store, q1-q11':<32} p50 {store_ms:9.3f} ms")
+    for query in query_data.QUERIES:
+        per_query = _p50(lambda q=query: q(fetch), args.runs)
+        print(f"  {query.__name__:<30} p50 {per_query:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+bench_export.py - /export throughput and memory: server-side cursor vs. fetchall()
+
+Fills applicants with --rows generated rows (server-side, generate_series),
+then exports them to CSV in a fresh process per mode and reports rows/s,
+MB/s and the process's peak RSS:
+  stream     export_data.write_export (named cursor, --batch-rows per fetch)
+  fetchall   the naive cur.fetchall() + csv.writer (only up to --naive-max rows)
+
+Usage (from module_5/, PG* / DB_* variables set):
+    python benchmarks/bench_export.py --rows 5000000
+"""
+import argparse
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from psycopg import sql
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# pylint: disable=wrong-import-position
+import export_data  # noqa: E402
+from db import get_cursor  # noqa: E402
+from load_data import ensure_schema  # noqa: E402
+
+FILL_SQL = sql.SQL("""
+    INSERT INTO applicants (p_id, university, program, comments, date_added, url, status, term,
+        us_or_international, gpa, gre, gre_v, gre_aw, degree, llm_generated_program,
+        llm_generated_university, row_hash)
+    SELECT i, 'Johns Hopkins University', 'Computer Science', {comments}, DATE '2025-01-01' + i %% 365,
+        'https://www.thegradcafe.com/result/' || i, 'Accepted on ' || (i %% 28 + 1) || ' Feb',
+        'Fall 2026', 'International', 3.0 + (i %% 100) / 100.0, 300 + i %% 40, 150 + i %% 20,
+        CASE WHEN i %% 3 = 0 THEN NULL ELSE 4.5 END, 'Masters', 'Computer Science',
+        'Johns Hopkins University', md5(i::text)
+    FROM generate_series(1, %s) AS i
+""")
+
+
+def fill_table(rows: int, comments: str = "''") -> None:
+    """
+    Replaces applicants with `rows` generated rows (server-side) and analyzes
+    them; `comments` is the SQL expression for each row's comment (over i).
+    """
+    ensure_schema(reset=True)
+    with get_cursor() as cur:
+        cur.execute(FILL_SQL.format(comments=sql.SQL(comments)), (rows,))
+        cur.execute("ANALYZE applicants")
+
+
+def _naive(path: str) -> dict:
+    started = time.perf_counter()
+    with get_cursor() as cur:
+        cur.execute(export_data.export_query()[0])
+        rows = cur.fetchall()
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(export_data.EXPORT_COLUMNS)
+        writer.writerows(rows)
+    return {"rows": len(rows), "bytes": os.path.getsize(path),
+            "seconds": time.perf_counter() - started}
+
+
+def _measure(mode: str, path: str, batch_rows: int) -> None:
+    """Child process: one export, then one result line."""
+    if mode == "stream":
+        result = export_data.write_export(path, batch_rows=batch_rows)
+    else:
+        result = _naive(path)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<9} {result['rows']:>10,} rows  {result['seconds']:7.1f} s  "
+          f"{result['rows'] / result['seconds']:>10,.0f} rows/s  "
+          f"{result['bytes'] / 1e6 / result['seconds']:6.1f} MB/s  peak RSS {peak_mb:7.0f} MB")
+
+
+def main() -> None:
+    """Fill the table, then run each export mode in its own process."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--batch-rows", type=int, default=export_data.EXPORT_BATCH_ROWS)
+    parser.add_argument("--naive-max", type=int, default=1_000_000)
+    parser.add_argument("--measure", choices=("stream", "fetchall"), help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(args.measure, args.out, args.batch_rows)
+        return
+
+    started = time.perf_counter()
+    fill_table(args.rows)
+    print(f"Filled {args.rows:,} rows in {time.perf_counter() - started:.1f} s; "
+          f"batch_rows={args.batch_rows}")
+    modes = ["stream"] + (["fetchall"] if args.rows <= args.naive_max else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--out",
+                 os.path.join(tmp, f"{mode}.csv"), "--batch-rows", str(args.batch_rows)],
+                check=True,
+            )
+    if "fetchall" not in modes:
+        print(f"fetchall skipped above --naive-max={args.naive_max:,} rows "
+              "(it holds every row in memory)")
+
+
+if __name__ == "__main__":
+    main()
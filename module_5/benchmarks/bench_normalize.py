@@ -0,0 +1,81 @@
+"""
+bench_normalize.py - per-row normalize_row vs. column-wise normalize_rows
+
+Usage (from module_5/):
+    python benchmarks/bench_normalize.py --rows 1000000 --chunk 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# pylint: disable=wrong-import-position
+import load_data  # noqa: E402
+
+
+def synthetic_rows(n: int, seed: int = 0):
+    """Rows shaped like the scraper output; ~400 distinct dates, some blanks/bad values."""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    dates = []
+    for i in range(200):
+        day = start + timedelta(days=i)
+        dates += [day.strftime("%B %d, %Y"), day.strftime("%d %b %Y")]
+    gpas = ["3.50", "3.91", "4.0", "", "n/a", None]
+    rows = []
+    for i in range(n):
+        rows.append({
+            "overview_url": f"https://www.thegradcafe.com/result/{900000 + i}" if i % 50 else "",
+            "date_added": rng.choice(dates),
+            "university": "Johns Hopkins University",
+            "program": "Computer Science",
+            "comments": "",
+            "applicant_status": "Accepted",
+            "start_term": "Fall 2026",
+            "citizenship": "International",
+            "gpa": rng.choice(gpas),
+            "gre_general": rng.choice(["", "320", 331]),
+            "gre_verbal": rng.choice(["", "160"]),
+            "gre_aw": rng.choice(["", "4.5", None]),
+            "degree_level": "Masters",
+            "llm-generated-program": "Computer Science",
+            "llm-generated-university": "Johns Hopkins University",
+        })
+    return rows
+
+
+def main() -> None:
+    """Time both normalizers over the same rows and check they agree."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+
+    load_data._parse_date.cache_clear()  # pylint: disable=protected-access
+    started = time.perf_counter()
+    per_row = [r for r in map(load_data.normalize_row, rows) if r["p_id"] is not None]
+    per_row_s = time.perf_counter() - started
+
+    load_data._parse_date.cache_clear()  # pylint: disable=protected-access
+    started = time.perf_counter()
+    chunks = [load_data.normalize_rows(rows[i : i + args.chunk])
+              for i in range(0, len(rows), args.chunk)]
+    batch_s = time.perf_counter() - started
+
+    batch_ids = [p_id for columns in chunks for p_id in columns["p_id"]]
+    assert batch_ids == [r["p_id"] for r in per_row]
+
+    print(f"{args.rows:,} rows ({len(per_row):,} with an ID), chunks of {args.chunk:,}")
+    print(f"normalize_row  (per row)   {per_row_s:7.2f} s  {args.rows / per_row_s:12,.0f} rows/s")
+    print(f"normalize_rows (columnar)  {batch_s:7.2f} s  {args.rows / batch_s:12,.0f} rows/s"
+          f"  ({per_row_s / batch_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+bench_parallel_load.py - load_rows scaling from 1 to 8 workers (needs PostgreSQL)
+
+Each run starts from an empty applicants table and times the two halves of
+a parallel load separately: normalization (process pool) and the
+partitioned COPY + merge (parallel_upsert) or shadow swap (--reset).
+
+Usage (from module_5/, PG* / DB_* variables set; the table is replaced):
+    python benchmarks/bench_parallel_load.py --rows 500000 --workers 1 2 4 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_normalize import synthetic_rows  # noqa: E402
+import load_data  # noqa: E402
+
+
+def main() -> None:
+    """Time normalize + load for each worker count over the same rows."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--reset", action="store_true", help="Time shadow_load instead.")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    mode = "shadow_load" if args.reset else "parallel_upsert"
+    print(f"{args.rows:,} rows, {mode}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'normalize s':>12} {'load s':>8} {'total s':>8} "
+          f"{'rows/s':>10} {'speedup':>8}")
+
+    baseline = None
+    for workers in args.workers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_data.ensure_schema(reset=True)
+        load_data._parse_date.cache_clear()  # pylint: disable=protected-access
+
+        started = time.perf_counter()
+        if workers > 1:
+            columns = load_data.normalize_rows_parallel(rows, workers)
+        else:
+            columns = load_data.normalize_rows(rows)
+        normalized = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.reset:
+                load_data.shadow_load(columns, workers)
+            else:
+                load_data.parallel_upsert(columns, workers)
+        done = time.perf_counter()
+
+        total = done - started
+        baseline = baseline or total
+        print(f"{workers:>7} {normalized - started:>12.2f} {done - normalized:>8.2f} "
+              f"{total:>8.2f} {args.rows / total:>10,.0f} {baseline / total:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+bench_pipeline.py - Pull Data: sequential stages vs. the streaming pipeline
+
+Stands in for the network-bound stages with fixed per-batch delays (no
+GradCafe or LLM needed) and loads --rows synthetic rows into PostgreSQL
+for real, in pages of --page-rows:
+  sequential  fetch every page, then clean every batch, then load_rows(reset=True)
+              (what scrape.py, clean.py and load_data.py did one after another)
+  streaming   pipeline.run_pipeline() into StreamingLoad(reset=True)
+and reports wall time next to each stage's own (busy) time.
+
+Usage (from module_5/, PG* / DB_* variables set):
+    python benchmarks/bench_pipeline.py --rows 20000 --page-ms 5 --clean-ms 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_normalize import synthetic_rows  # noqa: E402
+from events import EventBus, PipelineProgress  # noqa: E402
+from load_data import StreamingLoad, load_rows  # noqa: E402
+import pipeline  # noqa: E402
+
+
+def _pages(rows: list, page_rows: int, delay_s: float):
+    for start in range(0, len(rows), page_rows):
+        time.sleep(delay_s)  # one page download
+        yield [dict(row) for row in rows[start:start + page_rows]]
+
+
+def _cleaner(delay_s: float):
+    def clean(batches):
+        for batch in batches:
+            time.sleep(delay_s)  # one standardizer call
+            yield batch
+    return clean
+
+
+def _sequential(rows: list, args) -> dict:
+    timings = {}
+    started = time.perf_counter()
+    pages = list(_pages(rows, args.page_rows, args.page_ms / 1000))
+    timings["scrape"] = time.perf_counter() - started
+    mark = time.perf_counter()
+    cleaned = [row for batch in _cleaner(args.clean_ms / 1000)(pages) for row in batch]
+    timings["clean"] = time.perf_counter() - mark
+    mark = time.perf_counter()
+    load_rows(cleaned, reset=True)
+    timings["load"] = time.perf_counter() - mark
+    return {"seconds": time.perf_counter() - started, "busy_s": timings}
+
+
+def _streaming(rows: list, args) -> dict:
+    return pipeline.run_pipeline(
+        _pages(rows, args.page_rows, args.page_ms / 1000), _cleaner(args.clean_ms / 1000),
+        StreamingLoad(reset=True), PipelineProgress(EventBus()),
+        load_batch_rows=args.load_batch_rows,
+    )
+
+
+def main() -> None:
+    """Run both modes on the same rows and print wall vs. per-stage time."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--page-rows", type=int, default=20)
+    parser.add_argument("--page-ms", type=float, default=5.0)
+    parser.add_argument("--clean-ms", type=float, default=5.0)
+    parser.add_argument("--load-batch-rows", type=int, default=pipeline.LOAD_BATCH_ROWS)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    print(f"{args.rows:,} rows, {args.page_rows} per page, {args.page_ms} ms/page, "
+          f"{args.clean_ms} ms/clean batch, {args.load_batch_rows} rows per load write")
+    for name, run in (("sequential", _sequential), ("streaming", _streaming)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run(rows, args)
+        busy = result["busy_s"]
+        print(f"{name:<11} wall {result['seconds']:6.2f} s   scrape {busy['scrape']:5.2f} s  "
+              f"clean {busy['clean']:5.2f} s  load {busy['load']:5.2f} s  "
+              f"(sum {sum(busy.values()):5.2f} s, slowest {max(busy.values()):5.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+bench_query_prep.py - per-request cost of the eleven questions: compose/plan every
+time vs. statements composed at import + server-side prepared statements
+
+Reports, per /analysis request (all eleven questions, run sequentially on one
+pooled connection so the numbers are not mixed with thread scheduling):
+  Python CPU   time.thread_time() spent in the request
+  wall         end-to-end latency
+  planning     Postgres "Planning Time" summed over the eleven statements
+               (EXPLAIN (SUMMARY) unprepared vs. EXPLAIN EXECUTE prepared)
+
+Usage (from module_5/, PG* / DB_* variables set; the table is replaced):
+    python benchmarks/bench_query_prep.py --rows 100000 --runs 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import statistics
+import sys
+import time
+
+from psycopg import sql
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position,protected-access
+from bench_normalize import synthetic_rows  # noqa: E402
+import db  # noqa: E402
+import load_data  # noqa: E402
+import query_data  # noqa: E402
+
+PLANNING_RE = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def record_calls():
+    """(Statement, params) for every question, captured from one real request."""
+    calls = []
+    real_fetch = query_data._fetch
+
+    def recording_fetch(stmt, params=(), cohort=query_data.ALL_APPLICANTS):
+        calls.append((stmt, tuple(params)))
+        return real_fetch(stmt, params, cohort)
+
+    query_data._fetch = recording_fetch
+    try:
+        for query in query_data.QUERIES:
+            query()
+    finally:
+        query_data._fetch = real_fetch
+    return calls
+
+
+def per_request_old(cur, calls):
+    """The original path: execute the Composed (rendered per call), re-plan, re-render display."""
+    for stmt, params in calls:
+        cur.execute(stmt.composed, params, prepare=False)
+        cur.fetchall()
+        stmt.composed.as_string(cur)
+
+
+def per_request_new(cur, calls):
+    """The _fetch path: cached text, prepared on this connection."""
+    for stmt, params in calls:
+        cur.execute(stmt.text, params, prepare=True)
+        cur.fetchall()
+
+
+def time_requests(label, func, cur, calls, runs):
+    """Median thread CPU and wall time per request."""
+    func(cur, calls)  # warm-up (prepares on the first pass)
+    cpu, wall = [], []
+    for _ in range(runs):
+        cpu_start, wall_start = time.thread_time(), time.perf_counter()
+        func(cur, calls)
+        cpu.append(1000 * (time.thread_time() - cpu_start))
+        wall.append(1000 * (time.perf_counter() - wall_start))
+    print(f"{label:<34} CPU {statistics.median(cpu):7.2f} ms   "
+          f"wall {statistics.median(wall):8.2f} ms")
+
+
+def planning_ms(cur, calls):
+    """Summed planning time: unprepared EXPLAIN vs. EXPLAIN EXECUTE of a prepared statement."""
+    unprepared = prepared = 0.0
+    for i, (stmt, params) in enumerate(calls):
+        cur.execute("EXPLAIN (SUMMARY) " + stmt.text, params)
+        unprepared += float(PLANNING_RE.search(" ".join(r[0] for r in cur.fetchall())).group(1))
+
+        pieces = stmt.text.split("%s")
+        positional = pieces[0] + "".join(f"${n}{piece}" for n, piece in enumerate(pieces[1:], 1))
+        cur.execute(f"PREPARE bench_q{i} AS {positional}")
+        execute = sql.SQL("EXECUTE {}").format(sql.Identifier(f"bench_q{i}"))
+        if params:
+            execute += sql.SQL("({})").format(sql.SQL(", ").join(map(sql.Literal, params)))
+        for _ in range(6):  # past the custom-plan phase, as on a long-lived pooled connection
+            cur.execute(execute)
+        cur.execute(sql.SQL("EXPLAIN (SUMMARY) ") + execute)
+        prepared += float(PLANNING_RE.search(" ".join(r[0] for r in cur.fetchall())).group(1))
+        cur.execute(f"DEALLOCATE bench_q{i}")
+    return unprepared, prepared
+
+
+def main() -> None:
+    """Load synthetic rows, then compare both paths."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_data.load_rows(synthetic_rows(args.rows), reset=True)
+    calls = record_calls()
+    print(f"{args.rows:,} rows, {len(calls)} statements per request, {args.runs} runs")
+
+    with db.get_pooled_cursor() as cur:
+        time_requests("compose + plan per request", per_request_old, cur, calls, args.runs)
+        time_requests("import-time SQL + prepared", per_request_new, cur, calls, args.runs)
+        unprepared, prepared = planning_ms(cur, calls)
+    print(f"Postgres planning per request: {unprepared:.2f} ms unprepared, "
+          f"{prepared:.2f} ms prepared")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+bench_search.py - /api/search: GIN index vs. sequential scan vs. ILIKE
+
+Fills applicants with --rows generated rows whose comments are twelve
+words drawn from a small vocabulary ("fellowship" only in every 10,000th
+row), so one term is rare and one is common. Then times, per term, over
+--runs repetitions on one connection:
+  gin       search_data's ranked query as the planner runs it (GIN index)
+  seqscan   the same query with index scans disabled (stored tsvector checked row by row)
+  ilike     SELECT ... WHERE comments ILIKE '%term%' LIMIT n (what search replaced;
+            unranked, so it stops at the first n hits)
+
+Usage (from module_5/, PG* / DB_* variables set):
+    python benchmarks/bench_search.py --rows 1000000 --runs 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_analysis import samples_ms  # noqa: E402
+from bench_export import fill_table  # noqa: E402
+from db import get_conn  # noqa: E402
+import search_data  # noqa: E402
+
+WORDS = (
+    "interview", "funding", "stipend", "advisor", "waitlist", "rejected", "admitted",
+    "visit", "email", "phone", "professor", "lab", "research", "teaching", "assistant",
+    "deadline", "portal", "decision", "offer", "scholarship", "tuition", "waiver", "gre",
+    "gpa", "recommendation", "letter", "statement", "purpose", "zoom", "campus", "housing",
+    "cohort", "rotation", "department", "committee", "notification", "update", "status",
+    "pending", "accepted", "declined", "happy", "nervous", "finally", "surprised",
+    "excited", "program", "masters", "phd", "international",
+)
+# Twelve words per row from i (so the fill is deterministic), plus a rare term
+COMMENTS_SQL = (
+    "array_to_string(ARRAY(SELECT (ARRAY['" + "','".join(WORDS) + "'])"
+    f"[1 + (hashint4(i * 16 + k) & 2147483647) %% {len(WORDS)}] "
+    "FROM generate_series(1, 12) AS k), ' ') "
+    "|| CASE WHEN i %% 10000 = 0 THEN ' fellowship' ELSE '' END"
+)
+ILIKE_SQL = "SELECT p_id, comments FROM applicants WHERE comments ILIKE %s LIMIT %s"
+
+
+def main() -> None:
+    """Fill the table, then time each term three ways."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=search_data.DEFAULT_SEARCH_ROWS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    fill_table(args.rows, COMMENTS_SQL)
+    print(f"Filled {args.rows:,} rows (tsvector + GIN) in {time.perf_counter() - started:.1f} s")
+
+    query = search_data.search_query(search_data.ALL_APPLICANTS)
+    with get_conn() as conn:
+        conn.autocommit = True
+        cur = conn.cursor()
+        print(f"{'term':<12} {'matches':>9} {'gin ms':>9} {'seqscan ms':>11} {'ilike ms':>9}")
+        for term in ("fellowship", "interview"):
+            params = search_data.search_params(term, search_data.ALL_APPLICANTS, args.limit)
+            cur.execute("SELECT count(*) FROM applicants "
+                        "WHERE comments_tsv @@ websearch_to_tsquery('english', %s)", (term,))
+            matches = cur.fetchone()[0]
+            p50 = {}
+            for mode in ("gin", "seqscan"):
+                setting = "off" if mode == "seqscan" else "on"
+                cur.execute(f"SET enable_bitmapscan = {setting}")
+                cur.execute(f"SET enable_indexscan = {setting}")
+                p50[mode] = statistics.median(samples_ms(
+                    lambda params=params: cur.execute(query, params).fetchall(), args.runs))
+            p50["ilike"] = statistics.median(samples_ms(
+                lambda term=term: cur.execute(ILIKE_SQL, (f"%{term}%", args.limit)).fetchall(),
+                args.runs))
+            print(f"{term:<12} {matches:>9,} {p50['gin']:>9.1f} {p50['seqscan']:>11.1f} "
+                  f"{p50['ilike']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
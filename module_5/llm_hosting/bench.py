@@ -0,0 +1,388 @@
+"""
+bench.py - offline end-to-end throughput benchmark for the standardizer.
+
+Runs the Flask app, the CLI and DataCleaner against the deterministic stub
+model (LLM_BACKEND=stub), so nothing is downloaded. Input is sample_data.json
+plus synthetic program strings built from the canonical lists.
+
+Usage (from llm_hosting/, like app.py):
+    python bench.py --rows 2000 --distinct 0.3 --token-ms 5 --clients 4
+    python bench.py --fuzzy --rows 3600
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import difflib
+import io
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+SCENARIOS = ("api", "api-warm", "stream", "cli", "cleaner", "cleaner-stream")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline standardizer benchmark (stub model).")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per scenario.")
+    parser.add_argument(
+        "--distinct", type=float, default=0.25,
+        help="Fraction of rows with a distinct program string (the rest repeat).",
+    )
+    parser.add_argument("--batch", type=int, default=50, help="Rows per HTTP request.")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent HTTP clients.")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Stub latency per generated token.")
+    parser.add_argument(
+        "--prompt-token-ms", type=float, default=0.5, help="Stub latency per evaluated prompt token."
+    )
+    parser.add_argument(
+        "--no-fast-path", action="store_true", help="Send every cache miss to the model."
+    )
+    parser.add_argument("--workers", type=int, default=0, help="MODEL_WORKERS for the server/CLI.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--startup", action="store_true",
+        help="Measure import time and time-to-first-response of `app.py --serve` instead.",
+    )
+    parser.add_argument(
+        "--fuzzy", action="store_true",
+        help="Time FuzzyIndex against a full difflib scan on --rows unique typo strings instead.",
+    )
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS),
+        help=f"Comma-separated subset of {', '.join(SCENARIOS)}.",
+    )
+    return parser.parse_args()
+
+
+ARGS = _parse_args()
+# The backend is chosen at import time and inherited by worker processes
+os.environ["LLM_BACKEND"] = "stub"
+os.environ["STUB_TOKEN_MS"] = str(ARGS.token_ms)
+os.environ["STUB_PROMPT_TOKEN_MS"] = str(ARGS.prompt_token_ms)
+os.environ["MODEL_WORKERS"] = str(ARGS.workers)
+if ARGS.no_fast_path:
+    os.environ["FAST_PATH_THRESHOLD"] = "2"
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(_HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(_HERE), "src"))
+
+# pylint: disable=wrong-import-position
+from werkzeug.serving import make_server  # noqa: E402
+
+from llm_hosting import app as llm_app  # noqa: E402
+from clean import DataCleaner  # noqa: E402
+
+
+def _synthetic_rows(n: int, distinct: float, seed: int) -> List[Dict[str, Any]]:
+    """sample_data.json rows plus canonical pairs with abbreviations, typos and case noise."""
+    rng = random.Random(seed)
+    with open(os.path.join(_HERE, "sample_data.json"), "r", encoding="utf-8") as f:
+        programs = [row["program"] for row in json.load(f)]
+    progs = sorted(llm_app.PROG_INDEX.members)
+    unis = sorted(llm_app.UNI_INDEX.members) + ["McG", "UBC", "UofT"]
+
+    def noisy(text: str) -> str:
+        roll = rng.random()
+        if roll < 0.15 and len(text) > 6:  # dropped character
+            i = rng.randrange(1, len(text) - 1)
+            return text[:i] + text[i + 1:]
+        if roll < 0.25:
+            return text.lower()
+        return text
+
+    while len(programs) < max(1, int(n * distinct)):
+        sep = rng.choice([", ", ", ", " at ", " @ "])
+        programs.append(noisy(rng.choice(progs)) + sep + noisy(rng.choice(unis)))
+    return [
+        {"program": rng.choice(programs), "overview_url": f"synthetic/{i}"}
+        for i in range(n)
+    ]
+
+
+def _percentile(values: List[float], q: float) -> str:
+    """Nearest-rank percentile in ms, formatted; "-" when the scenario has no samples."""
+    if not values:
+        return "-"
+    ordered = sorted(values)
+    return f"{ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]:.1f}"
+
+
+def _post(url: str, body: bytes, content_type: str) -> Any:
+    req = urllib.request.Request(
+        url, data=body, headers={"Content-Type": content_type}, method="POST"
+    )
+    return urllib.request.urlopen(req, timeout=600)  # pylint: disable=consider-using-with
+
+
+def _api(base: str, rows: List[Dict[str, Any]]) -> List[float]:
+    """Concurrent /standardize requests; per-request latency."""
+    batches = [rows[i : i + ARGS.batch] for i in range(0, len(rows), ARGS.batch)]
+
+    def one(batch: List[Dict[str, Any]]) -> float:
+        started = time.perf_counter()
+        with _post(base + "/standardize", json.dumps({"rows": batch}).encode(), "application/json") as resp:
+            assert len(json.loads(resp.read())["rows"]) == len(batch)
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(ARGS.clients) as pool:
+        return list(pool.map(one, batches))
+
+
+def _stream(base: str, rows: List[Dict[str, Any]]) -> List[float]:
+    """Concurrent /standardize/stream requests; per-row time until its line arrived."""
+    batches = [rows[i : i + ARGS.batch] for i in range(0, len(rows), ARGS.batch)]
+
+    def one(batch: List[Dict[str, Any]]) -> List[float]:
+        body = "".join(json.dumps(row) + "\n" for row in batch).encode()
+        started = time.perf_counter()
+        with _post(base + "/standardize/stream", body, "application/x-ndjson") as resp:
+            return [(time.perf_counter() - started) * 1000 for line in resp if line.strip()]
+
+    with ThreadPoolExecutor(ARGS.clients) as pool:
+        return [ms for batch_ms in pool.map(one, batches) for ms in batch_ms]
+
+
+def _cli(_: str, rows: List[Dict[str, Any]]) -> List[float]:
+    """_cli_process_file over a JSON file (paths must sit under the cwd)."""
+    workdir = tempfile.mkdtemp(dir=os.getcwd())
+    try:
+        in_path = os.path.join(os.path.relpath(workdir), "in.json")
+        with open(in_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        with contextlib.redirect_stderr(io.StringIO()):
+            llm_app._cli_process_file(in_path, in_path + "l", False, False, workers=ARGS.workers)
+    finally:
+        shutil.rmtree(workdir)
+    return []
+
+
+def _cleaner(base: str, rows: List[Dict[str, Any]], stream: bool = False) -> List[float]:
+    """DataCleaner against the live server; per-call latency in batch mode."""
+    workdir = tempfile.mkdtemp()
+    latencies: List[float] = []
+    try:
+        in_path = os.path.join(workdir, "in.json")
+        with open(in_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        cleaner = DataCleaner(
+            in_path, os.path.join(workdir, "out.json"),
+            api_url=base + "/standardize", batch_size=ARGS.batch, stream=stream,
+        )
+        post_json = cleaner._post_json
+
+        def timed(payload: dict) -> Any:
+            started = time.perf_counter()
+            try:
+                return post_json(payload)
+            finally:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        cleaner._post_json = timed
+        with contextlib.redirect_stdout(io.StringIO()):
+            cleaner.clean_data()
+    finally:
+        shutil.rmtree(workdir)
+    return latencies[1:]  # drop the health-check call
+
+
+RUNNERS: Dict[str, Callable[[str, List[Dict[str, Any]]], List[float]]] = {
+    "api": _api,
+    "api-warm": _api,
+    "stream": _stream,
+    "cli": _cli,
+    "cleaner": _cleaner,
+    "cleaner-stream": lambda base, rows: _cleaner(base, rows, stream=True),
+}
+
+
+def _run(name: str, base: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run one scenario; a cold result cache unless it is the warm repeat."""
+    if name != "api-warm":
+        llm_app.RESULT_CACHE = llm_app.ResultCache(path="")
+    paths_before = llm_app._path_stats()
+    cache_before = llm_app.RESULT_CACHE.stats()
+
+    started = time.perf_counter()
+    latencies = RUNNERS[name](base, rows)
+    seconds = time.perf_counter() - started
+
+    paths = llm_app._path_stats()
+    cache = llm_app.RESULT_CACHE.stats()
+    hits = cache["hits"] - cache_before["hits"]
+    lookups = hits + cache["misses"] - cache_before["misses"]
+    fast = paths["fast_path"]["count"] - paths_before["fast_path"]["count"]
+    llm = paths["llm"]["count"] - paths_before["llm"]["count"]
+    return {
+        "scenario": name,
+        "rows": len(rows),
+        "seconds": seconds,
+        "rows_per_s": len(rows) / seconds if seconds else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+        "hit_pct": 100 * hits / lookups if lookups else 0.0,
+        "deduped": len(rows) - lookups,
+        "fast_path": fast,
+        "llm": llm,
+    }
+
+
+def _import_seconds(statement: str) -> float:
+    """Best of three fresh-interpreter timings of one import statement."""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    runs = [
+        float(subprocess.run(
+            [sys.executable, "-c", code], cwd=_HERE, check=True, capture_output=True, text=True
+        ).stdout)
+        for _ in range(3)
+    ]
+    return min(runs)
+
+
+def _wait_for(url: str, deadline: float, body: bytes | None = None) -> float:
+    """Poll url until it answers 200; return the time it first did."""
+    while time.perf_counter() < deadline:
+        try:
+            if body is None:
+                urllib.request.urlopen(url, timeout=5).close()  # pylint: disable=consider-using-with
+            else:
+                _post(url, body, "application/json").close()
+            return time.perf_counter()
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def _startup() -> None:
+    """Import cost of app.py and how soon a fresh `--serve` process is live, ready and answering."""
+    print(f"import llm_hosting app          {_import_seconds('import app') * 1000:8.1f} ms")
+    try:
+        heavy = _import_seconds("import llama_cpp, huggingface_hub")
+        print(f"import llama_cpp + hf_hub       {heavy * 1000:8.1f} ms  (deferred to first model load)")
+    except subprocess.CalledProcessError:
+        print("import llama_cpp + hf_hub       not installed")
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "PORT": str(port)}
+    started = time.perf_counter()
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "app.py", "--serve"], cwd=_HERE, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + 900
+        live = _wait_for(base + "/", deadline)
+        first = _wait_for(
+            base + "/standardize", deadline,
+            json.dumps({"rows": [{"program": "Mathematics, UBC"}]}).encode(),
+        )
+        ready = _wait_for(base + "/ready", deadline)
+        escalated = _wait_for(
+            base + "/standardize", deadline,
+            json.dumps({"rows": [{"program": "Infomation, McG"}]}).encode(),
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"live (GET /)                    {(live - started) * 1000:8.1f} ms after launch")
+    print(f"first fast-path response        {(first - started) * 1000:8.1f} ms after launch")
+    print(f"ready (GET /ready)              {(ready - started) * 1000:8.1f} ms after launch")
+    print(f"first model response after ready{(escalated - ready) * 1000:8.1f} ms")
+
+
+def _typos(names: List[str], count: int, rng: random.Random) -> List[str]:
+    """Unique strings one to three random edits away from entries of names."""
+    alphabet = "abcdefghijklmnopqrstuvwxyz "
+    queries: set = set()
+    while len(queries) < count:
+        chars = list(rng.choice(names))
+        for _ in range(rng.randint(1, 3)):
+            i, roll = rng.randrange(len(chars)), rng.random()
+            if roll < 0.3 and len(chars) > 2:
+                del chars[i]
+            elif roll < 0.6:
+                chars.insert(i, rng.choice(alphabet))
+            elif roll < 0.8:
+                chars[i] = rng.choice(alphabet)
+            elif i + 1 < len(chars):
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        queries.add("".join(chars))
+    return sorted(queries)
+
+
+def _fuzzy() -> None:
+    """Per-lookup time of FuzzyIndex (memo off) vs. difflib.get_close_matches, and disagreements."""
+    rng = random.Random(ARGS.seed)
+    for label, choices, cutoff in (
+        ("universities", llm_app.CANON_UNIS, 0.86),
+        ("programs", llm_app.CANON_PROGS, 0.84),
+    ):
+        queries = _typos(choices, ARGS.rows, rng)
+        index = llm_app.FuzzyIndex(choices, memo_size=0)
+        started = time.perf_counter()
+        expected = [difflib.get_close_matches(q, choices, n=1, cutoff=cutoff) for q in queries]
+        scan_s = time.perf_counter() - started
+        started = time.perf_counter()
+        found = [index.best(q, cutoff)[0] for q in queries]
+        index_s = time.perf_counter() - started
+        differ = sum((e[0] if e else None) != f for e, f in zip(expected, found))
+        print(
+            f"{label:<13} {len(queries)} unique | difflib {scan_s / len(queries) * 1e6:7.0f} us"
+            f" | index {index_s / len(queries) * 1e6:6.0f} us | {scan_s / index_s:5.1f}x"
+            f" | {differ} differ"
+        )
+
+
+def main() -> None:
+    """Start the server on an ephemeral port and run each selected scenario."""
+    if ARGS.startup:
+        _startup()
+        return
+    if ARGS.fuzzy:
+        _fuzzy()
+        return
+    rows = _synthetic_rows(ARGS.rows, ARGS.distinct, ARGS.seed)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server("127.0.0.1", 0, llm_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    print(
+        f"{ARGS.rows} rows, {ARGS.distinct:.0%} distinct, stub {ARGS.token_ms}ms/token, "
+        f"{ARGS.clients} clients x {ARGS.batch} rows, {ARGS.workers} workers"
+    )
+    header = f"{'scenario':<15}{'rows/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'cache hit':>11}{'deduped':>9}{'fast':>7}{'llm':>7}"
+    print(header)
+    print("-" * len(header))
+    try:
+        for name in [s.strip() for s in ARGS.scenarios.split(",") if s.strip()]:
+            r = _run(name, base, [dict(row) for row in rows])
+            print(
+                f"{r['scenario']:<15}{r['rows_per_s']:>10.1f}{r['p50_ms']:>10}{r['p99_ms']:>10}"
+                f"{r['hit_pct']:>10.1f}%{r['deduped']:>9}{r['fast_path']:>7}{r['llm']:>7}"
+            )
+    finally:
+        server.shutdown()
+        pool = llm_app._POOL
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,21 @@ app.py — Module 3 Flask App (Factory Pattern)
 """
 from __future__ import annotations
 
+import itertools
 import os
-import subprocess
 import threading
 
-from flask import Flask, jsonify, render_template, request, Blueprint
+from flask import Flask, Response, jsonify, render_template, request, Blueprint
 
 # Import specific logic
+import metrics
+from events import BUS, PipelineProgress, stream
+from browse_data import DEFAULT_PAGE_ROWS, decode_cursor, get_page, parse_fields
+from export_data import EXTENSIONS, FORMATS, MIMETYPES, export_available, stream_export
 from load_data import load_json_to_db
-from query_data import get_analysis
+from pipeline import run_pull_pipeline
+from query_data import COHORT_VALUE_MAX_LEN, Cohort, get_analysis, get_cohort_analysis
+from search_data import DEFAULT_SEARCH_ROWS, SEARCH_QUERY_MAX_LEN, search
 
 # Create a Blueprint to hold routes
 bp = Blueprint('main', __name__)
@@ -28,41 +34,38 @@ STATE = {
 # -------------------------------------------------------------------
 # Helper: Background Job
 # -------------------------------------------------------------------
-def _run_pull_job(reset_table: bool):
+def _report(progress: PipelineProgress, stage: str, message: str) -> None:
+    """Sets the /status text and publishes the stage change to /events."""
+    STATE["last_status"] = message
+    progress.start_stage(stage, message)
+
+def _run_pull_job(reset_table: bool, progress: PipelineProgress | None = None):
     """
-    Executes the Scrape-Clean-Load pipeline in a background thread.
+    Runs the streaming Scrape-Clean-Load pipeline (pipeline.py) in a
+    background thread, publishing its progress to /events. If nothing
+    could be scraped, the JSON data file is loaded instead.
     """
+    progress = progress or PipelineProgress(BUS)
+    ok = False
     try:
-        # STEP 1: SCRAPE
-        scrape_script = "scrape.py"
-        if os.path.exists(scrape_script):
-            STATE["last_status"] = "Step 1/3: Scraping new data..."
-            subprocess.run(["python", scrape_script], check=True)
-        else:
-            STATE["last_status"] = "Warning: scrape.py not found. Skipping scrape."
-
-        # STEP 2: CLEAN
-        clean_script = "clean.py"
-        if os.path.exists(clean_script):
-            STATE["last_status"] = "Step 2/3: Cleaning data with LLM..."
-            subprocess.run(["python", clean_script], check=True)
-        else:
-            STATE["last_status"] = "Warning: clean.py not found. Skipping clean."
-
-        # STEP 3: LOAD
-        STATE["last_status"] = "Step 3/3: Loading data into PostgreSQL..."
-        json_path = "llm_extend_applicant_data.json"
-        if not os.path.exists(json_path):
-            json_path = "llm_extend_applicant_data_liv.json"
-
-        if os.path.exists(json_path):
-            count = load_json_to_db(json_path, reset=reset_table)
+        _report(progress, "pipeline", "Scraping, cleaning and loading (streaming)...")
+        count = run_pull_pipeline(reset_table, progress)["loaded"]
+
+        if not count:
+            json_path = "llm_extend_applicant_data.json"
+            if not os.path.exists(json_path):
+                json_path = "llm_extend_applicant_data_liv.json"
+            if os.path.exists(json_path):
+                _report(progress, "load", f"Nothing scraped; loading {json_path}...")
+                count = load_json_to_db(json_path, reset=reset_table)
+                progress.update(count, count, force=True, rows_loaded=count)
+
+        if count:
             STATE["last_status"] = f"Success! Pipeline complete. Loaded {count} records."
+            ok = True
         else:
             STATE["last_status"] = "Error: No JSON data file found."
 
-    except subprocess.CalledProcessError as err:
-        STATE["last_status"] = f"Subprocess Error: {err}"
     except IOError as err:
         STATE["last_status"] = f"File Error: {err}"
     except Exception as err:  # pylint: disable=broad-exception-caught
@@ -70,6 +73,8 @@ def _run_pull_job(reset_table: bool):
     finally:
         with STATE["lock"]:
             STATE["is_pulling"] = False
+        # After the flag clears, so a client reacting to it can pull again
+        progress.finish(STATE["last_status"], ok)
 
 # -------------------------------------------------------------------
 # Routes
@@ -96,8 +101,11 @@ def pull_data():
 
         STATE["is_pulling"] = True
         STATE["last_status"] = "Starting..."
+        # Published before the response, so /events opened next never replays the last run
+        progress = PipelineProgress(BUS)
+        progress.start_stage("start", STATE["last_status"])
         reset = request.args.get("reset", "1") == "1"
-        thread = threading.Thread(target=_run_pull_job, args=(reset,), daemon=True)
+        thread = threading.Thread(target=_run_pull_job, args=(reset, progress), daemon=True)
         thread.start()
 
     return jsonify({"ok": True, "msg": "Pull started"})
@@ -110,6 +118,102 @@ def update_analysis():
     data = get_analysis()
     return jsonify({"ok": True, "data": data, "status": STATE["last_status"]})
 
+def _cohort_arg():
+    """The Cohort in ?term=&university=&degree=, or None if a value is too long."""
+    values = {field: request.args.get(field, "").strip() or None for field in Cohort._fields}
+    if any(value and len(value) > COHORT_VALUE_MAX_LEN for value in values.values()):
+        return None
+    return Cohort(**values)
+
+@bp.route("/api/analysis")
+def api_analysis():
+    """
+    The question set for one cohort as JSON, e.g.
+    /api/analysis?term=Spring 2026&university=Stanford University&degree=PhD
+    (university is matched against the LLM-standardized name).
+    """
+    cohort = _cohort_arg()
+    if cohort is None:
+        return jsonify({"ok": False, "msg": "Filter value too long"}), 400
+    return jsonify({"ok": True, "cohort": cohort._asdict(), "data": get_cohort_analysis(cohort)})
+
+@bp.route("/api/applicants")
+def api_applicants():
+    """
+    Applicants newest first, one page at a time: ?limit= (max 500), ?fields=
+    (comma-separated columns), the /api/analysis cohort filters, and
+    ?after=<next token from the previous page>.
+    """
+    cohort = _cohort_arg()
+    if cohort is None:
+        return jsonify({"ok": False, "msg": "Filter value too long"}), 400
+    try:
+        fields = parse_fields(request.args.get("fields"))
+        after = request.args.get("after")
+        page = get_page(
+            fields,
+            cohort,
+            decode_cursor(after) if after else None,
+            request.args.get("limit", DEFAULT_PAGE_ROWS, type=int),
+        )
+    except ValueError as err:
+        return jsonify({"ok": False, "msg": str(err)}), 400
+    return jsonify({"ok": True, "data": page["rows"], "next": page["next"]})
+
+@bp.route("/api/search")
+def api_search():
+    """
+    Applicants whose comments match ?q= (web-search syntax), best first, with
+    highlighted snippets; ?limit= (max 100) and the /api/analysis filters.
+    """
+    text = request.args.get("q", "").strip()
+    if not text or len(text) > SEARCH_QUERY_MAX_LEN:
+        msg = f"q is required (at most {SEARCH_QUERY_MAX_LEN} characters)"
+        return jsonify({"ok": False, "msg": msg}), 400
+    cohort = _cohort_arg()
+    if cohort is None:
+        return jsonify({"ok": False, "msg": "Filter value too long"}), 400
+    limit = request.args.get("limit", DEFAULT_SEARCH_ROWS, type=int)
+    return jsonify({"ok": True, "q": text, "data": search(text, cohort, limit)})
+
+@bp.route("/export")
+def export():
+    """
+    Streams applicants as a download: ?format=csv (default), parquet or arrow,
+    plus the same cohort filters as /api/analysis.
+    """
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        msg = f"Unknown format; use one of {', '.join(FORMATS)}"
+        return jsonify({"ok": False, "msg": msg}), 400
+    if not export_available(fmt):
+        return jsonify({"ok": False, "msg": f"{fmt} export needs pyarrow installed"}), 400
+    cohort = _cohort_arg()
+    if cohort is None:
+        return jsonify({"ok": False, "msg": "Filter value too long"}), 400
+    chunks = stream_export(fmt, cohort)
+    # Run the query before the 200 goes out, so a database error is a 500
+    first = next(chunks, "")
+    return Response(
+        itertools.chain([first], chunks),
+        mimetype=MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=applicants.{EXTENSIONS[fmt]}"},
+    )
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Query and connection histograms in Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@bp.route("/events")
+def events():
+    """Pull Data progress as Server-Sent Events (the latest event first)."""
+    return Response(
+        stream(BUS),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @bp.route("/status")
 def status():
     """Returns the current background job status."""
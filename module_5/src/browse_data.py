@@ -0,0 +1,125 @@
+"""
+browse_data.py — Module 5
+Keyset-paginated access to the raw applicants rows for /api/applicants.
+
+Pages run newest first on (COALESCE(date_added, -infinity), p_id), the key
+of the browse indexes built in load_data.py. A page starts just past the
+previous page's last key, so page 1000 is an index range scan of the same
+size as page 1 (no OFFSET rows to skip).
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg import sql
+
+from db import get_pooled_cursor
+from export_data import EXPORT_COLUMNS
+from query_data import ALL_APPLICANTS, QUERY_TIMEOUT_S, SET_TIMEOUT_SQL, Cohort
+
+DEFAULT_PAGE_ROWS = 50
+MAX_PAGE_ROWS = 500
+KEY_SQL = sql.SQL("COALESCE(date_added, '-infinity'::date)")
+NO_DATE = "-infinity"
+
+Cursor = Tuple[str, int]  # (ISO date or "-infinity", p_id) of the last row served
+
+
+def clamp_page_rows(requested: int) -> int:
+    """Page size within 1..MAX_PAGE_ROWS."""
+    return max(1, min(requested, MAX_PAGE_ROWS))
+
+
+def parse_fields(raw: Optional[str]) -> List[str]:
+    """The requested columns (comma-separated) in table order; all of them if empty."""
+    if not raw:
+        return list(EXPORT_COLUMNS)
+    requested = {field.strip() for field in raw.split(",") if field.strip()}
+    unknown = requested.difference(EXPORT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return [column for column in EXPORT_COLUMNS if column in requested]
+
+
+def encode_cursor(key: Cursor) -> str:
+    """Opaque, URL-safe token for a page boundary."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Inverse of encode_cursor; ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        day, p_id = json.loads(raw)
+        if day != NO_DATE:
+            date.fromisoformat(day)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as err:
+        raise ValueError("Invalid cursor") from err
+    if not isinstance(p_id, int) or isinstance(p_id, bool):
+        raise ValueError("Invalid cursor")
+    return day, p_id
+
+
+def page_query(
+    fields: Sequence[str], cohort: Cohort, after: Optional[Cursor]
+) -> Tuple[sql.Composed, List[Any]]:
+    """SELECT for one page: projection, cohort equality filters and the keyset bound."""
+    conditions = [
+        sql.SQL("{} = %s").format(sql.Identifier(column)) for column in cohort.filters()
+    ]
+    params: List[Any] = list(cohort.filters().values())
+    if after is not None:
+        conditions.append(sql.SQL("({}, p_id) < (%s::date, %s)").format(KEY_SQL))
+        params += list(after)
+    where = sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL("")
+    # The key columns are always selected: the next cursor is built from them
+    columns = dict.fromkeys(("p_id", "date_added", *fields))
+    query = sql.SQL(
+        "SELECT {columns} FROM {table}{where} ORDER BY {key} DESC, p_id DESC LIMIT %s"
+    ).format(
+        key=KEY_SQL,
+        columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        table=sql.Identifier("applicants"),
+        where=where,
+    )
+    return query, params
+
+
+def get_page(
+    fields: Sequence[str],
+    cohort: Cohort = ALL_APPLICANTS,
+    after: Optional[Cursor] = None,
+    limit: int = DEFAULT_PAGE_ROWS,
+) -> Dict[str, Any]:
+    """
+    One page of applicants as {"rows": [...], "next": token or None}; pass
+    the token back as `after` (decoded) for the following page.
+    """
+    limit = clamp_page_rows(limit)
+    query, params = page_query(fields, cohort, after)
+    with get_pooled_cursor(dict_rows=True) as cur:
+        cur.execute(SET_TIMEOUT_SQL, (str(int(QUERY_TIMEOUT_S * 1000)),), prepare=True)
+        # One extra row says whether another page exists
+        cur.execute(query, params + [limit + 1])
+        rows = cur.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_token = None
+    if more:
+        day = rows[-1]["date_added"]
+        next_token = encode_cursor((day.isoformat() if day else NO_DATE, rows[-1]["p_id"]))
+    return {
+        "rows": [{field: _json_value(row[field]) for field in fields} for row in rows],
+        "next": next_token,
+    }
+
+
+def _json_value(value: Any) -> Any:
+    """Dates become ISO strings; everything else is already JSON-safe."""
+    return value.isoformat() if isinstance(value, date) else value
@@ -3,6 +3,7 @@ clean.py
 --------
 Standardizes program and university names using a local LLM tool via API or direct import.
 """
+import http.client
 import json
 import os
 import sys
@@ -10,7 +11,37 @@ import time
 import urllib.request
 import urllib.error
 
-class DataCleaner:
+_LLM_APP = None
+# Marks a failed row in /standardize/stream output (llm_hosting.app.STREAM_ERROR_KEY)
+STREAM_ERROR_KEY = "_stream_error"
+LLM_FIELDS = ("llm-generated-program", "llm-generated-university")
+
+
+def _llm_app():
+    """Import llm_hosting.app once, on first fallback use (it is not needed in API mode)."""
+    global _LLM_APP  # pylint: disable=global-statement
+    if _LLM_APP is None:
+        try:
+            # pylint: disable=import-outside-toplevel, import-error
+            from llm_hosting import app as llm_app
+        except ImportError as err:
+            raise RuntimeError("Could not import llm_hosting.app.") from err
+        _LLM_APP = llm_app
+    return _LLM_APP
+
+
+def _source_fields(row) -> dict:
+    """A row without its llm-generated fields: what a checkpointed row was made from."""
+    return {k: v for k, v in (row or {}).items() if k not in LLM_FIELDS}
+
+
+def _row_key(row) -> str:
+    """Cache key: program and university, both of which the standardizer reads."""
+    row = row or {}
+    return f"{row.get('program') or ''}\n{row.get('university') or ''}".strip().lower()
+
+
+class DataCleaner:  # pylint: disable=too-many-instance-attributes
     """
     Takes raw scraper output and standardizes fields using a local LLM.
     """
@@ -29,6 +60,9 @@ class DataCleaner:
         self.api_url = kwargs.get("api_url", "http://localhost:8000/standardize")
         self.batch_size = kwargs.get("batch_size", 50)
         self.timeout_seconds = kwargs.get("timeout_seconds", 60)
+        # stream=True consumes /standardize/stream row by row instead of batch POSTs
+        self.stream = kwargs.get("stream", False)
+        self.checkpoint_every = kwargs.get("checkpoint_every", 1000)
         self.cache = {}
         self.start_time = 0.0
 
@@ -60,6 +94,21 @@ class DataCleaner:
             raw = resp.read().decode("utf-8", errors="replace")
             return json.loads(raw)
 
+    def _post_ndjson_stream(self, rows):
+        """POST rows as NDJSON and yield each standardized row as its line arrives."""
+        body = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        req = urllib.request.Request(
+            self.api_url.rstrip("/") + "/stream",
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+            method="POST",
+        )
+        # timeout_seconds bounds each read, not the whole stream
+        with urllib.request.urlopen(req, timeout=self.timeout_seconds) as resp:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line.decode("utf-8", errors="replace"))
+
     def _can_use_api(self) -> bool:
         """Quick health check for the local API."""
         try:
@@ -70,16 +119,10 @@ class DataCleaner:
             return False
 
     def _direct_standardize_row(self, row: dict) -> dict:
-        """Fallback: Import llm_hosting and call _call_llm directly."""
-        try:
-            # pylint: disable=import-outside-toplevel, import-error
-            from llm_hosting import app as llm_app
-        except ImportError as err:
-            raise RuntimeError("Could not import llm_hosting.app.") from err
-
-        program_text = (row or {}).get("program") or ""
+        """Fallback: standardize in-process via llm_hosting (fast path, then LLM)."""
+        llm_app = _llm_app()
         # pylint: disable=protected-access
-        result = llm_app._call_llm(program_text)
+        result = llm_app._standardize(llm_app._row_text(row))
 
         row["llm-generated-program"] = result.get("standardized_program")
         row["llm-generated-university"] = result.get("standardized_university")
@@ -88,9 +131,9 @@ class DataCleaner:
     def _update_cache_and_batch(self, rows, batch, send_map):
         """Updates the cache and merges API results into the current batch."""
         for r_data in rows:
-            prog_key = ((r_data or {}).get("program") or "").strip().lower()
-            if prog_key:
-                self.cache[prog_key] = {
+            row_key = _row_key(r_data)
+            if row_key:
+                self.cache[row_key] = {
                     "llm-generated-program": r_data.get("llm-generated-program"),
                     "llm-generated-university": r_data.get("llm-generated-university"),
                 }
@@ -102,9 +145,9 @@ class DataCleaner:
         """Handles row-by-row standardization when API is unavailable."""
         for original_idx in send_map:
             row = self._direct_standardize_row(batch[original_idx])
-            prog_key = ((row or {}).get("program") or "").strip().lower()
-            if prog_key:
-                self.cache[prog_key] = {
+            row_key = _row_key(row)
+            if row_key:
+                self.cache[row_key] = {
                     "llm-generated-program": row.get("llm-generated-program"),
                     "llm-generated-university": row.get("llm-generated-university"),
                 }
@@ -118,6 +161,60 @@ class DataCleaner:
         sys.stdout.write(msg)
         sys.stdout.flush()
 
+    def _resume_checkpoint(self, data) -> int:
+        """
+        Copies the rows a previous stream run already checkpointed (the
+        output's longest prefix made from the same input rows) into `data`
+        and the cache; returns how many rows that covers.
+        """
+        try:
+            with open(self.output_file, "r", encoding="utf-8") as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if not isinstance(saved, list):
+            return 0
+        done = 0
+        for old, row in zip(saved, data):
+            if not isinstance(old, dict) or _source_fields(old) != _source_fields(row):
+                break
+            done += 1
+        self._update_cache_and_batch(saved[:done], data, range(done))
+        return done
+
+    def _clean_data_stream(self, data):
+        """Stream every uncached row through the API, checkpointing the finished prefix.
+
+        A rerun resumes after the last checkpoint instead of resending those rows.
+        """
+        send_map, received = [], 0
+        resumed = self._resume_checkpoint(data)
+        if resumed:
+            print(f"Resuming after {resumed} checkpointed rows")
+        for idx, row in enumerate(data[resumed:], resumed):
+            row_key = _row_key(row)
+            if row_key in self.cache:
+                row.update(self.cache[row_key])
+            else:
+                send_map.append(idx)
+
+        try:
+            for out_row in self._post_ndjson_stream([data[idx] for idx in send_map]):
+                if STREAM_ERROR_KEY in out_row:
+                    raise ValueError(out_row[STREAM_ERROR_KEY])
+                idx = send_map[received]
+                self._update_cache_and_batch([out_row], data, [idx])
+                received += 1
+                self._print_progress(idx + 1, len(data), len(data) - len(send_map))
+                if received % self.checkpoint_every == 0:
+                    self._atomic_save(data[: idx + 1])
+        except (OSError, ValueError, http.client.HTTPException):
+            # URLError, timeouts, resets and truncated bodies all fall back in-process
+            self._process_batch_fallback(data, send_map[received:])
+
+        self._atomic_save(data)
+        return data
+
     def clean_data(self):
         """Main cleaning routine. Optimized to minimize local variables."""
         data = self._load_input()
@@ -126,36 +223,17 @@ class DataCleaner:
 
         use_api = self._can_use_api()
         print(f"Starting LLM cleaning. API Mode: {use_api}")
+        self.start_time = time.time()
+        if use_api and self.stream:
+            return self._clean_data_stream(data)
 
         cleaned = []
-        self.start_time = time.time()
         cache_hits, i = 0, 0
 
         while i < len(data):
             batch = data[i : i + self.batch_size]
-            to_send, send_map = [], []
-
-            for idx, row in enumerate(batch):
-                prog_key = ((row or {}).get("program") or "").strip().lower()
-                if prog_key in self.cache:
-                    p_val = self.cache[prog_key]["llm-generated-program"]
-                    u_val = self.cache[prog_key]["llm-generated-university"]
-                    row["llm-generated-program"], row["llm-generated-university"] = p_val, u_val
-                    cache_hits += 1
-                else:
-                    to_send.append(row)
-                    send_map.append(idx)
-
-            if to_send:
-                if use_api:
-                    try:
-                        resp = self._post_json({"rows": to_send})
-                        self._update_cache_and_batch(resp.get("rows", []), batch, send_map)
-                    except (urllib.error.URLError, ValueError):
-                        use_api = False
-                        self._process_batch_fallback(batch, send_map)
-                else:
-                    self._process_batch_fallback(batch, send_map)
+            hits, use_api = self.standardize_batch(batch, use_api)
+            cache_hits += hits
 
             cleaned.extend(batch)
             i += len(batch)
@@ -167,6 +245,57 @@ class DataCleaner:
         self._atomic_save(cleaned)
         return cleaned
 
+    def standardize_batch(self, batch, use_api):
+        """
+        Fills the llm-generated fields of `batch` in place: from the cache,
+        then the API (if use_api), else in-process. Returns (cache hits,
+        use_api), which turns False once the API fails.
+        """
+        to_send, send_map, cache_hits = [], [], 0
+
+        for idx, row in enumerate(batch):
+            row_key = _row_key(row)
+            if row_key in self.cache:
+                p_val = self.cache[row_key]["llm-generated-program"]
+                u_val = self.cache[row_key]["llm-generated-university"]
+                row["llm-generated-program"], row["llm-generated-university"] = p_val, u_val
+                cache_hits += 1
+            else:
+                to_send.append(row)
+                send_map.append(idx)
+
+        if to_send:
+            if use_api:
+                try:
+                    resp = self._post_json({"rows": to_send})
+                    self._update_cache_and_batch(resp.get("rows", []), batch, send_map)
+                except (urllib.error.URLError, ValueError):
+                    use_api = False
+                    self._process_batch_fallback(batch, send_map)
+            else:
+                self._process_batch_fallback(batch, send_map)
+        return cache_hits, use_api
+
+    def clean_batches(self, batches):
+        """
+        Streaming counterpart of clean_data() for the in-process Pull Data
+        pipeline: standardizes each incoming list of rows (batch_size rows
+        per API call) and yields it as soon as it is done. No files are read
+        or written; save_output() writes the final result.
+        """
+        use_api = self._can_use_api()
+        for rows in batches:
+            cleaned = []
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start : start + self.batch_size]
+                _, use_api = self.standardize_batch(batch, use_api)
+                cleaned.extend(batch)  # API results replace the row dicts
+            yield cleaned
+
+    def save_output(self, data):
+        """Atomically writes cleaned rows to output_file."""
+        self._atomic_save(data)
+
     def run(self):
         """Public entry point to start the cleaning process."""
         self.clean_data()
@@ -0,0 +1,313 @@
+"""
+columnar.py — Module 5
+Optional in-memory column store that answers the dashboard questions
+with NumPy masks instead of SQL round trips.
+
+Enabled with ANALYTICS_ENGINE=numpy (and only if NumPy is importable);
+otherwise query_data keeps running every question in PostgreSQL.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from db import get_cursor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENABLED = os.getenv("ANALYTICS_ENGINE", "sql").lower() == "numpy" and np is not None
+
+# Text columns become (codes, categories); a code of -1 is NULL
+CATEGORICAL = (
+    "university", "program", "status", "term", "us_or_international", "degree",
+    "llm_generated_program", "llm_generated_university",
+)
+# Kept as float64 with NaN for NULL so averages round exactly like
+# ROUND(AVG(col)::numeric, 2) does on PostgreSQL's float8 columns
+NUMERIC = ("gpa", "gre", "gre_v", "gre_aw")
+
+SELECT_SQL = (
+    f"SELECT {', '.join(CATEGORICAL + NUMERIC)}, date_added, "
+    "COALESCE(llm_generated_program, program) FROM applicants"
+)
+CENT = Decimal("0.01")
+
+_STATE: Dict[str, Any] = {"store": None}
+_STATE_LOCK = threading.Lock()
+
+
+def like_regex(pattern: str) -> re.Pattern:
+    """Translates a SQL ILIKE pattern (%, _ and backslash escapes) to a regex."""
+    parts = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def round_avg(total: float, rows: int) -> Optional[Decimal]:
+    """ROUND(AVG(x)::numeric, 2): float8 -> numeric keeps 15 significant digits."""
+    if rows == 0:
+        return None
+    return Decimal(f"{total / rows:.15g}").quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def round_pct(part: int, whole: int) -> Decimal:
+    """ROUND(100.0 * part / whole, 2) in exact decimal arithmetic."""
+    return (Decimal(100 * part) / Decimal(whole)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class ColumnStore:
+    """
+    A read-only snapshot of applicants as NumPy arrays.
+    A text filter is evaluated once per distinct value (a lookup table
+    indexed by the category codes) and its row mask is kept, so after the
+    first request each question is a handful of boolean ANDs.
+    """
+
+    def __init__(self, rows: Sequence[Sequence[Any]]):
+        self.size = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * (len(CATEGORICAL) + len(NUMERIC) + 2)
+        self.codes: Dict[str, Any] = {}
+        self.categories: Dict[str, List[str]] = {}
+        for name, values in zip(CATEGORICAL + ("program_coalesced",),
+                                columns[:len(CATEGORICAL)] + columns[-1:]):
+            self._encode(name, values)
+        offset = len(CATEGORICAL)
+        # Per score: (values with NULL as 0.0, not-NULL mask)
+        self.numeric: Dict[str, Tuple[Any, Any]] = {}
+        for i, name in enumerate(NUMERIC):
+            values = np.array(
+                [np.nan if v is None else v for v in columns[offset + i]], dtype=np.float64
+            )
+            valid = ~np.isnan(values)
+            self.numeric[name] = (np.where(valid, values, 0.0), valid)
+        self.date_added = np.array(
+            ["NaT" if v is None else v for v in columns[offset + len(NUMERIC)]],
+            dtype="datetime64[D]",
+        )
+        # Masks and group counts, each computed once per snapshot
+        self._cache: Dict[Tuple[str, ...], Any] = {}
+
+    def _encode(self, name: str, values: Sequence[Optional[str]]) -> None:
+        """Dictionary-encodes one text column."""
+        index: Dict[str, int] = {}
+        self.codes[name] = np.fromiter(
+            (-1 if v is None else index.setdefault(v, len(index)) for v in values),
+            dtype=np.int32, count=self.size,
+        )
+        self.categories[name] = list(index)
+
+    def _text_mask(self, column: str, kind: str, value: str) -> Any:
+        """Row mask for one text predicate, built from per-category flags once."""
+        key = (column, kind, value)
+        mask = self._cache.get(key)
+        if mask is None:
+            if kind == "ilike":
+                regex = like_regex(value)
+                flags = [regex.fullmatch(c) is not None for c in self.categories[column]]
+            else:
+                flags = [c == value for c in self.categories[column]]
+            # The trailing False is what code -1 (NULL) indexes
+            lut = np.array(flags + [False], dtype=bool)
+            mask = self._cache[key] = lut[self.codes[column]]
+        return mask
+
+    def restrict(self, conditions: Dict[str, Tuple[str, str]]) -> ColumnStore:
+        """A new store holding only the rows matching each {column: (kind, value)}."""
+        mask = np.ones(self.size, dtype=bool)
+        for column, (kind, value) in conditions.items():
+            mask &= self._text_mask(column, kind, value)
+        subset = ColumnStore([])
+        subset.size = count(mask)
+        subset.codes = {name: codes[mask] for name, codes in self.codes.items()}
+        subset.categories = self.categories
+        subset.numeric = {
+            name: (values[mask], valid[mask]) for name, (values, valid) in self.numeric.items()
+        }
+        subset.date_added = self.date_added[mask]
+        return subset
+
+    def ilike(self, column: str, pattern: str) -> Any:
+        """Mask for `column ILIKE pattern` (NULL never matches); do not modify it."""
+        return self._text_mask(column, "ilike", pattern)
+
+    def equals(self, column: str, value: str) -> Any:
+        """Mask for `column = value` (case-sensitive, NULL never matches); do not modify it."""
+        return self._text_mask(column, "equals", value)
+
+    def notnull(self, column: str) -> Any:
+        """Mask for `column IS NOT NULL` on a text column."""
+        return self.codes[column] >= 0
+
+    def date_range(self, start: str, end: str) -> Any:
+        """Mask for start <= date_added < end (NULL never matches)."""
+        key = ("date_added", start, end)
+        mask = self._cache.get(key)
+        if mask is None:
+            mask = self._cache[key] = (
+                (self.date_added >= np.datetime64(start)) & (self.date_added < np.datetime64(end))
+            )
+        return mask
+
+    def avg(self, column: str, mask: Any = None) -> Optional[Decimal]:
+        """ROUND(AVG(column)::numeric, 2) over the masked rows, NULLs ignored."""
+        values, valid = self.numeric[column]
+        keep = valid if mask is None else mask & valid
+        # NULLs are stored as 0.0, so a dot product with the mask is the sum
+        return round_avg(float(values @ keep), count(keep))
+
+    def top(self, column: str, limit: int) -> List[Tuple[Optional[str], int]]:
+        """GROUP BY column ORDER BY COUNT(*) DESC LIMIT n (ties: first seen wins)."""
+        key = ("bincount", column)
+        counts = self._cache.get(key)
+        if counts is None:
+            # Shift by one so NULL (-1) gets its own bucket at index 0
+            counts = self._cache[key] = np.bincount(
+                self.codes[column] + 1, minlength=len(self.categories[column]) + 1
+            )
+        names = [None] + self.categories[column]
+        order = np.argsort(-counts, kind="stable")[:limit]
+        return [(names[i], int(counts[i])) for i in order if counts[i]]
+
+
+def count(mask: Any) -> int:
+    """COUNT(*) over a mask."""
+    return int(np.count_nonzero(mask))
+
+
+def _top_school_mask(store: ColumnStore, params: Sequence[Any], program: str,
+                     university: str) -> Any:
+    """The q8/q9 filter, reading params in the order the SQL binds them."""
+    start, end, status, degree, prog, uni1, uni_eq, uni3, uni4, uni5 = params
+    return (
+        store.date_range(start, end)
+        & store.ilike("status", status) & store.ilike("degree", degree)
+        & store.ilike(program, prog)
+        & (store.ilike(university, uni1) | store.equals(university, uni_eq)
+           | store.ilike(university, uni3) | store.ilike(university, uni4)
+           | store.ilike(university, uni5))
+    )
+
+
+# -------------------------------------------------------------------
+# Question equivalents: each returns the rows its SQL would return
+# -------------------------------------------------------------------
+def q1_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q1_SQL."""
+    return [(count(store.ilike("term", params[0])),)]
+
+
+def q2_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q2_SQL."""
+    if store.size == 0:
+        return [(0,)]
+    column = "us_or_international"
+    international = (store.notnull(column) & ~store.ilike(column, params[0])
+                     & ~store.ilike(column, params[1]))
+    return [(round_pct(count(international), store.size),)]
+
+
+def q3_rows(store: ColumnStore, _params: Sequence[Any]) -> List[Tuple]:
+    """Q3_SQL (AVG already skips NULLs, so the WHERE clause changes nothing)."""
+    return [tuple(store.avg(name) for name in NUMERIC)]
+
+
+def q4_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q4_SQL."""
+    mask = store.ilike("us_or_international", params[0]) & store.ilike("term", params[1])
+    return [(store.avg("gpa", mask),)]
+
+
+def q5_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q5_SQL."""
+    n_fall = count(store.ilike("term", params[0]))
+    n_acc = count(store.ilike("term", params[1]) & store.ilike("status", params[2]))
+    return [(n_acc, n_fall, round_pct(n_acc, n_fall) if n_fall else None)]
+
+
+def q6_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q6_SQL."""
+    mask = store.ilike("term", params[0]) & store.ilike("status", params[1])
+    return [(store.avg("gpa", mask),)]
+
+
+def q7_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q7_SQL."""
+    mask = (
+        (store.ilike("university", params[0]) | store.ilike("university", params[1]))
+        & store.ilike("degree", params[2]) & store.ilike("program", params[3])
+    )
+    return [(count(mask),)]
+
+
+def q8_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q8_SQL."""
+    return [(count(_top_school_mask(store, params, "program", "university")),)]
+
+
+def q9_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q9_SQL: the q8 filter on the raw columns, then on the LLM columns."""
+    raw = count(_top_school_mask(store, params[:10], "program", "university"))
+    llm = count(_top_school_mask(
+        store, params[10:], "llm_generated_program", "llm_generated_university"
+    ))
+    return [(raw, llm, llm - raw)]
+
+
+def q10_rows(store: ColumnStore, _params: Sequence[Any]) -> List[Tuple]:
+    """Q10_SQL."""
+    return store.top("program_coalesced", 1)
+
+
+def q11_rows(store: ColumnStore, params: Sequence[Any]) -> List[Tuple]:
+    """Q11_SQL: labels come out in ORDER BY 1 order."""
+    phd = store.ilike("degree", params[0])
+    masters = store.ilike("degree", params[1]) & ~phd
+    groups = [("Masters", masters), ("PhD", phd)]
+    rows = [(label, store.avg("gre", mask)) for label, mask in groups]
+    return [(label, value) for label, value in rows if value is not None]
+
+
+# -------------------------------------------------------------------
+# Snapshot lifecycle
+# -------------------------------------------------------------------
+def build_store() -> ColumnStore:
+    """Reads applicants once and builds a fresh column store."""
+    with get_cursor() as cur:
+        cur.execute(SELECT_SQL)
+        rows = cur.fetchall()
+    return ColumnStore(rows)
+
+
+def refresh() -> Optional[ColumnStore]:
+    """Rebuilds the snapshot after a load (no-op unless the engine is enabled)."""
+    if not ENABLED:
+        return None
+    store = build_store()
+    with _STATE_LOCK:
+        _STATE["store"] = store
+    return store
+
+
+def current_store() -> Optional[ColumnStore]:
+    """The snapshot to answer from, built on first use; None when disabled."""
+    if not ENABLED:
+        return None
+    with _STATE_LOCK:
+        store = _STATE["store"]
+    return store if store is not None else refresh()
@@ -2,15 +2,24 @@
 db.py - Database Connection Manager (Software Assurance Edition)
 """
 import os
+import queue
+import threading
+import time
 from contextlib import contextmanager
 from typing import Dict, Generator, Optional
 import psycopg
 from psycopg.rows import dict_row
 from dotenv import load_dotenv
+from metrics import CONNECTION_ACQUIRE, CURSOR_SECONDS
 
 # Load the .env file into the system environment
 load_dotenv()
 
+# Idle connections kept per DSN by get_pooled_cursor()
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+_POOLS: Dict[str, queue.LifoQueue] = {}
+_POOLS_LOCK = threading.Lock()
+
 def get_db_dsn(env_overrides: Optional[Dict[str, str]] = None) -> str:
     """
     Builds a PostgreSQL DSN using environment variables or optional overrides.
@@ -60,7 +69,10 @@ def get_cursor(dict_rows: bool = False) -> Generator[psycopg.Cursor, None, None]
     
     :param dict_rows: If True, returns rows as dictionaries.
     """
+    started = time.perf_counter()
     with get_conn() as conn:
+        acquired = time.perf_counter()
+        CONNECTION_ACQUIRE.observe("direct", acquired - started)
         row_factory = dict_row if dict_rows else None
         cur = conn.cursor(row_factory=row_factory)
         try:
@@ -69,3 +81,82 @@ def get_cursor(dict_rows: bool = False) -> Generator[psycopg.Cursor, None, None]
         except Exception:
             conn.rollback()
             raise
+        finally:
+            CURSOR_SECONDS.observe("direct", time.perf_counter() - acquired)
+
+
+def _idle_connections(dsn: str) -> queue.LifoQueue:
+    """The idle-connection stack for one DSN (created on first use)."""
+    with _POOLS_LOCK:
+        if dsn not in _POOLS:
+            _POOLS[dsn] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return _POOLS[dsn]
+
+
+def _usable(conn: psycopg.Connection) -> bool:
+    """Open, not known broken, and outside any transaction."""
+    return (
+        not conn.closed and not conn.broken
+        and conn.info.transaction_status == psycopg.pq.TransactionStatus.IDLE
+    )
+
+
+def _checkout(idle: queue.LifoQueue, dsn: str) -> psycopg.Connection:
+    """The newest usable idle connection (closing any unusable ones), else a new one."""
+    while True:
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            return psycopg.connect(dsn)
+        if _usable(conn):
+            return conn
+        conn.close()
+
+
+@contextmanager
+def get_pooled_cursor(dict_rows: bool = False) -> Generator[psycopg.Cursor, None, None]:
+    """
+    Like get_cursor(), but reuses connections instead of opening one per call.
+
+    Up to POOL_SIZE idle connections are kept per DSN. Checked-out
+    connections are health-checked first, and a connection that is closed,
+    broken or could not be rolled back is discarded rather than returned.
+
+    :param dict_rows: If True, returns rows as dictionaries.
+    """
+    started = time.perf_counter()
+    dsn = get_db_dsn()
+    idle = _idle_connections(dsn)
+    conn = _checkout(idle, dsn)
+    acquired = time.perf_counter()
+    CONNECTION_ACQUIRE.observe("pooled", acquired - started)
+    try:
+        cur = conn.cursor(row_factory=dict_row if dict_rows else None)
+        yield cur
+        conn.commit()
+    except Exception:
+        try:
+            if not conn.broken:
+                conn.rollback()
+        except psycopg.Error:
+            conn.close()
+        raise
+    finally:
+        CURSOR_SECONDS.observe("pooled", time.perf_counter() - acquired)
+        if not _usable(conn):
+            conn.close()
+        else:
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+
+def close_pools() -> None:
+    """Closes every idle pooled connection."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for idle in pools:
+        while not idle.empty():
+            idle.get_nowait().close()
@@ -0,0 +1,164 @@
+"""
+events.py — Module 5
+In-process publish/subscribe for Pull Data progress, streamed to the
+dashboard by /events as Server-Sent Events.
+
+Each subscriber (one open /events response) gets its own bounded queue;
+publishing never blocks the pipeline: a subscriber that stops reading
+loses its oldest events, and the newest one is replayed on subscribe so a
+fresh page starts from the current state.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+EVENT_QUEUE_SIZE = 256
+HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", "15"))
+# Counter updates closer together than this are coalesced (stage changes are not)
+PUBLISH_INTERVAL_S = 0.2
+
+Event = Dict[str, Any]
+
+class EventBus:
+    """Fan-out of published events to every current subscriber."""
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self.latest: Optional[Event] = None
+        self._lock = threading.Lock()
+        self._subscribers: List[queue.Queue] = []
+        self._next_id = 1
+
+    def publish(self, event: Event) -> Event:
+        """Numbers the event and offers it to every subscriber; returns it."""
+        with self._lock:
+            event = {"id": self._next_id, **event}
+            self._next_id += 1
+            self.latest = event
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            _offer(subscriber, event)
+        return event
+
+    def subscribe(self) -> queue.Queue:
+        """A new queue receiving every later event, primed with the latest one."""
+        subscriber: queue.Queue = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self.latest is not None:
+                subscriber.put_nowait(self.latest)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        """Stops delivery to `subscriber` (no-op if already gone)."""
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def subscriber_count(self) -> int:
+        """Open subscriptions (one per connected /events client)."""
+        with self._lock:
+            return len(self._subscribers)
+
+
+def _offer(subscriber: queue.Queue, event: Event) -> None:
+    """Non-blocking put; a full queue (stalled client) drops its oldest event."""
+    while True:
+        try:
+            subscriber.put_nowait(event)
+            return
+        except queue.Full:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:  # pragma: no cover - emptied by another reader
+                pass
+
+
+def format_sse(event: Event) -> str:
+    """One `progress` event in text/event-stream framing."""
+    return f"id: {event['id']}\nevent: progress\ndata: {json.dumps(event)}\n\n"
+
+
+def stream(bus: EventBus, heartbeat_s: Optional[float] = None) -> Iterator[str]:
+    """
+    SSE text for one client: each event as it is published, and a comment
+    line after heartbeat_s of silence so proxies keep the connection open.
+    Closing the generator (client gone) unsubscribes it.
+    """
+    heartbeat_s = HEARTBEAT_S if heartbeat_s is None else heartbeat_s
+    subscriber = bus.subscribe()
+    try:
+        while True:
+            try:
+                yield format_sse(subscriber.get(timeout=heartbeat_s))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+class PipelineProgress:  # pylint: disable=too-many-instance-attributes
+    """
+    Structured progress of one Pull Data run: the current stage, its
+    done/total count, throughput and ETA, and running totals of pages
+    fetched, rows cleaned and rows loaded.
+    """
+
+    def __init__(self, bus: EventBus, clock: Callable[[], float] = time.monotonic) -> None:
+        self.bus = bus
+        self.clock = clock
+        self.counters = {"pages_fetched": 0, "rows_cleaned": 0, "rows_loaded": 0}
+        self.stage = "start"
+        self.status = ""
+        self._stage_started = self._run_started = clock()
+        self._last_publish = float("-inf")
+
+    def start_stage(self, stage: str, status: str, total: Optional[int] = None) -> Event:
+        """Enters `stage` (resets its clock) and publishes right away."""
+        self.stage = stage
+        self._stage_started = self.clock()
+        return self._publish(status, 0, total, running=True)
+
+    def update(
+        self, done: int, total: Optional[int] = None, force: bool = False, **counters: int
+    ) -> Optional[Event]:
+        """Records stage progress; publishes at most every PUBLISH_INTERVAL_S unless forced."""
+        self.counters.update(counters)
+        if not force and self.clock() - self._last_publish < PUBLISH_INTERVAL_S:
+            return None
+        return self._publish(self.status, done, total, running=True)
+
+    def finish(self, status: str, ok: bool = True) -> Event:
+        """Final event of the run (stage "done" or "error")."""
+        self.stage = "done" if ok else "error"
+        return self._publish(status, None, None, running=False)
+
+    def _publish(
+        self, status: str, done: Optional[int], total: Optional[int], running: bool
+    ) -> Event:
+        now = self.clock()
+        self.status = status
+        self._last_publish = now
+        stage_s = now - self._stage_started
+        rate = done / stage_s if done and stage_s > 0 else None
+        eta_s = (total - done) / rate if rate and total is not None else None
+        return self.bus.publish({
+            "stage": self.stage,
+            "status": status,
+            "running": running,
+            "done": done,
+            "total": total,
+            "rate": None if rate is None else round(rate, 1),
+            "eta_s": None if eta_s is None else round(max(eta_s, 0.0), 1),
+            "elapsed_s": round(now - self._run_started, 1),
+            **self.counters,
+        })
+
+
+BUS = EventBus()
@@ -0,0 +1,238 @@
+"""
+export_data.py — Module 5
+Streams applicants (optionally one cohort) out of PostgreSQL as CSV, or as
+Parquet / Arrow IPC when pyarrow is installed.
+
+Rows come through a named server-side cursor EXPORT_BATCH_ROWS at a time
+and each batch is encoded and handed on before the next is fetched, so
+memory stays flat however large the table is.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from psycopg import sql
+
+from db import get_conn
+from load_data import COLUMNS
+from query_data import ALL_APPLICANTS, Cohort
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq  # pragma: no cover - needs pyarrow
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+EXPORT_COLUMNS = COLUMNS[:-1]  # row_hash is internal to the loader
+FORMATS = ("csv", "parquet", "arrow")
+EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+MIMETYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+INT_COLUMNS = ("p_id",)
+DATE_COLUMNS = ("date_added",)
+FLOAT_COLUMNS = ("gpa", "gre", "gre_v", "gre_aw")
+
+Chunk = Union[str, bytes]
+
+
+def export_available(fmt: str) -> bool:
+    """CSV always works; Parquet and Arrow need pyarrow."""
+    return fmt == "csv" or (fmt in FORMATS and pa is not None)
+
+
+def export_query(cohort: Cohort = ALL_APPLICANTS) -> Tuple[sql.Composed, List[str]]:
+    """SELECT for the export columns, filtered to `cohort`, in p_id order."""
+    filters = cohort.filters()
+    where = sql.SQL("")
+    if filters:
+        where = sql.SQL(" WHERE ") + sql.SQL(" AND ").join(
+            sql.SQL("{} = %s").format(sql.Identifier(column)) for column in filters
+        )
+    query = sql.SQL("SELECT {columns} FROM {table}{where} ORDER BY p_id").format(
+        columns=sql.SQL(", ").join(map(sql.Identifier, EXPORT_COLUMNS)),
+        table=sql.Identifier("applicants"),
+        where=where,
+    )
+    return query, list(filters.values())
+
+
+def iter_batches(
+    cohort: Cohort = ALL_APPLICANTS, batch_rows: Optional[int] = None
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Yields lists of at most batch_rows tuples from a named (server-side)
+    cursor; the connection is closed when the generator finishes or is closed.
+    """
+    batch_rows = batch_rows or EXPORT_BATCH_ROWS
+    query, params = export_query(cohort)
+    with get_conn() as conn:
+        with conn.cursor(name="applicants_export") as cur:
+            cur.itersize = batch_rows
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+
+
+def iter_csv(batches: Iterable[List[Tuple[Any, ...]]]) -> Iterator[str]:
+    """Header plus one chunk of CSV text per batch (NULL becomes an empty field)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():  # no rows: just the header
+        yield buf.getvalue()
+
+
+class _ChunkSink:  # pragma: no cover - needs pyarrow
+    """Write-only file object that hands pyarrow's output back as byte chunks."""
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        """Buffers one write."""
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        """Bytes written so far (pyarrow tracks row-group offsets with it)."""
+        return self.position
+
+    def flush(self) -> None:
+        """Nothing to flush; drain() hands the bytes on."""
+
+    def close(self) -> None:
+        """Marks the sink closed; buffered bytes can still be drained."""
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """Everything written since the last drain."""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def arrow_schema() -> Any:  # pragma: no cover - needs pyarrow
+    """Arrow types matching the applicants table."""
+    def arrow_type(column: str) -> Any:
+        if column in INT_COLUMNS:
+            return pa.int32()
+        if column in DATE_COLUMNS:
+            return pa.date32()
+        if column in FLOAT_COLUMNS:
+            return pa.float64()
+        return pa.string()
+    return pa.schema([(column, arrow_type(column)) for column in EXPORT_COLUMNS])
+
+
+def iter_arrow(
+    batches: Iterable[List[Tuple[Any, ...]]], fmt: str
+) -> Iterator[bytes]:  # pragma: no cover - needs pyarrow
+    """One Parquet row group (or Arrow IPC record batch) per batch, then the footer."""
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    for rows in batches:
+        arrays = [
+            pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(
+    fmt: str = "csv",
+    cohort: Cohort = ALL_APPLICANTS,
+    batch_rows: Optional[int] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[Chunk]:
+    """
+    Encoded chunks of the export in `fmt`; stats["rows"] (if given) counts
+    rows as they are fetched.
+    """
+    if not export_available(fmt):
+        raise ValueError(f"Export format {fmt!r} is not available (Parquet/Arrow need pyarrow).")
+    batches = iter_batches(cohort, batch_rows)
+    if stats is not None:
+        batches = _counted(batches, stats)
+    if fmt == "csv":
+        return iter_csv(batches)
+    return iter_arrow(batches, fmt)  # pragma: no cover - needs pyarrow
+
+
+def _counted(
+    batches: Iterator[List[Tuple[Any, ...]]], stats: Dict[str, int]
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """Passes batches through, adding their sizes to stats["rows"]."""
+    stats.setdefault("rows", 0)
+    for rows in batches:
+        stats["rows"] += len(rows)
+        yield rows
+
+
+def write_export(
+    path: str, fmt: str = "csv", cohort: Cohort = ALL_APPLICANTS,
+    batch_rows: Optional[int] = None,
+) -> Dict[str, float]:
+    """Streams the export to `path`; returns rows, bytes and seconds taken."""
+    stats: Dict[str, int] = {}
+    written = 0
+    started = time.perf_counter()
+    with open(path, "wb") as out:
+        for chunk in stream_export(fmt, cohort, batch_rows, stats):
+            data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            out.write(data)
+            written += len(data)
+    return {"rows": stats["rows"], "bytes": written, "seconds": time.perf_counter() - started}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """CLI: export applicants (optionally one cohort) to a file and report throughput."""
+    parser = argparse.ArgumentParser(description="Export applicants to CSV, Parquet or Arrow.")
+    parser.add_argument("--out", required=True, help="Output file path.")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS,
+                        help="Rows per server-side cursor fetch.")
+    for field in Cohort._fields:
+        parser.add_argument(f"--{field}", help=f"Only applicants with this {field}.")
+    args = parser.parse_args(argv)
+
+    cohort = Cohort(**{field: getattr(args, field) for field in Cohort._fields})
+    result = write_export(args.out, args.format, cohort, args.batch_rows)
+    seconds = max(result["seconds"], 1e-9)
+    print(
+        f"Exported {result['rows']} rows ({result['bytes'] / 1e6:.1f} MB) to {args.out} in "
+        f"{seconds:.2f}s: {result['rows'] / seconds:,.0f} rows/s, "
+        f"{result['bytes'] / 1e6 / seconds:.1f} MB/s."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+metrics.py — Module 5
+In-process histograms for the database hot path, rendered in the
+Prometheus text exposition format for GET /metrics.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+SECONDS_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BOUNDS = (0, 1, 5, 10, 50, 100, 500, 1000, 10_000, 100_000)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram per label value; each value lands in the first
+    bound >= value. Counts are stored per bucket and made cumulative on render.
+    """
+
+    def __init__(self, name: str, help_text: str, label: str, bounds: Tuple[float, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.bounds = bounds
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}  # value -> (counts, [sum])
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        """Record one observation for `label_value`."""
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = ([0] * (len(self.bounds) + 1), [0.0])
+            series[0][bisect.bisect_left(self.bounds, value)] += 1
+            series[1][0] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """{label value: {"count": n, "sum": total}} (for tests and quick looks)."""
+        with self._lock:
+            return {
+                value: {"count": sum(counts), "sum": total[0]}
+                for value, (counts, total) in self._series.items()
+            }
+
+    def render(self) -> List[str]:
+        """HELP/TYPE lines plus _bucket, _sum and _count samples per label value."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((value, list(counts), total[0])
+                            for value, (counts, total) in self._series.items())
+        for value, counts, total in series:
+            label = f'{self.label}="{_escape(value)}"'
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                upper = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{self.name}_bucket{{{label},le="{upper}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total:.6g}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    """Label values escape backslash, double quote and newline."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+CONNECTION_ACQUIRE = Histogram(
+    "db_connection_acquire_seconds",
+    "Time to obtain a database connection.", "pool", SECONDS_BOUNDS,
+)
+CURSOR_SECONDS = Histogram(
+    "db_cursor_seconds",
+    "Time a db cursor context was held, including commit.", "pool", SECONDS_BOUNDS,
+)
+QUERY_SECONDS = Histogram(
+    "query_seconds",
+    "Wall time of each analysis question (get_qN).", "query", SECONDS_BOUNDS,
+)
+QUERY_ROWS = Histogram(
+    "query_rows",
+    "Rows returned by each analysis question's SQL.", "query", ROWS_BOUNDS,
+)
+HISTOGRAMS = (CONNECTION_ACQUIRE, CURSOR_SECONDS, QUERY_SECONDS, QUERY_ROWS)
+
+
+def render() -> str:
+    """Every histogram in Prometheus text format."""
+    return "\n".join(line for hist in HISTOGRAMS for line in hist.render()) + "\n"
@@ -0,0 +1,228 @@
+"""
+pipeline.py — Module 5
+In-process, streaming Pull Data: scrape -> clean -> load.
+
+Each stage runs in its own thread and hands batches on as soon as they
+are ready: pages from GradCafeScraper.iter_pages() go through
+DataCleaner.clean_batches() into StreamingLoad writes of LOAD_BATCH_ROWS
+rows, so the stages overlap and wall time approaches the slowest stage
+instead of the sum of all three. Bounded queues between the stages hold
+a fast stage back rather than buffering the whole data set, and an error
+in any stage stops the others before anything is swapped in.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from clean import DataCleaner
+from events import PUBLISH_INTERVAL_S, PipelineProgress
+from load_data import StreamingLoad
+from scrape import GradCafeScraper
+
+PIPELINE_QUEUE_BATCHES = int(os.getenv("PIPELINE_QUEUE_BATCHES", "8"))
+LOAD_BATCH_ROWS = int(os.getenv("LOAD_BATCH_ROWS", "500"))
+SCRAPE_TARGET = int(os.getenv("TARGET", "5000"))  # as for python scrape.py
+
+# Scraper record key -> the raw key load_data reads (TEXT_FIELDS / FLOAT_FIELDS)
+SCRAPED_KEYS = {
+    "url": "overview_url",
+    "status": "applicant_status",
+    "term": "start_term",
+    "US/International": "citizenship",
+    "Degree": "degree_level",
+    "GPA": "gpa",
+    "GRE Score": "gre_general",
+    "GRE V Score": "gre_verbal",
+    "GRE AW": "gre_aw",
+}
+
+Rows = List[Dict[str, Any]]
+_END = object()  # end-of-stream marker on a queue
+
+
+def to_raw_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """A scraped (and cleaned) record under the keys load_data reads."""
+    row = dict(entry)
+    for key, raw_key in SCRAPED_KEYS.items():
+        if key in row and raw_key not in row:
+            row[raw_key] = row.pop(key)
+    return row
+
+
+class _Run:
+    """State shared by the stage threads of one pipeline run."""
+
+    def __init__(self) -> None:
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.busy_s: Dict[str, float] = {}
+        self.waited_s: Dict[str, float] = {}
+
+    def fail(self, err: BaseException) -> None:
+        """Records the first error and tells every stage to stop."""
+        if self.error is None:
+            self.error = err
+        self.stop.set()
+
+    def put(self, out: queue.Queue, item: Any) -> bool:
+        """Blocks while `out` is full; False if the run was stopped meanwhile."""
+        while not self.stop.is_set():
+            try:
+                out.put(item, timeout=PUBLISH_INTERVAL_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(
+        self, name: str, source: queue.Queue, on_idle: Callable[[], Any] = lambda: None
+    ) -> Iterator[Any]:
+        """Items from `source` until its end marker (or a stop); time blocked goes to waited_s."""
+        self.waited_s.setdefault(name, 0.0)
+        while not self.stop.is_set():
+            started = time.perf_counter()
+            try:
+                item = source.get(timeout=PUBLISH_INTERVAL_S)
+            except queue.Empty:
+                on_idle()
+                continue
+            finally:
+                self.waited_s[name] += time.perf_counter() - started
+            if item is _END:
+                return
+            yield item
+
+
+def _pump(name: str, batches: Iterator[Rows], out: queue.Queue, run: _Run,
+          counter: Dict[str, int]) -> None:
+    """Stage thread: moves batches from `batches` to `out`, counting rows."""
+    busy = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            batch = next(batches, _END)
+            busy += time.perf_counter() - started
+            if batch is _END or not run.put(out, batch):
+                break
+            counter[name] += len(batch)
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        run.fail(err)
+    finally:
+        run.busy_s[name] = busy - run.waited_s.get(name, 0.0)
+        run.put(out, _END)
+
+
+def run_pipeline(  # pylint: disable=too-many-arguments,too-many-locals
+    source: Iterable[Rows],
+    clean: Callable[[Iterable[Rows]], Iterable[Rows]],
+    loader: StreamingLoad,
+    progress: PipelineProgress,
+    total: Optional[int] = None,
+    *,
+    queue_batches: int = PIPELINE_QUEUE_BATCHES,
+    load_batch_rows: int = LOAD_BATCH_ROWS,
+) -> Dict[str, Any]:
+    """
+    Streams batches of scraped rows from `source` through `clean` into
+    `loader` (LOAD_BATCH_ROWS rows per write), publishing rows cleaned and
+    loaded to `progress`. Returns rows loaded, wall seconds and each
+    stage's busy seconds; re-raises the first stage error.
+    """
+    run = _Run()
+    scraped: queue.Queue = queue.Queue(queue_batches)
+    cleaned: queue.Queue = queue.Queue(queue_batches)
+    counter = {"scrape": 0, "clean": 0}
+    started = time.perf_counter()
+
+    def report(force: bool = False) -> None:
+        progress.counters["rows_cleaned"] = counter["clean"]
+        progress.update(loader.loaded, total, force=force, rows_loaded=loader.loaded)
+
+    threads = [
+        threading.Thread(target=_pump, daemon=True,
+                         args=("scrape", iter(source), scraped, run, counter)),
+        threading.Thread(target=_pump, daemon=True,
+                         args=("clean", iter(clean(run.drain("clean", scraped))), cleaned, run,
+                               counter)),
+    ]
+    for thread in threads:
+        thread.start()
+
+    busy = 0.0
+    pending: Rows = []
+    try:
+        for batch in run.drain("load", cleaned, on_idle=report):
+            pending.extend(to_raw_row(row) for row in batch)
+            if len(pending) >= load_batch_rows:
+                write_started = time.perf_counter()
+                loader.write(pending)
+                busy += time.perf_counter() - write_started
+                pending = []
+                report()
+        if run.error is not None:
+            raise run.error
+        write_started = time.perf_counter()
+        if pending:
+            loader.write(pending)
+        loaded = loader.finish()
+        busy += time.perf_counter() - write_started
+        report(force=True)
+    except BaseException as err:
+        run.fail(err)
+        loader.abort()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+
+    return {
+        "scraped": counter["scrape"],
+        "cleaned": counter["clean"],
+        "loaded": loaded,
+        "seconds": time.perf_counter() - started,
+        "busy_s": {**run.busy_s, "load": busy},
+    }
+
+
+def _scraped_batches(
+    scraper: GradCafeScraper, target: int, progress: PipelineProgress
+) -> Iterator[Rows]:
+    """Rows saved by earlier scrapes first (the load covers them too), then each new page."""
+    saved = list(scraper.results)
+    if saved:
+        yield saved
+    for entries in scraper.iter_pages(target):
+        progress.counters["pages_fetched"] += 1
+        yield entries
+
+
+def run_pull_pipeline(
+    reset: bool, progress: PipelineProgress, target: int = SCRAPE_TARGET
+) -> Dict[str, Any]:
+    """
+    The Pull Data job: scrape (resuming from applicant_data.json), clean
+    and load in one streaming pass, then write the cleaned rows to
+    llm_extend_applicant_data.json as clean.py would. With reset the table
+    is replaced (shadow swap) by everything scraped so far.
+    """
+    scraper = GradCafeScraper()
+    cleaner = DataCleaner()
+    kept: Rows = []
+
+    def clean(batches: Iterable[Rows]) -> Iterator[Rows]:
+        for rows in cleaner.clean_batches(batches):
+            kept.extend(rows)
+            yield rows
+
+    stats = run_pipeline(
+        _scraped_batches(scraper, target, progress), clean, StreamingLoad(reset), progress,
+        total=max(target, len(scraper.results)),
+    )
+    if kept:
+        cleaner.save_output(kept)
+    return stats
@@ -1,16 +1,52 @@
 """
 query_data.py — Module 5
-Runs SQL analysis queries for the Flask /analysis page.
+Runs SQL analysis queries for the Flask /analysis page and /api/analysis.
 """
 
 from __future__ import annotations
-from typing import Any, Dict, List
+import functools
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import psycopg
 from psycopg import sql
-from db import get_cursor
+import columnar
+from db import get_pooled_cursor
+from metrics import QUERY_ROWS, QUERY_SECONDS
 
 # Software Assurance Constant (Rule 6: Limit the number of rows evaluated)
 MAX_ALLOWED_LIMIT = 100
 
+# Each question may run this long (server-side statement_timeout) before it
+# is shown as "N/A"; QUERY_WORKERS questions run at once on pooled connections.
+QUERY_TIMEOUT_S = float(os.getenv("QUERY_TIMEOUT_S", "5"))
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "4"))
+_EXECUTOR = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+SET_TIMEOUT_SQL = "SELECT set_config('statement_timeout', %s, true)"
+
+# A question's SQL slower than SLOW_QUERY_MS is logged; with
+# SLOW_QUERY_EXPLAIN=1 it is re-run under EXPLAIN (ANALYZE, BUFFERS) for the log.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"
+LOG = logging.getLogger(__name__)
+
+# Results for this many cohorts are kept between loads (see CohortCache)
+COHORT_CACHE_SIZE = int(os.getenv("COHORT_CACHE_SIZE", "128"))
+COHORT_VALUE_MAX_LEN = 200
+DEFAULT_TERM = "Fall 2025"
+# Cohort field -> the column it matches; universities use the LLM-standardized name
+COHORT_COLUMNS = {"term": "term", "university": "llm_generated_university", "degree": "degree"}
+YEAR_RE = re.compile(r"\d{4}")
+# ColumnStore mask kind -> SQL operator for Cohort.conditions()
+CONDITION_OPERATORS = {"ilike": "ILIKE", "equals": "="}
+
 def clamp_limit(requested: int) -> int:
     """Clamps the limit to the instructor-required range (1–100)."""
     return max(1, min(requested, MAX_ALLOWED_LIMIT))
@@ -19,31 +55,161 @@ def format_percentage(value: Any) -> str:
     """Helper to add a % sign if the value exists."""
     return f"{value}%" if value is not None else "0%"
 
-def get_q1() -> Dict[str, Any]:
-    """Query 1: Total applications for Fall 2025."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("SELECT COUNT(*) FROM {table} WHERE term ILIKE %s LIMIT {lim}").format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
+class Cohort(NamedTuple):
+    """
+    The applicants a question set runs over; None means "any".
+    The term also stands in for DEFAULT_TERM in the per-term questions, and
+    its year sets q8/q9's date range; their school list stays fixed.
+    """
+    term: Optional[str] = None
+    university: Optional[str] = None
+    degree: Optional[str] = None
+
+    @property
+    def term_label(self) -> str:
+        """The term the per-term questions ask about."""
+        return self.term or DEFAULT_TERM
+
+    @property
+    def term_like(self) -> str:
+        """ILIKE pattern for term_label."""
+        return f"{self.term_label}%"
+
+    @property
+    def term_year(self) -> int:
+        """The year named in term_label (DEFAULT_TERM's if it names none)."""
+        match = YEAR_RE.search(self.term_label) or YEAR_RE.search(DEFAULT_TERM)
+        return int(match.group())
+
+    def filters(self) -> Dict[str, str]:
+        """{column: value} equality filters for the fields that are set."""
+        values = {"term": self.term, "university": self.university, "degree": self.degree}
+        return {COHORT_COLUMNS[field]: value for field, value in values.items() if value}
+
+    def conditions(self) -> Dict[str, Tuple[str, str]]:
+        """
+        {column: (kind, value)} for the questions' cohort table: the term is
+        the same ILIKE prefix the per-term questions match, the rest equality.
+        """
+        return {
+            column: ("ilike", self.term_like) if column == COHORT_COLUMNS["term"]
+            else ("equals", value)
+            for column, value in self.filters().items()
+        }
+
+ALL_APPLICANTS = Cohort()
+
+class Statement(NamedTuple):
+    """A question's SQL, composed once at import; `text` is also what the page displays."""
+    composed: sql.Composed
+    text: str
+    template: str
+    limit: int
+
+def _cohort_table(cohort: Cohort) -> sql.Composable:
+    """applicants, or a derived table of the cohort's rows under the same name."""
+    table = sql.Identifier("applicants")
+    conditions = cohort.conditions()
+    if not conditions:
+        return table
+    # The text is executed with %s parameters, so a literal's % is doubled
+    where = sql.SQL(" AND ").join(
+        sql.SQL("{} {} {}").format(
+            sql.Identifier(column), sql.SQL(CONDITION_OPERATORS[kind]),
+            sql.SQL(sql.Literal(value).as_string(None).replace("%", "%%")),
+        )
+        for column, (kind, value) in conditions.items()
     )
-    with get_cursor() as cur:
-        cur.execute(stmt, ("Fall 2025%",))
+    return sql.SQL("(SELECT * FROM {} WHERE {}) AS {}").format(table, where, table)
+
+def _compose(template: str, limit: int, cohort: Cohort = ALL_APPLICANTS) -> Statement:
+    """Fills {table}/{lim} into a question template and renders it once."""
+    composed = sql.SQL(template).format(
+        table=_cohort_table(cohort),
+        lim=sql.Literal(clamp_limit(limit))
+    )
+    return Statement(composed, composed.as_string(None), template, limit)
+
+@functools.lru_cache(maxsize=1024)
+def _cohort_statement(template: str, limit: int, cohort: Cohort) -> Statement:
+    """A question's SQL over a cohort, rendered once per (question, cohort)."""
+    return _compose(template, limit, cohort)
+
+def for_cohort(stmt: Statement, cohort: Cohort) -> Statement:
+    """`stmt` restricted to the cohort's applicants (itself for ALL_APPLICANTS)."""
+    if not cohort.filters():
+        return stmt
+    return _cohort_statement(stmt.template, stmt.limit, cohort)
+
+def _fetch(
+    stmt: Statement, params: Sequence[Any] = (), cohort: Cohort = ALL_APPLICANTS
+) -> Tuple[List[Any], str]:
+    """
+    Runs one question on a pooled connection; returns (rows, display SQL).
+    prepare=True makes each pooled connection parse/plan a question once
+    and reuse that server-side prepared statement on later requests.
+    """
+    name = STATEMENT_NAMES.get(stmt.text, "other")
+    stmt = for_cohort(stmt, cohort)
+    with get_pooled_cursor() as cur:
+        cur.execute(SET_TIMEOUT_SQL, (str(int(QUERY_TIMEOUT_S * 1000)),), prepare=True)
+        started = time.perf_counter()
+        cur.execute(stmt.text, params, prepare=True)
         rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+        elapsed_ms = 1000 * (time.perf_counter() - started)
+        QUERY_ROWS.observe(name, len(rows))
+        if elapsed_ms >= SLOW_QUERY_MS:
+            _log_slow_query(cur, name, stmt, params, elapsed_ms)
+    return rows, stmt.text
+
+def _log_slow_query(
+    cur: psycopg.Cursor, name: str, stmt: Statement, params: Sequence[Any], elapsed_ms: float
+) -> None:
+    """Logs a slow question, with its EXPLAIN (ANALYZE, BUFFERS) plan if opted in."""
+    plan = ""
+    if SLOW_QUERY_EXPLAIN:
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + stmt.text, params)
+            plan = "\n" + "\n".join(row[0] for row in cur.fetchall())
+        except psycopg.Error as err:
+            plan = f"\nEXPLAIN failed: {err}"
+    LOG.warning("Slow query %s: %.1f ms\n%s%s", name, elapsed_ms, stmt.text, plan)
+
+def _timed(query: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """Records a get_qN's wall time in metrics.QUERY_SECONDS under its id (q1…)."""
+    name = query.__name__.removeprefix("get_")
+
+    @functools.wraps(query)
+    def timed(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return query(*args, **kwargs)
+        finally:
+            QUERY_SECONDS.observe(name, time.perf_counter() - started)
+    return timed
+
+# How a question gets its rows: _fetch, or a column-store stand-in
+Fetch = Callable[..., Tuple[List[Any], str]]
+
+Q1_SQL = _compose("SELECT COUNT(*) FROM {table} WHERE term ILIKE %s LIMIT {lim}", 1)
+
+@_timed
+def get_q1(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 1: Total applications for Fall 2025."""
+    rows, display_sql = (fetch or _fetch)(Q1_SQL, (cohort.term_like,), cohort)
 
     ans = rows[0][0] if rows else 0
     return {
         "id": "q1",
-        "question": "How many total applications were submitted for the Fall 2025 term?",
+        "question": f"How many total applications were submitted for the {cohort.term_label} term?",
         "answer": f"{ans} applications",
         "sql": display_sql,
-        "explanation": "Counts all rows where the term starts with 'Fall 2025'.",
+        "explanation": f"Counts all rows where the term starts with '{cohort.term_label}'.",
     }
 
-def get_q2() -> Dict[str, Any]:
-    """Query 2: Percentage of international applicants."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q2_SQL = _compose("""
         SELECT
             CASE
                 WHEN (SELECT COUNT(*) FROM {table}) = 0 THEN 0
@@ -58,14 +224,14 @@ def get_q2() -> Dict[str, Any]:
                 2)
             END
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
-    with get_cursor() as cur:
-        cur.execute(stmt, ("American%", "Other%"))
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    """, 1)
+
+@_timed
+def get_q2(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 2: Percentage of international applicants."""
+    rows, display_sql = (fetch or _fetch)(Q2_SQL, ("American%", "Other%"), cohort)
 
     ans = rows[0][0] if rows else 0
     return {
@@ -76,10 +242,7 @@ def get_q2() -> Dict[str, Any]:
         "explanation": "Calculates ratio of non-American/non-Other entries to the total.",
     }
 
-def get_q3() -> Dict[str, Any]:
-    """Query 3: Average GPA and GRE scores."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q3_SQL = _compose("""
         SELECT
             ROUND(AVG(gpa)::numeric, 2) AS avg_gpa,
             ROUND(AVG(gre)::numeric, 2) AS avg_gre_q,
@@ -88,14 +251,14 @@ def get_q3() -> Dict[str, Any]:
         FROM {table}
         WHERE gpa IS NOT NULL OR gre IS NOT NULL OR gre_v IS NOT NULL OR gre_aw IS NOT NULL
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
-    with get_cursor() as cur:
-        cur.execute(stmt)
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    """, 1)
+
+@_timed
+def get_q3(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 3: Average GPA and GRE scores."""
+    rows, display_sql = (fetch or _fetch)(Q3_SQL, (), cohort)
 
     avg_gpa, avg_q, avg_v, avg_aw = rows[0] if rows else (None, None, None, None)
     ans_lines = [
@@ -112,38 +275,35 @@ def get_q3() -> Dict[str, Any]:
         "explanation": "Computes the mean for GPA and all three GRE components.",
     }
 
-def get_q4() -> Dict[str, Any]:
-    """Query 4: Average GPA of American Fall 2025 applicants."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q4_SQL = _compose("""
         SELECT ROUND(AVG(gpa)::numeric, 2)
         FROM {table}
         WHERE us_or_international ILIKE %s
           AND term ILIKE %s
           AND gpa IS NOT NULL
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
-    with get_cursor() as cur:
-        cur.execute(stmt, ("American%", "Fall 2025%"))
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    """, 1)
+
+@_timed
+def get_q4(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 4: Average GPA of American Fall 2025 applicants."""
+    rows, display_sql = (fetch or _fetch)(Q4_SQL, ("American%", cohort.term_like), cohort)
 
     ans = rows[0][0] if rows else None
     return {
         "id": "q4",
-        "question": "What is the average GPA of American students who applied for Fall 2025?",
+        "question": (
+            "What is the average GPA of American students who applied for "
+            f"{cohort.term_label}?"
+        ),
         "answer": f"{ans}" if ans is not None else "N/A",
         "sql": display_sql,
         "explanation": "Filters by citizenship and term before averaging GPA.",
     }
 
-def get_q5() -> Dict[str, Any]:
-    """Query 5: Overall acceptance rate for Fall 2025."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q5_SQL = _compose("""
         WITH fall AS (SELECT COUNT(*) AS n_fall FROM {table} WHERE term ILIKE %s),
         acc AS (SELECT COUNT(*) AS n_acc FROM {table} WHERE term ILIKE %s AND status ILIKE %s)
         SELECT
@@ -151,67 +311,65 @@ def get_q5() -> Dict[str, Any]:
             (SELECT n_fall FROM fall),
             ROUND(100.0 * (SELECT n_acc FROM acc) / NULLIF((SELECT n_fall FROM fall), 0), 2)
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
+    """, 1)
+
+@_timed
+def get_q5(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 5: Overall acceptance rate for Fall 2025."""
+    rows, display_sql = (fetch or _fetch)(
+        Q5_SQL, (cohort.term_like, cohort.term_like, "Accepted%"), cohort
     )
-    with get_cursor() as cur:
-        cur.execute(stmt, ("Fall 2025%", "Fall 2025%", "Accepted%"))
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
 
     acc_count, fall_count, percent = rows[0] if rows else (0, 0, 0)
     return {
         "id": "q5",
-        "question": "What is the overall acceptance rate for the Fall 2025 term?",
+        "question": f"What is the overall acceptance rate for the {cohort.term_label} term?",
         "answer": f"{format_percentage(percent)} ({acc_count} accepted out of {fall_count})",
         "sql": display_sql,
-        "explanation": "Compares accepted counts against total Fall 2025 applications.",
+        "explanation": f"Compares accepted counts against total {cohort.term_label} applications.",
     }
 
-def get_q6() -> Dict[str, Any]:
-    """Query 6: Average GPA of accepted Fall 2025 students."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q6_SQL = _compose("""
         SELECT ROUND(AVG(gpa)::numeric, 2)
         FROM {table}
         WHERE term ILIKE %s AND status ILIKE %s AND gpa IS NOT NULL
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
-    with get_cursor() as cur:
-        cur.execute(stmt, ("Fall 2025%", "Accepted%"))
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    """, 1)
+
+@_timed
+def get_q6(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 6: Average GPA of accepted Fall 2025 students."""
+    rows, display_sql = (fetch or _fetch)(Q6_SQL, (cohort.term_like, "Accepted%"), cohort)
 
     ans = rows[0][0] if rows else None
     return {
         "id": "q6",
-        "question": "What is the average GPA of students who were accepted for Fall 2025?",
+        "question": (
+            f"What is the average GPA of students who were accepted for {cohort.term_label}?"
+        ),
         "answer": f"{ans}" if ans is not None else "N/A",
         "sql": display_sql,
         "explanation": "Averages GPA for the subset of students with an 'Accepted' status.",
     }
 
-def get_q7() -> Dict[str, Any]:
-    """Query 7: CS Masters applicants to JHU."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q7_SQL = _compose("""
         SELECT COUNT(*) FROM {table}
         WHERE (university ILIKE %s OR university ILIKE %s)
           AND degree ILIKE %s AND program ILIKE %s
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
+    """, 1)
+
+@_timed
+def get_q7(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 7: CS Masters applicants to JHU."""
     params = ("%Johns Hopkins%", "%JHU%", "Master%", "%Computer%Science%")
-    with get_cursor() as cur:
-        cur.execute(stmt, params)
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    rows, display_sql = (fetch or _fetch)(Q7_SQL, params, cohort)
 
     ans = rows[0][0] if rows else 0
     return {
@@ -222,43 +380,46 @@ def get_q7() -> Dict[str, Any]:
         "explanation": "Filters by university name variations, degree level, and program.",
     }
 
-def get_q8() -> Dict[str, Any]:
-    """Query 8: CS PhD accepted to specific top schools."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+def _year_bounds(cohort: Cohort) -> Tuple[str, str]:
+    """date_added bounds (inclusive, exclusive) of the year of the cohort's term."""
+    return f"{cohort.term_year}-01-01", f"{cohort.term_year + 1}-01-01"
+
+Q8_SQL = _compose("""
         SELECT COUNT(*) FROM {table}
         WHERE date_added >= %s::date AND date_added < %s::date
           AND status ILIKE %s AND degree ILIKE %s AND program ILIKE %s
           AND (university ILIKE %s OR university = %s OR university ILIKE %s
                OR university ILIKE %s OR university ILIKE %s)
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
+    """, 1)
+
+@_timed
+def get_q8(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 8: CS PhD accepted to specific top schools."""
     params = (
-        "2025-01-01", "2026-01-01", "Accepted%", "PhD%", "%Computer%Science%",
+        *_year_bounds(cohort), "Accepted%", "PhD%", "%Computer%Science%",
         "%Georgetown University%", "MIT", "%Massachusetts Institute of Technology%",
         "%Stanford University%", "%Carnegie Mellon University%",
     )
-    with get_cursor() as cur:
-        cur.execute(stmt, params)
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    rows, display_sql = (fetch or _fetch)(Q8_SQL, params, cohort)
 
     ans = rows[0][0] if rows else 0
     return {
         "id": "q8",
-        "question": "How many CS PhD applicants were accepted to top schools in 2025?",
+        "question": (
+            f"How many CS PhD applicants were accepted to top schools in {cohort.term_year}?"
+        ),
         "answer": f"{ans} entries",
         "sql": display_sql,
-        "explanation": "Filters by top-tier universities, PhD degree, and 2025 date range.",
+        "explanation": (
+            f"Filters by a fixed list of top-tier universities, PhD degree, and the "
+            f"{cohort.term_year} date range (the year of the cohort's term)."
+        ),
     }
 
-def get_q9() -> Dict[str, Any]:
-    """Query 9: Comparison of CS PhD acceptances."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q9_SQL = _compose("""
         WITH raw_c AS (
             SELECT COUNT(*) AS d_f FROM {table}
             WHERE date_added >= %s::date AND date_added < %s::date
@@ -276,19 +437,19 @@ def get_q9() -> Dict[str, Any]:
         )
         SELECT d_f, l_f, (l_f - d_f) FROM raw_c, llm_c
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
+    """, 1)
+
+@_timed
+def get_q9(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 9: Comparison of CS PhD acceptances."""
     p_params = (
-        "2025-01-01", "2026-01-01", "Accepted%", "PhD%", "%Computer%Science%",
+        *_year_bounds(cohort), "Accepted%", "PhD%", "%Computer%Science%",
         "%Georgetown University%", "MIT", "%Massachusetts Institute of Technology%",
         "%Stanford University%", "%Carnegie Mellon University%"
     )
-    with get_cursor() as cur:
-        cur.execute(stmt, p_params + p_params)
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    rows, display_sql = (fetch or _fetch)(Q9_SQL, p_params + p_params, cohort)
 
     raw_f, llm_f, diff = rows[0] if rows else (0, 0, 0)
     return {
@@ -296,24 +457,24 @@ def get_q9() -> Dict[str, Any]:
         "question": "How does acceptance compare between downloaded and LLM fields?",
         "answer": f"Raw: {raw_f}\nLLM: {llm_f}\nDifference: {diff}",
         "sql": display_sql,
-        "explanation": "Compares data extracted from original fields vs. LLM-enriched fields.",
+        "explanation": (
+            "Compares question 8's count on the original fields vs. the LLM-enriched "
+            f"fields ({cohort.term_year})."
+        ),
     }
 
-def get_q10() -> Dict[str, Any]:
-    """Query 10: Academic program volume."""
-    limit_val = clamp_limit(1)
-    stmt = sql.SQL("""
+Q10_SQL = _compose("""
         SELECT COALESCE(llm_generated_program, program) AS prog, COUNT(*) AS c
         FROM {table} GROUP BY prog ORDER BY c DESC
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
-    with get_cursor() as cur:
-        cur.execute(stmt)
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    """, 1)
+
+@_timed
+def get_q10(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 10: Academic program volume."""
+    rows, display_sql = (fetch or _fetch)(Q10_SQL, (), cohort)
 
     ans = f"{rows[0][0]} ({rows[0][1]} entries)" if rows else "N/A"
     return {
@@ -324,10 +485,7 @@ def get_q10() -> Dict[str, Any]:
         "explanation": "Groups by program and returns the single most common program.",
     }
 
-def get_q11() -> Dict[str, Any]:
-    """Query 11: GRE Quant comparison PhD vs Masters."""
-    limit_val = clamp_limit(5)
-    stmt = sql.SQL("""
+Q11_SQL = _compose("""
         SELECT
             CASE
                 WHEN degree ILIKE %s THEN 'PhD'
@@ -338,15 +496,15 @@ def get_q11() -> Dict[str, Any]:
         FROM {table} WHERE gre IS NOT NULL AND (degree ILIKE %s OR degree ILIKE %s)
         GROUP BY 1 ORDER BY 1
         LIMIT {lim}
-    """).format(
-        table=sql.Identifier("applicants"),
-        lim=sql.Literal(limit_val)
-    )
+    """, 5)
+
+@_timed
+def get_q11(
+    fetch: Optional[Fetch] = None, cohort: Cohort = ALL_APPLICANTS
+) -> Dict[str, Any]:
+    """Query 11: GRE Quant comparison PhD vs Masters."""
     params = ("PhD%", "Master%", "PhD%", "Master%")
-    with get_cursor() as cur:
-        cur.execute(stmt, params)
-        rows = cur.fetchall()
-        display_sql = stmt.as_string(cur)
+    rows, display_sql = (fetch or _fetch)(Q11_SQL, params, cohort)
 
     ans = "\n".join([f"{deg}: {score}" for deg, score in rows]) if rows else "N/A"
     return {
@@ -357,9 +515,129 @@ def get_q11() -> Dict[str, Any]:
         "explanation": "Groups GRE(Q) averages by degree type.",
     }
 
-def get_analysis() -> List[Dict[str, Any]]:
-    """Restores the function needed by app.py and pdf generator."""
-    return [
-        get_q1(), get_q2(), get_q3(), get_q4(), get_q5(),
-        get_q6(), get_q7(), get_q8(), get_q9(), get_q10(), get_q11()
-    ]
+QUERIES: Tuple[Callable[..., Dict[str, Any]], ...] = (
+    get_q1, get_q2, get_q3, get_q4, get_q5, get_q6, get_q7, get_q8, get_q9, get_q10, get_q11
+)
+
+# Metric label for each question's SQL
+STATEMENT_NAMES: Dict[str, str] = {
+    stmt.text: f"q{i}" for i, stmt in enumerate(
+        (Q1_SQL, Q2_SQL, Q3_SQL, Q4_SQL, Q5_SQL, Q6_SQL, Q7_SQL, Q8_SQL, Q9_SQL, Q10_SQL, Q11_SQL),
+        start=1,
+    )
+}
+
+# The NumPy equivalent of each question's SQL (used with ANALYTICS_ENGINE=numpy)
+COLUMNAR_ROWS: Dict[str, Callable[..., List[Any]]] = {
+    Q1_SQL.text: columnar.q1_rows, Q2_SQL.text: columnar.q2_rows,
+    Q3_SQL.text: columnar.q3_rows, Q4_SQL.text: columnar.q4_rows,
+    Q5_SQL.text: columnar.q5_rows, Q6_SQL.text: columnar.q6_rows,
+    Q7_SQL.text: columnar.q7_rows, Q8_SQL.text: columnar.q8_rows,
+    Q9_SQL.text: columnar.q9_rows, Q10_SQL.text: columnar.q10_rows,
+    Q11_SQL.text: columnar.q11_rows,
+}
+
+def columnar_fetch(store: columnar.ColumnStore, cohort: Cohort = ALL_APPLICANTS) -> Fetch:
+    """A Fetch that answers from `store` (restricted to `cohort`) instead of the database."""
+    conditions = cohort.conditions()
+    if conditions:
+        store = store.restrict(conditions)
+
+    def fetch(
+        stmt: Statement, params: Sequence[Any] = (), cohort: Cohort = ALL_APPLICANTS
+    ) -> Tuple[List[Any], str]:
+        return COLUMNAR_ROWS[stmt.text](store, params), for_cohort(stmt, cohort).text
+    return fetch
+
+def _unavailable(query: Callable[[], Dict[str, Any]], reason: str) -> Dict[str, Any]:
+    """Placeholder card for a question that failed or timed out."""
+    return {
+        "id": query.__name__.removeprefix("get_"),
+        "question": (query.__doc__ or "").split(": ", 1)[-1],
+        "answer": "N/A",
+        "sql": "",
+        "explanation": reason,
+    }
+
+def get_analysis(cohort: Cohort = ALL_APPLICANTS) -> List[Dict[str, Any]]:
+    """
+    Runs q1–q11 concurrently over `cohort` and returns them in question order.
+    A question that errors or exceeds QUERY_TIMEOUT_S degrades to "N/A"
+    instead of failing the page. With the column store enabled the
+    questions are answered in-process and none of that is needed.
+    """
+    store = columnar.current_store()
+    if store is not None:
+        fetch = columnar_fetch(store, cohort)
+        return [query(fetch, cohort) for query in QUERIES]
+    futures = [_EXECUTOR.submit(query, None, cohort) for query in QUERIES]
+    # Queued questions start late: one timeout per wave of workers, plus one
+    # more for connection setup before the server-side timeout can fire
+    waves = math.ceil(len(QUERIES) / QUERY_WORKERS)
+    deadline = time.monotonic() + QUERY_TIMEOUT_S * (waves + 1)
+    results = []
+    for query, future in zip(QUERIES, futures):
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeout:
+            future.cancel()
+            results.append(_unavailable(query, f"Timed out after {QUERY_TIMEOUT_S:g}s."))
+        except psycopg.errors.QueryCanceled:
+            results.append(_unavailable(query, f"Timed out after {QUERY_TIMEOUT_S:g}s."))
+        except psycopg.Error:
+            results.append(_unavailable(query, "Query failed."))
+    return results
+
+
+class CohortCache:
+    """
+    Bounded LRU of get_analysis() results per cohort. Every load clears it;
+    a result computed across a clear is dropped rather than cached stale.
+    """
+
+    def __init__(self, max_size: int = COHORT_CACHE_SIZE) -> None:
+        self.max_size = max(1, max_size)
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+        self.generation = 0
+        self._entries: OrderedDict = OrderedDict()  # cohort -> cards
+        self._lock = threading.Lock()
+
+    def get(self, cohort: Cohort) -> Optional[List[Dict[str, Any]]]:
+        """A copy of the cached cards (refreshing recency) or None."""
+        with self._lock:
+            cards = self._entries.get(cohort)
+            if cards is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(cohort)
+            self.counters["hits"] += 1
+            return [dict(card) for card in cards]
+
+    def put(self, cohort: Cohort, cards: List[Dict[str, Any]], generation: int) -> None:
+        """Caches cards computed during `generation`, evicting the least recently used."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[cohort] = [dict(card) for card in cards]
+            self._entries.move_to_end(cohort)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drops every cohort (called after each load)."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+COHORT_CACHE = CohortCache()
+
+def get_cohort_analysis(cohort: Cohort) -> List[Dict[str, Any]]:
+    """get_analysis(cohort) through COHORT_CACHE; degraded ("N/A") results are not cached."""
+    cards = COHORT_CACHE.get(cohort)
+    if cards is None:
+        generation = COHORT_CACHE.generation
+        cards = get_analysis(cohort)
+        if all(card["sql"] for card in cards):
+            COHORT_CACHE.put(cohort, cards, generation)
+    return cards
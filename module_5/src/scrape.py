@@ -200,6 +200,15 @@ class GradCafeScraper:
 
     def scrape_data(self, target_count: int = 30000):
         """Main multi-threaded execution method."""
+        for _ in self.iter_pages(target_count):
+            pass
+
+    def iter_pages(self, target_count: int = 30000):
+        """
+        Scrapes like scrape_data(), yielding the new records of each finished
+        page (possibly none) as soon as it is parsed, so a consumer can
+        process them while later pages download. Saves as scrape_data() does.
+        """
         pages_done, consecutive_bad = 0, 0
         next_page = self.config["start_page"]
 
@@ -213,6 +222,7 @@ class GradCafeScraper:
                 for fut in done:
                     pages_done += 1
                     _, entries, status = fut.result()
+                    new_items = []
                     if status == "ok" and entries:
                         consecutive_bad = 0
                         with self._lock:
@@ -221,6 +231,7 @@ class GradCafeScraper:
                                 if rid and rid not in self._seen_ids:
                                     self._seen_ids.add(rid)
                                     self.results.append(item)
+                                    new_items.append(item)
                     else:
                         consecutive_bad += 1
 
@@ -231,6 +242,8 @@ class GradCafeScraper:
                     if consecutive_bad < 20 and len(self.results) < target_count:
                         in_flight.add(ex.submit(self._parse_page, next_page))
                         next_page += 1
+                    # After queueing the next page, so downloads go on while the consumer works
+                    yield new_items
         self.save_data()
 
     def _print_progress(self, current, total, pages):
@@ -0,0 +1,91 @@
+"""
+search_data.py — Module 5
+Full-text search over applicant comments for /api/search.
+
+Matches use the comments_tsv column (generated at load time, GIN-indexed
+in load_data.py), so a search reads only the matching rows instead of
+scanning every comment with ILIKE. Hits come back best first by ts_rank
+with an HTML-escaped snippet, matched words wrapped in <mark>.
+"""
+
+from __future__ import annotations
+
+import html
+from typing import Any, Dict, List, Tuple
+
+from psycopg import sql
+
+from db import get_pooled_cursor
+from load_data import SEARCH_CONFIG
+from query_data import ALL_APPLICANTS, QUERY_TIMEOUT_S, SET_TIMEOUT_SQL, Cohort
+
+DEFAULT_SEARCH_ROWS = 20
+MAX_SEARCH_ROWS = 100
+SEARCH_QUERY_MAX_LEN = 200
+# Private-use characters mark the matches so the comment text can be
+# escaped before the <mark> tags go in
+START_SEL, STOP_SEL = "\ue000", "\ue001"
+HEADLINE_OPTIONS = (
+    f'StartSel="{START_SEL}", StopSel="{STOP_SEL}", MaxWords=30, MinWords=10, MaxFragments=2'
+)
+RESULT_FIELDS = ("p_id", "university", "program", "term", "degree", "date_added")
+
+
+def search_query(cohort: Cohort) -> sql.Composed:
+    """
+    SELECT for the top hits: the ranked rows are limited first, so
+    ts_headline (which re-parses the comment) runs only on those.
+    Parameters: search text, cohort filter values, limit, headline options.
+    """
+    conditions = [sql.SQL("comments_tsv @@ query")] + [
+        sql.SQL("{} = %s").format(sql.Identifier(column)) for column in cohort.filters()
+    ]
+    return sql.SQL("""
+SELECT {fields}, rank, ts_headline({config}, comments, query, %s) AS snippet
+FROM (
+    SELECT {fields}, comments, query, ts_rank(comments_tsv, query) AS rank
+    FROM {table}, websearch_to_tsquery({config}, %s) AS query
+    WHERE {conditions}
+    ORDER BY rank DESC, p_id DESC
+    LIMIT %s
+) AS hits
+ORDER BY rank DESC, p_id DESC
+""").format(
+        fields=sql.SQL(", ").join(map(sql.Identifier, RESULT_FIELDS)),
+        config=sql.Literal(SEARCH_CONFIG),
+        table=sql.Identifier("applicants"),
+        conditions=sql.SQL(" AND ").join(conditions),
+    )
+
+
+def search_params(text: str, cohort: Cohort, limit: int) -> Tuple[Any, ...]:
+    """Parameters for search_query(), in placeholder order."""
+    return (HEADLINE_OPTIONS, text, *cohort.filters().values(), limit)
+
+
+def search(
+    text: str, cohort: Cohort = ALL_APPLICANTS, limit: int = DEFAULT_SEARCH_ROWS
+) -> List[Dict[str, Any]]:
+    """
+    Applicants whose comments match `text` (web-search syntax: words,
+    "quoted phrases", or, -exclusions), best match first.
+    """
+    limit = max(1, min(limit, MAX_SEARCH_ROWS))
+    with get_pooled_cursor(dict_rows=True) as cur:
+        cur.execute(SET_TIMEOUT_SQL, (str(int(QUERY_TIMEOUT_S * 1000)),), prepare=True)
+        cur.execute(search_query(cohort), search_params(text, cohort, limit))
+        rows = cur.fetchall()
+    for row in rows:
+        row["date_added"] = row["date_added"] and row["date_added"].isoformat()
+        row["rank"] = round(row["rank"], 4)
+        row["snippet"] = highlight(row["snippet"])
+    return rows
+
+
+def highlight(snippet: str) -> str:
+    """Escapes the headline text, then turns the match markers into <mark> tags."""
+    return (
+        html.escape(snippet)
+        .replace(START_SEL, "<mark>")
+        .replace(STOP_SEL, "</mark>")
+    )
@@ -42,4 +42,49 @@ def test_q3_averages_coverage(db_cursor):
             found_averages = True
             break
             
-    assert found_averages is True
\ No newline at end of file
+    assert found_averages is True
+
+@pytest.mark.analysis
+def test_get_analysis_degrades_slow_and_failing_questions(db_cursor, monkeypatch):
+    """Questions keep their order; a timeout or DB error shows "N/A" for that card only."""
+    import time
+    import psycopg
+    from unittest.mock import patch
+
+    def get_q90(*_args):
+        """Query 90: Sleeps past the client-side deadline."""
+        time.sleep(0.5)
+
+    def get_q91(*_args):
+        """Query 91: Runs longer than statement_timeout."""
+        query_data._fetch(query_data._compose("SELECT pg_sleep(1)", 1))
+
+    def get_q92(*_args):
+        """Query 92: Broken SQL."""
+        raise psycopg.errors.UndefinedTable("no such table")
+
+    monkeypatch.setattr(query_data, "QUERY_TIMEOUT_S", 0.1)
+    with patch.object(query_data, "QUERIES", (query_data.get_q1, get_q90, get_q91, get_q92)):
+        results = query_data.get_analysis()
+
+    assert [r["id"] for r in results] == ["q1", "q90", "q91", "q92"]
+    assert results[0]["answer"] == "0 applications"
+    assert [r["answer"] for r in results[1:]] == ["N/A"] * 3
+    assert results[1]["question"] == "Sleeps past the client-side deadline."
+    assert results[2]["explanation"] == "Timed out after 0.1s."
+    assert results[3]["explanation"] == "Query failed."
+
+
+@pytest.mark.analysis
+def test_statements_are_composed_once_and_survive_a_table_swap(db_cursor):
+    """Display SQL is rendered at import; prepared statements replan after a reset load."""
+    from load_data import load_rows
+
+    assert query_data.get_q1()["sql"] is query_data.Q1_SQL.text
+    assert query_data.Q1_SQL.text == (
+        'SELECT COUNT(*) FROM "applicants" WHERE term ILIKE %s LIMIT 1')
+    for _ in range(6):  # past psycopg's prepare threshold on the pooled connection
+        query_data.get_q1()
+
+    load_rows([{"overview_url": "/result/1", "start_term": "Fall 2025"}], reset=True)
+    assert query_data.get_q1()["answer"] == "1 applications"
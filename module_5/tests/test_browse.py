@@ -0,0 +1,98 @@
+import pytest
+import browse_data
+from load_data import INDEX_NAMES, load_rows
+
+
+def _insert_applicants(cur):
+    """Seven rows: two dates with ties on date_added, and two NULL dates."""
+    days = {1: "2025-01-05", 2: "2025-02-01", 3: None, 4: "2025-02-01",
+            5: "2025-01-05", 6: None, 7: "2025-03-10"}
+    cur.executemany("""
+        INSERT INTO applicants (p_id, university, date_added, term, degree,
+                                llm_generated_university)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [(p_id, f"U{p_id}", day, "Fall 2025" if p_id % 2 else "Spring 2026",
+           "PhD" if p_id < 5 else "Masters", "MIT" if p_id % 2 else "Stanford University")
+          for p_id, day in days.items()])
+    cur.connection.commit()
+
+
+def _walk(client, query):
+    """Every page of /api/applicants?<query>, following the next tokens."""
+    pages, after = [], None
+    while True:
+        url = f"/api/applicants?{query}" + (f"&after={after}" if after else "")
+        body = client.get(url).get_json()
+        assert body["ok"] is True
+        pages.append(body["data"])
+        after = body["next"]
+        if after is None:
+            return pages
+
+
+@pytest.mark.web
+def test_keyset_pages_cover_every_row_newest_first(client, db_cursor):
+    """Pages run (date_added, p_id) descending, NULL dates last, with no gaps or repeats."""
+    _insert_applicants(db_cursor)
+    pages = _walk(client, "limit=2&fields=p_id,date_added")
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [row["p_id"] for page in pages for row in page] == [7, 4, 2, 5, 1, 6, 3]
+    assert pages[0][0] == {"p_id": 7, "date_added": "2025-03-10"}
+    assert pages[-1] == [{"p_id": 3, "date_added": None}]
+
+    one_page = _walk(client, "limit=7&fields=p_id")
+    assert len(one_page) == 1 and len(one_page[0]) == 7
+
+
+@pytest.mark.web
+def test_fields_projection_and_cohort_filters(client, db_cursor):
+    """?fields= picks the columns; term/university/degree narrow the rows."""
+    _insert_applicants(db_cursor)
+    body = client.get("/api/applicants?fields=university, p_id").get_json()
+    assert body["next"] is None
+    assert set(body["data"][0]) == {"p_id", "university"}
+
+    everything = client.get("/api/applicants?limit=1").get_json()["data"][0]
+    assert set(everything) == set(browse_data.EXPORT_COLUMNS)
+
+    pages = _walk(client, "limit=1&fields=p_id&term=Fall 2025&university=MIT&degree=PhD")
+    assert [row["p_id"] for page in pages for row in page] == [1, 3]
+
+
+@pytest.mark.web
+def test_bad_browse_requests_are_400(client, db_cursor):
+    """Unknown fields, tampered cursors and oversized filters are rejected."""
+    _insert_applicants(db_cursor)
+    response = client.get("/api/applicants?fields=p_id,row_hash")
+    assert response.status_code == 400
+    assert "row_hash" in response.get_json()["msg"]
+    for token in ("!!!", browse_data.encode_cursor(("yesterday", 1)),
+                  browse_data.encode_cursor(("2025-01-01", True)), "WzFd"):
+        response = client.get(f"/api/applicants?after={token}")
+        assert response.status_code == 400
+        assert response.get_json()["msg"] == "Invalid cursor"
+    assert client.get("/api/applicants?university=" + "x" * 201).status_code == 400
+
+    # limit is clamped to 1..MAX_PAGE_ROWS rather than rejected
+    assert len(client.get("/api/applicants?limit=0").get_json()["data"]) == 1
+    assert browse_data.clamp_page_rows(10**6) == browse_data.MAX_PAGE_ROWS
+
+
+@pytest.mark.db
+def test_browse_indexes_survive_a_shadow_swap_and_back_the_query(db_cursor):
+    """The indexes exist after ensure_schema and a reset load, and deep pages use them."""
+    load_rows([{"overview_url": f"https://www.thegradcafe.com/result/{i}"} for i in (1, 2)],
+              reset=True)
+    db_cursor.execute("SELECT array_agg(to_regclass(name)::text) AS found "
+                      "FROM unnest(%s::text[]) AS name;", (INDEX_NAMES,))
+    assert db_cursor.fetchone()["found"] == INDEX_NAMES
+
+    db_cursor.execute("SET LOCAL enable_seqscan = off;")
+    for cohort, index in ((browse_data.Cohort(term="Fall 2025"), "applicants_term_browse_idx"),
+                          (browse_data.Cohort(degree="PhD"), "applicants_degree_browse_idx")):
+        query, params = browse_data.page_query(["p_id"], cohort, ("2025-01-01", 10))
+        db_cursor.execute(b"EXPLAIN " + query.as_bytes(db_cursor), params + [51])
+        plan = "\n".join(row["QUERY PLAN"] for row in db_cursor.fetchall())
+        assert index in plan
+        assert "Sort" not in plan
+    db_cursor.connection.commit()
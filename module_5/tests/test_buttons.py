@@ -1,5 +1,4 @@
 import pytest
-import subprocess
 import threading
 from unittest.mock import patch, MagicMock
 import app as flask_app
@@ -9,18 +8,25 @@ def test_app_success_path():
     """Hits the 'Success' path in _run_pull_job."""
     # Access STATE dictionary instead of module attribute
     flask_app.STATE["is_pulling"] = False
-    with patch("app.os.path.exists", return_value=True):
-        with patch("app.subprocess.run"):
-            with patch("app.load_json_to_db", return_value=100):
-                flask_app._run_pull_job(reset_table=False)
+    with patch("app.run_pull_pipeline", return_value={"loaded": 100}):
+        flask_app._run_pull_job(reset_table=False)
     assert "Success" in flask_app.STATE["last_status"]
 
+    # Nothing scraped (offline): the JSON data file is loaded instead
+    with patch("app.run_pull_pipeline", return_value={"loaded": 0}):
+        with patch("app.os.path.exists", return_value=True):
+            with patch("app.load_json_to_db", return_value=42) as load:
+                flask_app._run_pull_job(reset_table=True)
+    assert load.call_args.kwargs["reset"] is True
+    assert "Loaded 42 records" in flask_app.STATE["last_status"]
+
 @pytest.mark.buttons
 def test_app_warning_paths():
-    """Test warning paths when scripts are missing."""
+    """Nothing scraped and no JSON data file to fall back on."""
     flask_app.STATE["is_pulling"] = False
-    with patch("app.os.path.exists", return_value=False):
-        flask_app._run_pull_job(reset_table=False)
+    with patch("app.run_pull_pipeline", return_value={"loaded": 0}):
+        with patch("app.os.path.exists", return_value=False):
+            flask_app._run_pull_job(reset_table=False)
     assert "Warning" in flask_app.STATE["last_status"] or "Error" in flask_app.STATE["last_status"]
 
 @pytest.mark.buttons
@@ -28,16 +34,14 @@ def test_app_exception_paths():
     """Test exception handling in the job (Lines 64-69 in app.py)."""
     flask_app.STATE["is_pulling"] = False
     
-    # 1. Subprocess Error (Line 64-65)
-    with patch("app.os.path.exists", return_value=True):
-        with patch("app.subprocess.run", side_effect=subprocess.CalledProcessError(1, "cmd")):
-            flask_app._run_pull_job(False)
-    assert "Subprocess Error" in flask_app.STATE["last_status"]
+    # 1. A pipeline stage failed
+    with patch("app.run_pull_pipeline", side_effect=RuntimeError("clean stage died")):
+        flask_app._run_pull_job(False)
+    assert "Unexpected Error: clean stage died" in flask_app.STATE["last_status"]
 
-    # 2. IO Error (Line 66-67)
-    with patch("app.os.path.exists", return_value=True):
-        with patch("app.subprocess.run", side_effect=IOError("Disk Full")):
-            flask_app._run_pull_job(False)
+    # 2. IO Error
+    with patch("app.run_pull_pipeline", side_effect=IOError("Disk Full")):
+        flask_app._run_pull_job(False)
     assert "File Error" in flask_app.STATE["last_status"]
 
 @pytest.mark.buttons
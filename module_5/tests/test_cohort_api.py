@@ -0,0 +1,143 @@
+import pytest
+import query_data
+from load_data import load_rows
+from query_data import COHORT_CACHE, Cohort, CohortCache
+
+
+@pytest.fixture(autouse=True)
+def empty_cohort_cache():
+    COHORT_CACHE.clear()
+    yield
+    COHORT_CACHE.clear()
+
+
+def _insert_cohorts(cur):
+    cur.execute("""
+        INSERT INTO applicants (p_id, term, degree, status, gpa, llm_generated_university, university)
+        VALUES (1, 'Spring 2026', 'PhD', 'Accepted', 3.5, 'Stanford University', 'stanford'),
+               (2, 'Spring 2026', 'PhD', 'Rejected', 3.9, 'Stanford University', 'Stanford U'),
+               (3, 'Spring 2026', 'Masters', 'Accepted', 3.1, 'Stanford University', 'Stanford'),
+               (4, 'Fall 2025', 'PhD', 'Accepted', 4.0, 'Stanford University', 'Stanford'),
+               (5, 'Spring 2026', 'PhD', 'Accepted', 2.0, 'MIT', 'MIT')
+    """)
+    cur.connection.commit()
+
+
+@pytest.mark.web
+def test_api_analysis_runs_questions_over_cohort(client, db_cursor):
+    """Filters restrict every question; the term replaces Fall 2025 in the per-term ones."""
+    _insert_cohorts(db_cursor)
+    response = client.get(
+        "/api/analysis?term=Spring 2026&university=Stanford University&degree=PhD")
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["cohort"] == {
+        "term": "Spring 2026", "university": "Stanford University", "degree": "PhD"}
+    cards = {card["id"]: card for card in payload["data"]}
+    assert len(cards) == 11
+    assert cards["q1"]["answer"] == "2 applications"
+    assert cards["q1"]["question"].endswith("for the Spring 2026 term?")
+    assert cards["q5"]["answer"] == "50.00% (1 accepted out of 2)"
+    assert cards["q6"]["answer"] == "3.50"
+    assert "llm_generated_university\" = 'Stanford University'" in cards["q1"]["sql"]
+
+    everyone = {card["id"]: card for card in client.get("/api/analysis").get_json()["data"]}
+    assert everyone["q1"]["answer"] == "1 applications"
+    assert everyone["q1"]["sql"] == query_data.Q1_SQL.text
+
+
+@pytest.mark.web
+def test_api_analysis_cohort_term_matches_like_the_questions(client, db_cursor):
+    """The cohort keeps every row the per-term questions count; q8/q9 use the term's year."""
+    _insert_cohorts(db_cursor)
+    db_cursor.execute("""
+        INSERT INTO applicants (p_id, term, degree, status, program, date_added, university,
+                                llm_generated_program, llm_generated_university)
+        VALUES (6, 'spring 2026 (rolling)', 'PhD', 'Accepted', 'Computer Science',
+                '2026-02-01', 'Stanford University', 'Computer Science', 'Stanford University'),
+               (7, 'Spring 2026', 'PhD', 'Accepted', 'Computer Science',
+                '2025-02-01', 'Stanford University', 'Computer Science', 'Stanford University')
+    """)
+    db_cursor.connection.commit()
+
+    cards = {card["id"]: card
+             for card in client.get("/api/analysis?term=Spring 2026").get_json()["data"]}
+    assert cards["q1"]["answer"] == "6 applications"
+    assert "\"term\" ILIKE 'Spring 2026%%'" in cards["q1"]["sql"]
+    assert cards["q8"]["question"].endswith("top schools in 2026?")
+    assert cards["q8"]["answer"] == "1 entries"
+    assert cards["q9"]["answer"] == "Raw: 1\nLLM: 1\nDifference: 0"
+
+    everyone = {card["id"]: card for card in client.get("/api/analysis").get_json()["data"]}
+    assert everyone["q8"]["question"].endswith("top schools in 2025?")
+    assert everyone["q8"]["answer"] == "1 entries"
+    assert Cohort(term="Next fall").term_year == 2025
+
+
+@pytest.mark.web
+def test_api_analysis_caches_until_next_load(client, db_cursor):
+    """Repeat cohorts are served from the cache; a load empties it."""
+    _insert_cohorts(db_cursor)
+    url = "/api/analysis?term=Spring 2026&university=MIT"
+    first = client.get(url).get_json()["data"]
+    hits = COHORT_CACHE.counters["hits"]
+    assert client.get(url + "&degree=").get_json()["data"] == first
+    assert COHORT_CACHE.counters["hits"] == hits + 1
+
+    load_rows([{"overview_url": "https://www.thegradcafe.com/result/6",
+                "start_term": "Spring 2026", "llm-generated-university": "MIT"}])
+    db_cursor.connection.commit()
+    cards = {card["id"]: card for card in client.get(url).get_json()["data"]}
+    assert cards["q1"]["answer"] == "2 applications"
+
+
+@pytest.mark.web
+def test_api_analysis_rejects_oversized_filters(client):
+    response = client.get("/api/analysis?university=" + "x" * 201)
+    assert response.status_code == 400
+    assert response.get_json()["ok"] is False
+
+
+@pytest.mark.analysis
+def test_degraded_cohort_results_are_not_cached(db_cursor, monkeypatch):
+    """A card that fell back to "N/A" is retried on the next request."""
+    def get_q92(*_args):
+        """Query 92: Broken SQL."""
+        raise query_data.psycopg.errors.UndefinedTable("no such table")
+
+    monkeypatch.setattr(query_data, "QUERIES", (query_data.get_q1, get_q92))
+    cohort = Cohort(term="Spring 2026")
+    assert query_data.get_cohort_analysis(cohort)[1]["answer"] == "N/A"
+    assert COHORT_CACHE.get(cohort) is None
+
+
+@pytest.mark.unit
+def test_cohort_cache_bounds_and_generations():
+    """LRU eviction, copies on the way in and out, and no stale puts across a clear."""
+    cache = CohortCache(max_size=2)
+    cards = [{"id": "q1"}]
+    for term in ("A", "B"):
+        cache.put(Cohort(term=term), cards, cache.generation)
+    assert cache.get(Cohort(term="A")) == cards
+    cache.put(Cohort(term="C"), cards, cache.generation)
+    assert cache.get(Cohort(term="B")) is None
+    assert cache.counters["evictions"] == 1
+
+    cache.get(Cohort(term="A"))[0]["id"] = "changed"
+    assert cache.get(Cohort(term="A")) == cards
+
+    started = cache.generation
+    cache.clear()
+    cache.put(Cohort(term="D"), cards, started)
+    assert cache.get(Cohort(term="D")) is None
+    assert cache.get(Cohort(term="A")) is None
+
+
+@pytest.mark.unit
+def test_cohort_statements_quote_values_and_render_once():
+    cohort = Cohort(university="O'Brien College")
+    stmt = query_data.for_cohort(query_data.Q1_SQL, cohort)
+    assert "= 'O''Brien College') AS \"applicants\"" in stmt.text
+    assert query_data.for_cohort(query_data.Q1_SQL, cohort) is stmt
+    assert query_data.for_cohort(query_data.Q1_SQL, query_data.ALL_APPLICANTS) \
+        is query_data.Q1_SQL
@@ -0,0 +1,148 @@
+import importlib
+import random
+import sys
+from datetime import date
+
+import pytest
+import columnar
+import query_data
+from load_data import load_rows
+
+UNIVERSITIES = [
+    "Johns Hopkins University", "JHU", "johns hopkins", "MIT", "mit",
+    "Massachusetts Institute of Technology (MIT)", "Stanford University",
+    "Carnegie Mellon University", "Georgetown University", "State U", None,
+]
+PROGRAMS = ["Computer Science", "computer  science", "Computer Engineering", "Physics", None]
+DEGREES = ["PhD", "phd", "Masters", "MASTER of Science", "MFA", None]
+STATUSES = ["Accepted on 1 Mar", "accepted", "Rejected", "Wait listed", None]
+TERMS = ["Fall 2025", "fall 2025", "Fall_2025", "Spring 2025", "Fall 2026", None]
+CITIZENSHIP = ["American", "american", "International", "Other", None]
+DATES = [date(2024, 12, 31), date(2025, 1, 1), date(2025, 6, 30), date(2026, 1, 1), None]
+
+
+def _score(rng, low, high):
+    return None if rng.random() < 0.2 else round(rng.uniform(low, high), rng.choice((1, 2, 3)))
+
+
+def _insert_random_applicants(cur, count=400, seed=43):
+    rng = random.Random(seed)
+    rows = []
+    for p_id in range(1, count + 1):
+        program = rng.choice(PROGRAMS)
+        rows.append((
+            p_id, rng.choice(UNIVERSITIES), program, rng.choice(DATES), rng.choice(STATUSES),
+            rng.choice(TERMS), rng.choice(CITIZENSHIP), rng.choice(DEGREES),
+            _score(rng, 2.0, 4.0), _score(rng, 130, 170), _score(rng, 130, 170),
+            _score(rng, 0, 6),
+            rng.choice(["Computer Science", None]), rng.choice(UNIVERSITIES),
+        ))
+    # A clear program leader so the q10 answer never depends on tie order
+    rows += [(count + i, None, "Economics", None, None, None, None, None,
+              None, None, None, None, None, None) for i in range(1, count)]
+    cur.executemany("""
+        INSERT INTO applicants (p_id, university, program, date_added, status, term,
+            us_or_international, degree, gpa, gre, gre_v, gre_aw,
+            llm_generated_program, llm_generated_university)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+    cur.connection.commit()
+
+
+def _engine_analysis(monkeypatch):
+    monkeypatch.setattr(columnar, "ENABLED", True)
+    monkeypatch.setitem(columnar._STATE, "store", None)
+    return query_data.get_analysis()
+
+
+@pytest.mark.analysis
+def test_columnar_answers_match_sql(db_cursor, monkeypatch):
+    """Every card the NumPy engine renders is identical to the SQL one."""
+    _insert_random_applicants(db_cursor)
+    expected = query_data.get_analysis()
+    assert _engine_analysis(monkeypatch) == expected
+    # Second request reuses the snapshot's cached masks and group counts
+    assert query_data.get_analysis() == expected
+    answers = {card["id"]: card["answer"] for card in expected}
+    # The data really exercises the filters (no trivially-zero answers)
+    assert answers["q7"] != "0 entries" and answers["q8"] != "0 entries"
+    assert "Masters" in answers["q11"] and "PhD" in answers["q11"]
+
+
+@pytest.mark.analysis
+@pytest.mark.parametrize("cohort", [
+    query_data.Cohort(term="fall 2025"),
+    query_data.Cohort(term="Fall 2025", university="MIT", degree="PhD"),
+    query_data.Cohort(university="Nowhere"),
+])
+def test_columnar_cohorts_match_sql(db_cursor, monkeypatch, cohort):
+    """Cohort-restricted cards (answers and displayed SQL) match the SQL path."""
+    _insert_random_applicants(db_cursor)
+    expected = query_data.get_analysis(cohort)
+    monkeypatch.setattr(columnar, "ENABLED", True)
+    monkeypatch.setitem(columnar._STATE, "store", None)
+    assert query_data.get_analysis(cohort) == expected
+
+
+@pytest.mark.analysis
+def test_columnar_answers_match_sql_on_empty_table(db_cursor, monkeypatch):
+    """Empty-table edge cases (0%, N/A, no q10/q11 groups) match too."""
+    expected = query_data.get_analysis()
+    assert _engine_analysis(monkeypatch) == expected
+    assert columnar.current_store().size == 0
+
+
+@pytest.mark.analysis
+def test_load_rows_refreshes_store(db_cursor, monkeypatch):
+    """load_rows rebuilds the snapshot only when the engine is enabled."""
+    rows = [{"overview_url": f"https://www.thegradcafe.com/result/{i}", "start_term": "Fall 2025"}
+            for i in (1, 2)]
+    monkeypatch.setitem(columnar._STATE, "store", None)
+    load_rows(rows)
+    assert columnar.current_store() is None
+    assert columnar._STATE["store"] is None
+
+    monkeypatch.setattr(columnar, "ENABLED", True)
+    load_rows(rows + [{"overview_url": "https://www.thegradcafe.com/result/3"}])
+    store = columnar.current_store()
+    assert store is columnar._STATE["store"]
+    assert store.size == 3
+    assert columnar.q1_rows(store, ("fall 2025%",)) == [(2,)]
+
+
+@pytest.mark.unit
+def test_like_regex_follows_ilike_rules():
+    """%, _ and backslash escapes translate; matching is case-insensitive and anchored."""
+    assert columnar.like_regex("%Computer%Science%").fullmatch("MS computer  SCIENCE")
+    assert columnar.like_regex("Fall_2025").fullmatch("Fall 2025")
+    assert not columnar.like_regex("Fall\\_2025").fullmatch("Fall 2025")
+    assert columnar.like_regex("Fall\\_2025").fullmatch("fall_2025")
+    assert columnar.like_regex("100\\%").fullmatch("100%")
+    assert not columnar.like_regex("MIT").fullmatch("MIT Sloan")
+    assert columnar.like_regex("trailing\\").fullmatch("trailing\\")
+
+
+@pytest.mark.unit
+def test_round_avg_matches_numeric_cast():
+    """float8 -> numeric keeps 15 significant digits before ROUND(…, 2)."""
+    assert str(columnar.round_avg(3.575 * 3, 3)) == "3.58"
+    assert str(columnar.round_avg(7.0, 2)) == "3.50"
+    assert columnar.round_avg(0.0, 0) is None
+    assert str(columnar.round_pct(1, 3)) == "33.33"
+    assert str(columnar.round_pct(2, 3)) == "66.67"
+
+
+@pytest.mark.unit
+def test_engine_disabled_without_numpy(monkeypatch):
+    """A missing NumPy leaves the engine off and the SQL path in charge."""
+    monkeypatch.setenv("ANALYTICS_ENGINE", "numpy")
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    try:
+        importlib.reload(columnar)
+        assert columnar.np is None
+        assert columnar.ENABLED is False
+        assert columnar.refresh() is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(columnar)
+    assert columnar.np is not None
@@ -4,6 +4,7 @@ import os
 from unittest.mock import patch, MagicMock, mock_open
 from load_data import load_json, load_rows
 import db
+import psycopg
 
 @pytest.mark.db
 def test_load_json_success():
@@ -39,3 +40,179 @@ def test_db_rollback_path():
     
     # Check that rollback was called on the connection
     mock_conn.rollback.assert_called_once()
+
+
+@pytest.mark.db
+def test_reload_only_writes_changed_rows(db_cursor, capsys):
+    """A second load of the same rows rewrites nothing; edits and new IDs are counted."""
+    rows = [
+        {"overview_url": f"https://www.thegradcafe.com/result/{i}", "university": "JHU",
+         "date_added": "20 Feb 2025", "gpa": "3.9"}
+        for i in (1, 2, 3)
+    ]
+    assert load_rows(rows) == 3
+    db_cursor.execute("SELECT p_id, xmin::text AS xmin FROM applicants ORDER BY p_id;")
+    before = {r["p_id"]: r["xmin"] for r in db_cursor.fetchall()}
+    db_cursor.connection.commit()  # don't hold a snapshot/lock across the reloads
+
+    assert load_rows(rows) == 3
+    assert "(0 inserted, 0 updated, 3 unchanged)" in capsys.readouterr().out
+
+    edited = [dict(rows[0], gpa="4.0"), rows[1], rows[1],
+              {"overview_url": "https://www.thegradcafe.com/result/4"}]
+    load_rows(edited)
+    assert "(1 inserted, 1 updated, 2 unchanged)" in capsys.readouterr().out
+
+    db_cursor.execute("SELECT p_id, gpa, xmin::text AS xmin FROM applicants ORDER BY p_id;")
+    after = {r["p_id"]: r for r in db_cursor.fetchall()}
+    assert after[1]["gpa"] == 4.0 and after[1]["xmin"] != before[1]
+    assert after[2]["xmin"] == before[2] and after[3]["xmin"] == before[3]
+    assert set(after) == {1, 2, 3, 4}
+
+
+@pytest.mark.db
+def test_upsert_where_clause_skips_rows_already_current(db_cursor):
+    """Rows matching the stored hash are not rewritten even if sent to the upsert."""
+    import load_data  # pylint: disable=import-outside-toplevel
+
+    columns = load_data.normalize_rows([{"overview_url": "/result/7", "program": "CS"}])
+    row = dict(zip(load_data.COLUMNS, (values[0] for values in columns.values())))
+    with db.get_cursor() as cur:
+        cur.execute(load_data.UPSERT_SQL, row)
+        cur.execute(load_data.UPSERT_SQL, row)
+        assert cur.rowcount == 0
+
+
+@pytest.mark.db
+def test_ensure_schema_adds_row_hash_to_old_tables(db_cursor):
+    """A table created before row_hash existed gains the column without a reset."""
+    from load_data import ensure_schema  # pylint: disable=import-outside-toplevel
+
+    db_cursor.execute("ALTER TABLE applicants DROP COLUMN row_hash;")
+    db_cursor.connection.commit()
+    ensure_schema(reset=False)
+    db_cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = 'applicants' AND column_name = 'row_hash';"
+    )
+    assert db_cursor.fetchone()["column_name"] == "row_hash"
+
+
+def _urls(*ids):
+    return [{"overview_url": f"https://www.thegradcafe.com/result/{i}", "gpa": "3.5"} for i in ids]
+
+
+@pytest.mark.db
+def test_reset_load_swaps_in_a_shadow_table(db_cursor, capsys):
+    """reset=True replaces the contents via applicants_new; repeated swaps keep working."""
+    load_rows(_urls(1, 2, 3))
+    load_rows(_urls(4, 5, 5) + [dict(_urls(5)[0], gpa="4.0")], reset=True)
+    assert "(2 inserted, 1 updated, 1 unchanged)" in capsys.readouterr().out
+    db_cursor.execute("SELECT gpa FROM applicants WHERE p_id = 5;")
+    assert db_cursor.fetchone()["gpa"] == 4.0  # last occurrence wins
+    db_cursor.connection.commit()
+
+    load_rows(_urls(6), reset=True)
+
+    db_cursor.execute("SELECT p_id FROM applicants ORDER BY p_id;")
+    assert [r["p_id"] for r in db_cursor.fetchall()] == [6]
+    db_cursor.execute(
+        "SELECT to_regclass('applicants_new') AS shadow, "
+        "to_regclass('applicants_pkey') AS pkey, "
+        "to_regclass('applicants_new_pkey') AS shadow_pkey;"
+    )
+    assert db_cursor.fetchone() == {"shadow": None, "pkey": "applicants_pkey",
+                                    "shadow_pkey": None}
+    db_cursor.connection.commit()
+
+
+@pytest.mark.db
+def test_reset_load_leaves_the_live_table_alone_until_the_swap(db_cursor):
+    """If the swap fails, readers still see the previous rows, not an empty table."""
+    import load_data  # pylint: disable=import-outside-toplevel
+
+    load_rows(_urls(1, 2))
+    broken = (load_data.sql.SQL("SELECT 1/0;"),)
+    with patch.object(load_data, "SWAP_SQL", broken):
+        with pytest.raises(Exception, match="division by zero"):
+            load_rows(_urls(7, 8, 9), reset=True)
+
+    db_cursor.execute("SELECT count(*) AS n FROM applicants;")
+    assert db_cursor.fetchone()["n"] == 2
+    db_cursor.execute("SELECT count(*) AS n FROM applicants_new;")
+    assert db_cursor.fetchone()["n"] == 3
+    db_cursor.connection.commit()
+
+
+@pytest.mark.db
+def test_parallel_upsert_merges_partitions_from_staging(db_cursor, capsys):
+    """workers > 1 COPYs partitions over several connections and merges once."""
+    load_rows(_urls(1, 2, 3))
+    edited = [dict(_urls(1)[0], gpa="4.0")] + _urls(2, 3, 4, 5, 6, 6)
+    assert load_rows(edited, workers=3) == 7
+    assert "(3 inserted, 1 updated, 3 unchanged)" in capsys.readouterr().out
+
+    db_cursor.execute("SELECT p_id, gpa FROM applicants ORDER BY p_id;")
+    assert [(r["p_id"], r["gpa"]) for r in db_cursor.fetchall()] == \
+        [(1, 4.0), (2, 3.5), (3, 3.5), (4, 3.5), (5, 3.5), (6, 3.5)]
+    db_cursor.execute("SELECT to_regclass('applicants_staging') AS staging;")
+    assert db_cursor.fetchone()["staging"] is None
+    db_cursor.connection.commit()
+
+    load_rows(_urls(7, 8), reset=True, workers=2)
+    db_cursor.execute("SELECT array_agg(p_id ORDER BY p_id) AS ids FROM applicants;")
+    assert db_cursor.fetchone()["ids"] == [7, 8]
+    db_cursor.connection.commit()
+
+
+@pytest.mark.db
+def test_pooled_cursor_reuses_and_discards_connections(test_db, mocker):
+    """Idle connections are reused; broken or surplus ones are closed."""
+    mocker.patch("db.get_db_dsn", return_value=test_db)
+    mocker.patch.object(db, "POOL_SIZE", 1)
+    db.close_pools()
+
+    with db.get_pooled_cursor() as cur:
+        first = cur.connection
+    with db.get_pooled_cursor(dict_rows=True) as cur:
+        assert cur.connection is first
+        with db.get_pooled_cursor() as inner:  # pool empty: a second connection
+            surplus = inner.connection
+    assert first.closed and not surplus.closed  # the pool only keeps one
+
+    with pytest.raises(ValueError):
+        with db.get_pooled_cursor() as cur:
+            cur.execute("SELECT 1")
+            raise ValueError("rolled back, connection kept")
+    with pytest.raises(psycopg.OperationalError):
+        with db.get_pooled_cursor() as cur:
+            assert cur.connection is surplus
+            cur.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+    assert surplus.closed
+    db.close_pools()
+
+
+@pytest.mark.db
+def test_pooled_cursor_health_checks_idle_connections(test_db, mocker):
+    """Closed idle connections are skipped at checkout; a failed rollback is not pooled."""
+    mocker.patch("db.get_db_dsn", return_value=test_db)
+    db.close_pools()
+
+    with db.get_pooled_cursor() as cur:
+        stale = cur.connection
+    with db.get_pooled_cursor() as cur:
+        assert cur.connection is stale
+    stale.close()  # e.g. dropped while idle
+    with db.get_pooled_cursor() as cur:
+        fresh = cur.connection
+        assert fresh is not stale and not fresh.closed
+
+    mocker.patch.object(fresh, "rollback", side_effect=psycopg.OperationalError("gone"))
+    with pytest.raises(ValueError):
+        with db.get_pooled_cursor() as cur:
+            assert cur.connection is fresh
+            raise ValueError("rollback fails too")
+    assert fresh.closed
+    with db.get_pooled_cursor() as cur:
+        assert cur.connection is not fresh
+    db.close_pools()
@@ -0,0 +1,118 @@
+import json
+import queue
+import threading
+from unittest.mock import patch
+
+import pytest
+import app as flask_app
+import events
+from events import EventBus, PipelineProgress
+
+
+def _drain(subscriber):
+    out = []
+    while True:
+        try:
+            out.append(subscriber.get_nowait())
+        except queue.Empty:
+            return out
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+def test_bus_fans_out_replays_latest_and_drops_oldest_for_slow_subscribers():
+    """Every subscriber gets every event; late ones start from the latest; full queues shed."""
+    bus = EventBus(queue_size=2)
+    early = bus.subscribe()
+    bus.publish({"n": 1})
+    late = bus.subscribe()
+    for n in (2, 3):
+        bus.publish({"n": n})
+    assert [e["n"] for e in _drain(early)] == [2, 3]  # 1 dropped: the queue holds two
+    assert [(e["id"], e["n"]) for e in _drain(late)] == [(2, 2), (3, 3)]
+    bus.unsubscribe(early)
+    bus.unsubscribe(early)
+    assert bus.subscriber_count() == 1
+
+
+@pytest.mark.unit
+def test_stream_frames_events_sends_heartbeats_and_unsubscribes_on_close():
+    """SSE framing, a keepalive comment when idle, and cleanup when the client goes."""
+    bus = EventBus()
+    lines = events.stream(bus, heartbeat_s=0.01)
+    assert next(lines) == ": keepalive\n\n"
+    bus.publish({"stage": "scrape"})
+    frame = next(lines)
+    assert frame.startswith("id: 1\nevent: progress\ndata: ")
+    assert json.loads(frame.split("data: ")[1]) == {"id": 1, "stage": "scrape"}
+    lines.close()
+    assert bus.subscriber_count() == 0
+
+
+@pytest.mark.unit
+def test_progress_reports_throughput_eta_and_coalesces_updates():
+    """Stage rate and ETA come from the stage clock; quick updates are coalesced."""
+    bus, clock = EventBus(), FakeClock()
+    subscriber = bus.subscribe()
+    progress = PipelineProgress(bus, clock)
+    progress.start_stage("pipeline", "Streaming")
+    clock.now += 2
+    event = progress.update(40, 100, rows_cleaned=50, rows_loaded=40)
+    assert event["rate"] == 20.0 and event["eta_s"] == 3.0
+    assert (event["rows_cleaned"], event["rows_loaded"], event["status"]) == (50, 40, "Streaming")
+    assert progress.update(41, 100, rows_loaded=41) is None
+    assert progress.counters["rows_loaded"] == 41  # counted, just not published yet
+
+    progress.start_stage("load", "Loading")
+    clock.now += 1
+    assert progress.update(60, 60, force=True)["eta_s"] == 0.0
+    final = progress.finish("Broken", ok=False)
+    assert (final["stage"], final["running"], final["elapsed_s"]) == ("error", False, 3.0)
+    assert [e["stage"] for e in _drain(subscriber)] == \
+        ["pipeline", "pipeline", "load", "load", "error"]
+
+
+@pytest.mark.buttons
+def test_pull_job_publishes_each_stage_and_a_final_event(client):
+    """/pull-data publishes its start before replying; the job ends with running=False."""
+    subscriber = events.BUS.subscribe()
+    _drain(subscriber)
+    flask_app.STATE["is_pulling"] = False
+    with patch("threading.Thread") as thread:
+        assert client.post("/pull-data").status_code == 200
+    assert _drain(subscriber)[-1]["stage"] == "start"
+    progress = thread.call_args.kwargs["args"][1]
+
+    def pipeline(reset, progress):
+        assert reset is True
+        progress.update(7, 10, force=True, rows_loaded=7)
+        return {"loaded": 7}
+
+    with patch("app.run_pull_pipeline", side_effect=pipeline):
+        flask_app._run_pull_job(True, progress)
+    published = _drain(subscriber)
+    events.BUS.unsubscribe(subscriber)
+    assert [e["stage"] for e in published] == ["pipeline", "pipeline", "done"]
+    assert published[-2]["rows_loaded"] == 7
+    assert published[-1]["running"] is False
+    assert published[-1]["status"].startswith("Success")
+    assert flask_app.STATE["is_pulling"] is False
+
+
+@pytest.mark.web
+def test_events_endpoint_streams_server_sent_events(client):
+    """/events is text/event-stream and starts with the latest event."""
+    events.BUS.publish({"stage": "done", "status": "Ready", "running": False})
+    response = client.get("/events")
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    first = next(response.response).decode()
+    assert "event: progress" in first and '"status": "Ready"' in first
+    response.close()
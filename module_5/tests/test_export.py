@@ -0,0 +1,80 @@
+import csv
+import io
+
+import pytest
+import export_data
+from query_data import Cohort
+
+
+def _insert_applicants(cur, count=5):
+    cur.executemany("""
+        INSERT INTO applicants (p_id, university, program, date_added, term, gpa, degree,
+                                llm_generated_university)
+        VALUES (%s, %s, 'CS, "Theory"', '2025-02-01', %s, %s, 'PhD', %s)
+    """, [(p_id, f"U{p_id}", "Fall 2025" if p_id % 2 else "Spring 2026",
+           None if p_id == 3 else 3.5, "MIT" if p_id % 2 else "Stanford University")
+          for p_id in range(count, 0, -1)])
+    cur.connection.commit()
+
+
+@pytest.mark.db
+def test_iter_batches_streams_fixed_size_fetches(db_cursor):
+    """A named cursor hands rows over batch_rows at a time, in p_id order."""
+    _insert_applicants(db_cursor)
+    batches = list(export_data.iter_batches(batch_rows=2))
+    assert [len(rows) for rows in batches] == [2, 2, 1]
+    assert [row[0] for rows in batches for row in rows] == [1, 2, 3, 4, 5]
+    assert len(batches[0][0]) == len(export_data.EXPORT_COLUMNS)
+
+
+@pytest.mark.web
+def test_export_csv_download_with_filters(client, db_cursor, monkeypatch):
+    """/export streams CSV (quoted, NULL as empty); cohort filters narrow the rows."""
+    _insert_applicants(db_cursor)
+    monkeypatch.setattr(export_data, "EXPORT_BATCH_ROWS", 2)
+    response = client.get("/export")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert "applicants.csv" in response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [row["p_id"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert rows[0]["program"] == 'CS, "Theory"'
+    assert rows[2]["gpa"] == ""
+    assert rows[0]["date_added"] == "2025-02-01"
+    assert "row_hash" not in rows[0]
+
+    response = client.get("/export?format=csv&term=Fall 2025&university=MIT")
+    assert [row["p_id"] for row in csv.DictReader(io.StringIO(response.data.decode()))] \
+        == ["1", "3", "5"]
+
+    empty = client.get("/export?degree=MFA").data.decode()
+    assert empty.strip() == ",".join(export_data.EXPORT_COLUMNS)
+
+
+@pytest.mark.web
+def test_export_rejects_bad_requests(client, monkeypatch):
+    """Unknown formats, missing pyarrow and oversized filters are 400s."""
+    assert client.get("/export?format=xlsx").status_code == 400
+    monkeypatch.setattr(export_data, "pa", None)
+    response = client.get("/export?format=parquet")
+    assert response.status_code == 400
+    assert "pyarrow" in response.get_json()["msg"]
+    assert client.get("/export?term=" + "x" * 201).status_code == 400
+    with pytest.raises(ValueError, match="pyarrow"):
+        export_data.stream_export("arrow")
+
+
+@pytest.mark.db
+def test_export_cli_writes_file_and_reports_throughput(db_cursor, tmp_path, capsys):
+    """The CLI streams to a file and prints rows/s and MB/s."""
+    _insert_applicants(db_cursor)
+    out = tmp_path / "applicants.csv"
+    export_data.main(["--out", str(out), "--batch-rows", "2", "--degree", "PhD",
+                      "--university", "Stanford University"])
+    lines = out.read_text().splitlines()
+    assert len(lines) == 3
+    assert "Exported 2 rows" in capsys.readouterr().out
+
+    result = export_data.write_export(str(tmp_path / "none.csv"), cohort=Cohort(term="None"))
+    assert result["rows"] == 0
+    assert result["bytes"] == len(",".join(export_data.EXPORT_COLUMNS)) + 2
@@ -0,0 +1,944 @@
+"""
+tests/test_llm_hosting.py - llm_hosting standardizer tests (the model is never loaded)
+"""
+import http.client
+import io
+import json
+import os
+import random
+import string
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from llm_hosting import app as llm_app
+
+
+@pytest.fixture(autouse=True)
+def fresh_result_cache(monkeypatch):
+    """Each test starts with an empty, memory-only result cache."""
+    cache = llm_app.ResultCache(max_size=64, ttl_s=0, path="")
+    monkeypatch.setattr(llm_app, "RESULT_CACHE", cache)
+    started = threading.Event()
+    started.set()  # no background model load from the first test request
+    monkeypatch.setattr(llm_app, "_WARMUP_STARTED", started)
+    return cache
+
+
+_MATH_UBC = {"standardized_program": "Mathematics",
+             "standardized_university": "University of British Columbia"}
+
+
+@pytest.mark.llm
+def test_fast_path_resolves_canonical_rows_without_llm():
+    """Exact 'Program, University' rows never reach _call_llm."""
+    with patch.object(llm_app, "_call_llm") as mock_llm:
+        out = llm_app._standardize("Information Studies, McGill University  ")
+        uc = llm_app._standardize("Computer Science, University of California, Davis")
+        ubc = llm_app._standardize("Mathematics, UBC")
+
+    mock_llm.assert_not_called()
+    assert out == {
+        "standardized_program": "Information Studies",
+        "standardized_university": "McGill University",
+    }
+    assert uc["standardized_university"] == "University of California, Davis"
+    assert ubc["standardized_university"] == "University of British Columbia"
+
+
+@pytest.mark.llm
+def test_fast_path_reads_scraped_rows():
+    """Degree suffixes, a separate university field and "at" inside names all resolve."""
+    row = {"program": "Physics PhD", "university": "University of Texas at Austin"}
+    assert llm_app._row_text(row) == "Physics PhD, University of Texas at Austin"
+    assert llm_app._fast_path(llm_app._row_text(row)) == {
+        "standardized_program": "Physics",
+        "standardized_university": "University of Texas at Austin",
+    }
+    assert llm_app._fast_path("Mathematics PhD")["standardized_university"] == "Unknown"
+    mit = llm_app._fast_path("Physics, Massachusetts Institute of Technology (MIT)")
+    assert mit["standardized_university"] == "Massachusetts Institute of Technology"
+    assert llm_app._fast_path("Physics, Nowhere Polytechnic") is None
+
+
+@pytest.mark.llm
+def test_fast_path_resolves_most_of_the_repo_dataset():
+    """On the scraped rows shipped with the repo, most skip the model and agree with it."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(llm_app.__file__)))
+    with open(os.path.join(root, "llm_extend_applicant_data_liv.json"), encoding="utf-8") as f:
+        rows = json.load(f)
+    resolved = [(row, llm_app._fast_path(llm_app._row_text(row))) for row in rows]
+    resolved = [(row, result) for row, result in resolved if result is not None]
+
+    assert len(resolved) / len(rows) > 0.5
+    agree = sum(result["standardized_university"] == row["llm-generated-university"]
+                for row, result in resolved)
+    assert agree / len(resolved) > 0.95
+
+
+@pytest.mark.llm
+def test_low_confidence_rows_escalate_to_llm():
+    """Rows the rules cannot resolve are sent to the model and counted as such."""
+    before = llm_app._path_stats()["llm"]["count"]
+    fake = {"standardized_program": "Information Studies",
+            "standardized_university": "McGill University"}
+    with patch.object(llm_app, "_call_llm", return_value=fake) as mock_llm:
+        assert llm_app._standardize("Information, McG") == fake
+
+    mock_llm.assert_called_once_with("Information, McG")
+    assert llm_app._path_stats()["llm"]["count"] == before + 1
+
+
+@pytest.mark.llm
+def test_stats_endpoint_reports_paths():
+    """GET /stats exposes per-path counts and latency."""
+    resp = llm_app.app.test_client().get("/stats")
+    assert resp.status_code == 200
+    assert set(resp.json["paths"]) == {"fast_path", "llm"}
+
+
+def _typo_corpus(names):
+    """Deterministic near-misses: dropped character and swapped pair."""
+    corpus = []
+    for name in names:
+        mid = len(name) // 2
+        corpus.append(name[:mid] + name[mid + 1:])
+        corpus.append(name[:mid - 1] + name[mid] + name[mid - 1] + name[mid + 1:])
+    return corpus
+
+
+@pytest.mark.llm
+@pytest.mark.parametrize("index_name, cutoff", [("UNI_INDEX", 0.86), ("PROG_INDEX", 0.84)])
+def test_fuzzy_index_agrees_with_difflib(index_name, cutoff):
+    """The index returns difflib.get_close_matches' top hit."""
+    import difflib
+
+    index = getattr(llm_app, index_name)
+    corpus = _typo_corpus(index.choices[::7]) + ["", "zzzz"]
+    for query in corpus:
+        expected = difflib.get_close_matches(query, index.choices, n=1, cutoff=cutoff)
+        assert index.best(query, cutoff)[0] == (expected[0] if expected else None), query
+
+
+def _random_typos(names, count, seed):
+    """Unique near-misses with one to three random edits (drop, insert, replace, swap)."""
+    rng = random.Random(seed)
+    queries = set()
+    while len(queries) < count:
+        chars = list(rng.choice(names))
+        for _ in range(rng.randint(1, 3)):
+            i, roll = rng.randrange(len(chars)), rng.random()
+            if roll < 0.3 and len(chars) > 2:
+                del chars[i]
+            elif roll < 0.6:
+                chars.insert(i, rng.choice(string.ascii_lowercase + " "))
+            elif roll < 0.8:
+                chars[i] = rng.choice(string.ascii_lowercase + " ")
+            elif i + 1 < len(chars):
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        queries.add("".join(chars))
+    return sorted(queries)
+
+
+@pytest.mark.llm
+@pytest.mark.parametrize("index_name, cutoff", [("UNI_INDEX", 0.86), ("PROG_INDEX", 0.84),
+                                                ("PROG_INDEX", 0.6)])
+def test_fuzzy_index_matches_difflib_on_random_typos(index_name, cutoff):
+    """Same winner (and ratio) as a full difflib scan, ties and near-ties included."""
+    import difflib
+
+    choices = getattr(llm_app, index_name).choices
+    index = llm_app.FuzzyIndex(choices, memo_size=0)
+    for query in _random_typos(choices, 300, seed=len(choices)):
+        expected = difflib.get_close_matches(query, choices, n=1, cutoff=cutoff)
+        match, ratio = index.best(query, cutoff)
+        assert match == (expected[0] if expected else None), query
+        if match:
+            assert ratio == difflib.SequenceMatcher(None, match, query).ratio()
+
+
+class _FakeLlama:
+    """Word-level stand-in for llama_cpp.Llama that tracks state restores."""
+
+    def __init__(self, content=None):
+        self.input_ids, self.n_tokens, self.loads, self.resets = [], 0, 0, 0
+        self.content, self.kwargs = content, {}
+
+    def create_chat_completion(self, messages, **kwargs):
+        tokens = " ".join(m["role"] + " " + m["content"] for m in messages).split()
+        self.input_ids, self.n_tokens, self.kwargs = tokens, len(tokens), kwargs
+        content = self.content or json.dumps({"standardized_program": "Information Studies",
+                                              "standardized_university": "McGill University"})
+        return {"choices": [{"message": {"content": content}}],
+                "usage": {"prompt_tokens": len(tokens), "completion_tokens": 4}}
+
+    def save_state(self):
+        return SimpleNamespace(input_ids=list(self.input_ids), n_tokens=self.n_tokens)
+
+    def load_state(self, state):
+        self.input_ids, self.n_tokens = list(state.input_ids), state.n_tokens
+        self.loads += 1
+
+    def reset(self):
+        self.resets += 1
+
+
+@pytest.mark.llm
+def test_prefix_state_is_evaluated_once_and_restored_per_call():
+    """Only the per-row suffix counts as evaluated once the prefix is cached."""
+    fake = _FakeLlama()
+    with patch.object(llm_app, "_load_llm", return_value=fake), \
+            patch.object(llm_app, "_json_grammar", return_value=None), \
+            patch.object(llm_app, "_PREFIX_STATE", None), \
+            patch.object(llm_app, "PREFIX_CACHE", True), \
+            patch.dict(llm_app.TOKEN_STATS, {k: 0 for k in llm_app.TOKEN_STATS}):
+        first = llm_app._call_llm("Information, McG")
+        llm_app._call_llm("Info Studies, McGill")
+        stats = llm_app._token_stats()
+        prefix_len = llm_app._PREFIX_STATE.n_tokens
+
+    assert first["standardized_university"] == "McGill University"
+    assert fake.loads == 2 and fake.resets == 0
+    assert stats["prompt_reused"] == 2 * prefix_len
+    assert stats["prompt_evaluated"] < stats["prompt_reused"]
+
+
+@pytest.mark.llm
+def test_prefix_cache_disabled_evaluates_full_prompt():
+    """With PREFIX_CACHE off every prompt token is evaluated."""
+    fake = _FakeLlama()
+    with patch.object(llm_app, "_load_llm", return_value=fake), \
+            patch.object(llm_app, "_json_grammar", return_value=None), \
+            patch.object(llm_app, "PREFIX_CACHE", False), \
+            patch.dict(llm_app.TOKEN_STATS, {k: 0 for k in llm_app.TOKEN_STATS}):
+        llm_app._call_llm("Information, McG")
+        stats = llm_app._token_stats()
+
+    assert fake.resets == 1
+    assert stats["prompt_reused"] == 0
+    assert stats["prompt_evaluated"] == fake.n_tokens
+
+
+@pytest.mark.llm
+def test_micro_batcher_dedupes_across_concurrent_callers():
+    """Identical rows from two callers are inferred once and routed to both."""
+
+    dispatched = []
+    gate = threading.Event()
+
+    def dispatch(texts):
+        gate.wait(timeout=5)
+        dispatched.extend(texts)
+        return [{"standardized_program": t.upper(), "standardized_university": "U"}
+                for t in texts]
+
+    batcher = llm_app.MicroBatcher(dispatch, max_size=8, max_wait_ms=50)
+    first = batcher.submit(["Math, UBC", "Physics, MIT "])
+    second = batcher.submit(["Physics,  MIT", "Chemistry, Yale"])
+    gate.set()
+
+    assert [f.result(timeout=5)["standardized_program"] for f in first] == \
+        ["MATH, UBC", "PHYSICS, MIT"]
+    assert second[0] is first[1]
+    assert sorted(dispatched) == ["Chemistry, Yale", "Math, UBC", "Physics, MIT"]
+    assert batcher.stats()["batch_size"]["count"] >= 1
+
+
+@pytest.mark.llm
+def test_micro_batcher_propagates_dispatch_errors():
+    """A failing batch raises in every caller instead of hanging them."""
+    def dispatch(_texts):
+        raise RuntimeError("model crashed")
+
+    batcher = llm_app.MicroBatcher(dispatch, max_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.standardize(["Math, UBC"])
+
+
+@pytest.mark.llm
+def test_micro_batcher_fails_short_dispatch_results():
+    """A dispatch that drops rows fails its callers instead of killing the thread."""
+    calls = []
+
+    def dispatch(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            return []
+        return [{"standardized_program": t, "standardized_university": "U"} for t in texts]
+
+    batcher = llm_app.MicroBatcher(dispatch, max_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="0 results for 1 rows"):
+        batcher.standardize(["Math, UBC"])
+    assert batcher.standardize(["math, ubc"])[0]["standardized_program"] == "math, ubc"
+
+
+@pytest.mark.llm
+def test_micro_batcher_dedupes_on_the_cache_key():
+    """Rows differing only in case share one in-flight future, like the cache."""
+    gate = threading.Event()
+
+    def dispatch(texts):
+        gate.wait(timeout=5)
+        return [{"standardized_program": t, "standardized_university": "U"} for t in texts]
+
+    batcher = llm_app.MicroBatcher(dispatch, max_size=4, max_wait_ms=50)
+    first, second = batcher.submit(["Math, UBC", "MATH, ubc"])
+    gate.set()
+    assert first is second and first.result(timeout=5)
+
+
+@pytest.mark.llm
+def test_request_wait_is_bounded_by_result_timeout():
+    """A row that never resolves yields 504 / a stream error line, not a hung request."""
+    never = Future()
+    client = llm_app.app.test_client()
+    with patch.object(llm_app, "_submit_rows", return_value=[never]), \
+            patch.object(llm_app, "RESULT_TIMEOUT_S", 0.05):
+        resp = client.post("/standardize", json=[{"program": "x"}])
+        lines = client.post("/standardize/stream", data='{"program": "x"}\n').data
+
+    assert resp.status_code == 504
+    assert json.loads(lines) == {"_stream_error": "timed out after 0.05s", "line": 1}
+
+
+@pytest.mark.llm
+def test_standardize_endpoint_goes_through_batcher():
+    """POST /standardize fills both llm-generated fields for every row."""
+    fake = {"standardized_program": "Mathematics",
+            "standardized_university": "University of British Columbia"}
+    with patch.object(llm_app, "_call_llm", return_value=fake):
+        resp = llm_app.app.test_client().post(
+            "/standardize", json={"rows": [{"program": "Mathematics, UBC"}]}
+        )
+    row = resp.json["rows"][0]
+    assert row["llm-generated-university"] == "University of British Columbia"
+
+
+@pytest.mark.llm
+def test_fast_path_rows_do_not_queue_behind_a_running_llm_batch():
+    """A request the rules resolve is answered while another client's model batch runs."""
+    running, release = threading.Event(), threading.Event()
+
+    def slow_llm(_text):
+        running.set()
+        release.wait(timeout=10)
+        return _MATH_UBC
+
+    client = llm_app.app.test_client()
+    with patch.object(llm_app, "_call_llm", side_effect=slow_llm) as mock_llm:
+        slow = threading.Thread(target=client.post, args=("/standardize",),
+                                kwargs={"json": [{"program": "Information, McG"}]})
+        slow.start()
+        try:
+            assert running.wait(timeout=5)
+            resp = llm_app.app.test_client().post(
+                "/standardize", json=[{"program": "Mathematics, UBC"}])
+            assert slow.is_alive()  # the model batch is still in progress
+        finally:
+            release.set()
+            slow.join(timeout=10)
+
+    assert resp.json["rows"][0]["llm-generated-university"] == "University of British Columbia"
+    mock_llm.assert_called_once_with("Information, McG")
+
+
+@pytest.mark.llm
+def test_result_cache_evicts_least_recently_used():
+    """The LRU stays bounded and a get() refreshes an entry's recency."""
+    cache = llm_app.ResultCache(max_size=2, ttl_s=0, path="")
+    cache.put("a", {"standardized_program": "A"})
+    cache.put("b", {"standardized_program": "B"})
+    assert cache.get("a") == {"standardized_program": "A"}
+    cache.put("c", {"standardized_program": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "expired": 0,
+                             "size": 2, "max_size": 2}
+
+
+@pytest.mark.llm
+def test_result_cache_ttl_expires_entries():
+    """Entries older than the TTL are dropped on lookup."""
+    cache = llm_app.ResultCache(max_size=4, ttl_s=30, path="")
+    cache.put("a", {"standardized_program": "A"})
+    with patch.object(llm_app.time, "time", return_value=time.time() + 31):
+        assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1 and cache.stats()["size"] == 0
+
+
+@pytest.mark.llm
+def test_result_cache_persists_current_version_only(tmp_path, monkeypatch):
+    """Snapshots round-trip, and a prompt/model version change discards them."""
+    monkeypatch.chdir(tmp_path)
+    cache = llm_app.ResultCache(max_size=4, ttl_s=0, path="cache.json", save_every=2)
+    cache.put("k1", {"standardized_program": "A"})
+    assert not (tmp_path / "cache.json").exists()
+    cache.put("k2", {"standardized_program": "B"})  # second put triggers a save
+
+    restored = llm_app.ResultCache(max_size=4, ttl_s=0, path="cache.json")
+    assert restored.get("k1") == {"standardized_program": "A"}
+
+    monkeypatch.setattr(llm_app, "RESULT_VERSION", "other")
+    assert llm_app.ResultCache(max_size=4, ttl_s=0, path="cache.json").stats()["size"] == 0
+    (tmp_path / "cache.json").write_text("not json", encoding="utf-8")
+    assert llm_app.ResultCache(max_size=4, ttl_s=0, path="cache.json").stats()["size"] == 0
+    (tmp_path / "cache.json").write_text("[1, 2]", encoding="utf-8")
+    assert llm_app.ResultCache(max_size=4, ttl_s=0, path="cache.json").stats()["size"] == 0
+    assert [p.name for p in tmp_path.iterdir()] == ["cache.json"]  # no temp files left
+
+
+@pytest.mark.llm
+def test_result_cache_put_survives_a_failed_save(tmp_path, monkeypatch, caplog):
+    """A save error on put is logged; the entry is still cached in memory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "gone").mkdir()
+    cache = llm_app.ResultCache(max_size=4, ttl_s=0, path="gone/cache.json", save_every=1)
+    (tmp_path / "gone").rmdir()
+
+    cache.put("k1", {"standardized_program": "A"})
+
+    assert cache.get("k1") == {"standardized_program": "A"}
+    assert "result cache save" in caplog.text
+
+
+@pytest.mark.llm
+def test_standardize_endpoint_dedupes_and_serves_cache_hits(fresh_result_cache):
+    """Duplicate rows in a request are inferred once; repeats are served from cache."""
+    fake = {"standardized_program": "Mathematics",
+            "standardized_university": "University of British Columbia"}
+    rows = [{"program": "Information, McG"}, {"program": " information,  McG"},
+            {"program": "Information, McG"}]
+    client = llm_app.app.test_client()
+    with patch.object(llm_app, "_call_llm", return_value=fake) as mock_std:
+        first = client.post("/standardize", json={"rows": rows})
+        second = client.post("/standardize", json={"rows": rows})
+
+    mock_std.assert_called_once()
+    assert [r["llm-generated-program"] for r in first.json["rows"]] == ["Mathematics"] * 3
+    assert second.json["rows"] == first.json["rows"]
+    stats = client.get("/stats").json["cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["size"] == 1
+    assert fresh_result_cache.get(llm_app._result_key("INFORMATION, MCG")) == fake
+
+
+@pytest.mark.llm
+def test_grammar_mode_constrains_output_and_budget():
+    """Grammar mode passes the JSON grammar and the smaller token budget."""
+    fake = _FakeLlama()
+    with patch.object(llm_app, "_load_llm", return_value=fake), \
+            patch.object(llm_app, "_json_grammar", return_value="GRAMMAR"), \
+            patch.object(llm_app, "LLM_OUTPUT_MODE", "grammar"):
+        llm_app._call_llm("Information, McG")
+
+    assert fake.kwargs["grammar"] == "GRAMMAR"
+    assert fake.kwargs["max_tokens"] == llm_app.JSON_MAX_TOKENS
+
+
+@pytest.mark.llm
+def test_free_mode_counts_parse_failures():
+    """Unparseable free-form chatter falls back to the splitter and is counted."""
+    fake = _FakeLlama(content="Sure! The program is Information at McGill.")
+    with patch.object(llm_app, "_load_llm", return_value=fake), \
+            patch.object(llm_app, "LLM_OUTPUT_MODE", "free"), \
+            patch.dict(llm_app.TOKEN_STATS, {k: 0 for k in llm_app.TOKEN_STATS}):
+        out = llm_app._call_llm("Information, McG")
+        stats = llm_app._token_stats()
+
+    assert "grammar" not in fake.kwargs
+    assert out["standardized_university"] == "McGill University"
+    assert stats["rows"] == 1 and stats["parse_failures"] == 1
+
+
+def _pool_infer(text):
+    """Worker-side stand-in for _call_llm; the first 'crash' kills its process."""
+    flag = os.environ["POOL_CRASH_FLAG"]
+    if text == "crash" and not os.path.exists(flag):
+        open(flag, "w", encoding="utf-8").close()
+        os._exit(1)
+    llm_app._add_token_stats({"rows": 1, "completion": 2})
+    return {"standardized_program": text.upper(), "standardized_university": "U"}
+
+
+def _worker_cache_info(_text):
+    """Worker-side infer reporting the worker's own result cache setup."""
+    return {"standardized_program": llm_app.RESULT_CACHE.path,
+            "standardized_university": str(llm_app.IN_MODEL_WORKER)}
+
+
+@pytest.mark.llm
+def test_model_workers_never_touch_the_result_cache_file(tmp_path, monkeypatch):
+    """Spawned workers get a memory-only cache, so exiting cannot overwrite the snapshot."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RESULT_CACHE_PATH", "cache.json")
+    pool = llm_app.ModelPool(1, infer=_worker_cache_info, warmup=None, health_interval=60)
+    try:
+        assert pool.run(["x"]) == [{"standardized_program": "",
+                                    "standardized_university": "True"}]
+    finally:
+        pool.close()
+    assert llm_app.WORKER_ENV not in os.environ and not llm_app.IN_MODEL_WORKER
+    assert not (tmp_path / "cache.json").exists()
+
+
+@pytest.mark.llm
+def test_model_pool_spreads_work_and_restarts_crashed_workers(tmp_path, monkeypatch):
+    """Results keep input order; a crashed worker is replaced and its chunk retried."""
+    monkeypatch.setenv("POOL_CRASH_FLAG", str(tmp_path / "crashed"))
+    monkeypatch.setattr(llm_app, "TOKEN_STATS", {k: 0 for k in llm_app.TOKEN_STATS})
+    pool = llm_app.ModelPool(2, infer=_pool_infer, warmup=None, health_interval=0.2)
+    try:
+        out = pool.run(["a", "b", "c"])
+        assert [r["standardized_program"] for r in out] == ["A", "B", "C"]
+
+        assert pool.run(["crash", "d"])[0]["standardized_program"] == "CRASH"
+        assert pool.restarts == 1
+        health = pool.health()
+        assert all(w["alive"] for w in health)
+        assert sum(w["rows"] for w in health) == 5
+        tokens = llm_app._token_stats()
+        assert tokens["rows"] == 5 and tokens["completion"] == 10
+
+        pool.workers[0].proc.kill()
+        pool.workers[0].proc.join()
+        for _ in range(50):
+            if pool.restarts == 2:
+                break
+            time.sleep(0.1)
+        assert pool.restarts == 2 and pool.health()[0]["alive"]
+    finally:
+        pool.close()
+
+
+@pytest.mark.llm
+def test_stream_endpoint_emits_ndjson_lines_in_order():
+    """NDJSON in, one NDJSON line out per input row; bad lines are reported in place."""
+    body = '{"program": "Information, McG"}\nnot json\n\n{"program": "information, mcg"}\n'
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC) as mock_std:
+        resp = llm_app.app.test_client().post("/standardize/stream", data=body)
+        lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+
+    assert resp.mimetype == "application/x-ndjson"
+    mock_std.assert_called_once()
+    assert lines[0]["llm-generated-program"] == "Mathematics"
+    assert lines[1] == {"_stream_error": "invalid JSON row", "line": 2}
+    assert lines[2]["program"] == "information, mcg"
+
+
+@pytest.mark.llm
+def test_stream_endpoint_accepts_json_and_reports_row_errors():
+    """JSON arrays, {'rows': [...]} and single objects stream too; failures become error lines."""
+    client = llm_app.app.test_client()
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC):
+        array = client.post("/standardize/stream", json=[{"program": "A"}, {"program": "B"}])
+        single = client.post("/standardize/stream", json={"program": "C"})
+    assert len(array.data.decode().splitlines()) == 2
+    assert json.loads(single.data)["llm-generated-university"] == "University of British Columbia"
+
+    with patch.object(llm_app, "_call_llm", side_effect=RuntimeError("boom")):
+        failed = client.post("/standardize/stream", json={"rows": [{"program": "D"}]})
+    assert json.loads(failed.data) == {"_stream_error": "boom", "line": 1}
+
+
+@pytest.mark.llm
+def test_stream_endpoint_answers_rows_before_the_body_is_read():
+    """The body is consumed line by line: a resolved row is written before the next is read."""
+    text = '{"program": "Physics, Harvard University"}\n{"program": "Information, McG"}\n'
+    body = io.BytesIO(text.encode("utf-8"))
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC):
+        resp = llm_app.app.test_client().post(
+            "/standardize/stream", input_stream=body, content_length=len(text), buffered=False)
+        chunks = iter(resp.response)
+
+        assert json.loads(next(chunks))["llm-generated-program"] == "Physics"
+        assert body.tell() == text.index("\n") + 1
+        assert json.loads(next(chunks))["llm-generated-program"] == "Mathematics"
+        resp.close()
+
+
+@pytest.mark.llm
+def test_stream_endpoint_reports_non_object_lines_in_place():
+    """JSON that is not a row object (or an array of them) is an error line, not a 500."""
+    body = '[1]\n"x"\n{"program": "Physics, Harvard University"}\n{"rows": [2]}\n'
+    resp = llm_app.app.test_client().post("/standardize/stream", data=body)
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+
+    assert resp.status_code == 200
+    assert lines[:2] == [{"_stream_error": "row is not a JSON object", "line": n} for n in (1, 2)]
+    assert lines[2]["llm-generated-program"] == "Physics"
+    assert lines[3] == {"_stream_error": "row is not a JSON object", "line": 4}
+
+    pretty = json.dumps([{"program": "Physics, Harvard University"}], indent=2)
+    lines = llm_app.app.test_client().post("/standardize/stream", data=pretty).data.splitlines()
+    assert json.loads(lines[0])["llm-generated-program"] == "Physics"
+
+
+class _StreamedResponse:
+    """urlopen() stand-in that replays a Flask test response line by line."""
+
+    def __init__(self, resp):
+        self.data = resp.data
+
+    def __enter__(self):
+        return self
+
+    def __iter__(self):
+        return iter(self.data.splitlines(keepends=True))
+
+    def read(self):
+        """Whole body, as used by the non-streaming _post_json()."""
+        return self.data
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.mark.llm
+def test_data_cleaner_stream_mode_checkpoints_rows(tmp_path):
+    """DataCleaner(stream=True) fills rows from the stream and saves partial progress."""
+    from clean import DataCleaner  # pylint: disable=import-outside-toplevel
+
+    rows = [{"program": "Mathematics, UBC"}, {"program": "Mathematics, UBC"},
+            {"program": "Physics, UBC"}]
+    (tmp_path / "in.json").write_text(json.dumps(rows), encoding="utf-8")
+    cleaner = DataCleaner(str(tmp_path / "in.json"), str(tmp_path / "out.json"),
+                          stream=True, checkpoint_every=1)
+    client = llm_app.app.test_client()
+
+    def fake_urlopen(req, timeout):
+        assert timeout == cleaner.timeout_seconds
+        if req.full_url.endswith("/stream"):
+            return _StreamedResponse(client.post("/standardize/stream", data=req.data))
+        return _StreamedResponse(client.post("/standardize", data=req.data))
+
+    saves = []
+    real_save = cleaner._atomic_save
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC), \
+            patch("urllib.request.urlopen", fake_urlopen), \
+            patch.object(cleaner, "_atomic_save",
+                         side_effect=lambda data: saves.append(len(data)) or real_save(data)):
+        cleaned = cleaner.clean_data()
+
+    assert [r["llm-generated-program"] for r in cleaned] == ["Mathematics"] * 2 + ["Physics"]
+    assert saves == [1, 2, 3, 3]
+    assert json.loads((tmp_path / "out.json").read_text(encoding="utf-8")) == cleaned
+
+
+@pytest.mark.llm
+def test_data_cleaner_stream_mode_resumes_after_checkpoint(tmp_path):
+    """A rerun keeps the checkpointed prefix made from the same input and sends only the rest."""
+    from clean import DataCleaner  # pylint: disable=import-outside-toplevel
+
+    rows = [{"program": f"Information {i}, McG", "overview_url": f"u{i}"} for i in range(4)]
+    (tmp_path / "in.json").write_text(json.dumps(rows), encoding="utf-8")
+    saved = [dict(row, **{"llm-generated-program": "Saved",
+                          "llm-generated-university": "Saved"}) for row in rows[:3]]
+    saved[2]["overview_url"] = "other input"
+    (tmp_path / "out.json").write_text(json.dumps(saved), encoding="utf-8")
+    cleaner = DataCleaner(str(tmp_path / "in.json"), str(tmp_path / "out.json"), stream=True)
+    client = llm_app.app.test_client()
+    sent = []
+
+    def fake_urlopen(req, timeout):  # pylint: disable=unused-argument
+        if req.full_url.endswith("/stream"):
+            sent.extend(json.loads(line) for line in req.data.splitlines())
+            return _StreamedResponse(client.post("/standardize/stream", data=req.data))
+        return _StreamedResponse(client.post("/standardize", data=req.data))
+
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC), \
+            patch("urllib.request.urlopen", fake_urlopen):
+        cleaned = cleaner.clean_data()
+
+    assert [row["overview_url"] for row in sent] == ["u2", "u3"]
+    assert [r["llm-generated-program"] for r in cleaned] == ["Saved"] * 2 + ["Mathematics"] * 2
+
+    (tmp_path / "out.json").write_text("{", encoding="utf-8")
+    assert cleaner._resume_checkpoint(rows) == 0
+    (tmp_path / "out.json").write_text("{}", encoding="utf-8")
+    assert cleaner._resume_checkpoint(rows) == 0
+
+
+@pytest.mark.llm
+def test_data_cleaner_caches_per_program_and_university(tmp_path):
+    """The same program at two universities is standardized twice, not served from cache."""
+    from clean import DataCleaner  # pylint: disable=import-outside-toplevel
+
+    cleaner = DataCleaner(str(tmp_path / "in.json"), str(tmp_path / "out.json"))
+    batch = [{"program": "Physics PhD", "university": "Harvard University"},
+             {"program": "Physics PhD", "university": "Brown University"}]
+    again = [{"program": "physics phd", "university": "Brown University"}]
+    assert cleaner.standardize_batch(batch, use_api=False)[0] == 0
+    assert cleaner.standardize_batch(again, use_api=False)[0] == 1
+    assert [row["llm-generated-university"] for row in batch + again] == \
+        ["Harvard University", "Brown University", "Brown University"]
+
+
+class _TruncatedStream(_StreamedResponse):
+    """Replays the first line, then dies the way a dropped chunked response does."""
+
+    def __iter__(self):
+        yield self.data.splitlines(keepends=True)[0]
+        raise http.client.IncompleteRead(b"")
+
+
+@pytest.mark.llm
+def test_data_cleaner_stream_falls_back_after_a_dropped_connection(tmp_path):
+    """A truncated stream finishes in-process; a row's own "error" field is just data."""
+    from clean import DataCleaner  # pylint: disable=import-outside-toplevel
+
+    rows = [{"program": "Mathematics, UBC", "error": "n/a"}, {"program": "Physics, UBC"}]
+    (tmp_path / "in.json").write_text(json.dumps(rows), encoding="utf-8")
+    cleaner = DataCleaner(str(tmp_path / "in.json"), str(tmp_path / "out.json"), stream=True)
+    client = llm_app.app.test_client()
+
+    def fake_urlopen(req, timeout):  # pylint: disable=unused-argument
+        if req.full_url.endswith("/stream"):
+            return _TruncatedStream(client.post("/standardize/stream", data=req.data))
+        return _StreamedResponse(client.post("/standardize", data=req.data))
+
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC), \
+            patch("urllib.request.urlopen", fake_urlopen):
+        cleaned = cleaner.clean_data()
+
+    assert cleaned[0]["error"] == "n/a"
+    assert [r["llm-generated-program"] for r in cleaned] == ["Mathematics", "Physics"]
+
+
+@pytest.mark.llm
+def test_cli_resumes_from_existing_output(tmp_path, monkeypatch, capsys):
+    """--append skips rows already in the JSONL output and repairs a torn last line."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llm_app, "CLI_CHUNK_ROWS", 4)
+    rows = [{"program": f"Information {i % 3}, McG", "overview_url": f"u{i}"} for i in range(10)]
+    (tmp_path / "in.json").write_text(json.dumps(rows), encoding="utf-8")
+
+    with patch.object(llm_app, "_call_llm", return_value=_MATH_UBC) as mock_std:
+        llm_app._cli_process_file("in.json", "out.jsonl", append=False, to_stdout=False)
+        assert mock_std.call_count == 3  # one per distinct program
+        kept = (tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines(True)[:6]
+        (tmp_path / "out.jsonl").write_text("".join(kept) + '{"torn', encoding="utf-8")
+        llm_app._cli_process_file("in.json", "out.jsonl", append=True, to_stdout=False)
+
+    out = [json.loads(line) for line in (tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [row["overview_url"] for row in out] == [f"u{i}" for i in range(10)]
+    assert "4 rows | 6 skipped | 100.0%" in capsys.readouterr().err
+
+
+@pytest.mark.llm
+def test_bench_llm_restores_the_setting(tmp_path, monkeypatch, capsys):
+    """Each value is benchmarked in turn; the module setting is put back, even on failure."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "in.json").write_text(json.dumps([{"program": "P"}]), encoding="utf-8")
+    seen = []
+    monkeypatch.setattr(llm_app, "_load_llm", lambda: None)
+    original = llm_app.LLM_OUTPUT_MODE
+
+    with patch.object(llm_app, "_call_llm",
+                      side_effect=lambda _text: seen.append(llm_app.LLM_OUTPUT_MODE)):
+        llm_app._bench_llm("in.json", "LLM_OUTPUT_MODE", ("free", "grammar"))
+    assert seen == ["free", "grammar"] and llm_app.LLM_OUTPUT_MODE == original
+    assert "LLM_OUTPUT_MODE=grammar" in capsys.readouterr().err
+
+    with patch.object(llm_app, "_call_llm", side_effect=RuntimeError("boom")), \
+            pytest.raises(RuntimeError):
+        llm_app._bench_llm("in.json", "LLM_OUTPUT_MODE", ("grammar",))
+    assert llm_app.LLM_OUTPUT_MODE == original
+
+
+@pytest.mark.llm
+@pytest.mark.parametrize("chunk_size", [5, 1 << 16])
+def test_iter_json_rows_streams_arrays_and_jsonl(tmp_path, chunk_size):
+    """Arrays, {'rows': [...]} and JSONL all stream row by row, whatever the read size."""
+    rows = [{"program": f"P{i}", "comments": "é, [x]"} for i in range(5)]
+    (tmp_path / "a.json").write_text(json.dumps(rows, indent=2), encoding="utf-8")
+    (tmp_path / "r.json").write_text(json.dumps({"rows": rows}), encoding="utf-8")
+    (tmp_path / "l.jsonl").write_text("\n".join(map(json.dumps, rows)) + "\n", encoding="utf-8")
+
+    for name in ("a.json", "r.json", "l.jsonl"):
+        streamed = list(llm_app._iter_json_rows(str(tmp_path / name), chunk_size))
+        assert [row for row, _ in streamed] == rows
+        fractions = [frac for _, frac in streamed]
+        assert fractions == sorted(fractions) and 0.9 < fractions[-1] <= 1.0
+
+
+@pytest.mark.llm
+def test_iter_json_rows_streams_the_rows_key(tmp_path):
+    """{"rows": [...]} yields its first row before the rest of the file is read."""
+    rows = [{"program": f"P{i}", "notes": "x" * 100} for i in range(50)]
+    path = tmp_path / "r.json"
+    path.write_text('\n{ "rows" :\n [' + ",".join(map(json.dumps, rows)) + '], "count": 50}',
+                    encoding="utf-8")
+
+    stream = llm_app._iter_json_rows(str(path), 64)
+    first, frac = next(stream)
+    assert first == rows[0] and frac < 0.1
+    assert [row for row, _ in stream] == rows[1:]
+
+    path.write_text('{"count": 1, "rows": [{"program": "P"}]}', encoding="utf-8")
+    assert [row for row, _ in llm_app._iter_json_rows(str(path), 8)] == [{"program": "P"}]
+    path.write_text('[{"program": "P"}, {"prog', encoding="utf-8")
+    with pytest.raises(ValueError, match="invalid JSON"):
+        list(llm_app._iter_json_rows(str(path), 8))
+
+
+@pytest.mark.llm
+def test_stub_backend_is_deterministic_and_reuses_the_prefix(monkeypatch):
+    """LLM_BACKEND=stub answers offline through the normal _call_llm path."""
+    monkeypatch.setattr(llm_app, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(llm_app, "STUB_TOKEN_MS", 0.0)
+    monkeypatch.setattr(llm_app, "STUB_PROMPT_TOKEN_MS", 0.0)
+    monkeypatch.setattr(llm_app, "_LLM", None)
+    monkeypatch.setattr(llm_app, "_PREFIX_STATE", None)
+    monkeypatch.setattr(llm_app, "PREFIX_CACHE", True)
+    with patch.object(llm_app, "_json_grammar", return_value=None), \
+            patch.dict(llm_app.TOKEN_STATS, {k: 0 for k in llm_app.TOKEN_STATS}):
+        first = llm_app._call_llm("Information, McG")
+        again = llm_app._call_llm("Information, McG")
+        stats = llm_app._token_stats()
+
+    assert isinstance(llm_app._LLM, llm_app.StubLlama)
+    assert first == again == {"standardized_program": "Information",
+                              "standardized_university": "McGill University"}
+    assert stats["parse_failures"] == 0
+    assert stats["prompt_reused"] == 2 * (llm_app._PREFIX_STATE.n_tokens - 3)
+
+
+@pytest.mark.llm
+def test_stub_latency_scales_with_tokens_and_unknown_backends_fail(monkeypatch):
+    """Stub sleeps per evaluated prompt token and per generated token."""
+    stub = llm_app.StubLlama(token_ms=1.0, prompt_token_ms=0.5)
+    messages = [{"role": "user", "content": json.dumps({"program": "Physics, MIT"})}]
+    with patch.object(llm_app.time, "sleep") as mock_sleep:
+        out = stub.create_chat_completion(messages=messages, max_tokens=4)
+        stub.create_chat_completion(messages=messages, max_tokens=4)
+    usage = out["usage"]
+    assert usage["completion_tokens"] == 4
+    assert mock_sleep.call_args_list[0].args[0] == pytest.approx(
+        (usage["prompt_tokens"] * 0.5 + 4 * 1.0) / 1000
+    )
+
+    monkeypatch.setattr(llm_app, "LLM_BACKEND", "nope")
+    monkeypatch.setattr(llm_app, "_LLM", None)
+    with pytest.raises(RuntimeError, match="Unknown LLM_BACKEND"):
+        llm_app._load_llm()
+
+
+@pytest.mark.llm
+def test_import_does_not_load_heavy_model_libraries():
+    """llama_cpp and huggingface_hub are only imported when the llama backend loads."""
+    import subprocess  # pylint: disable=import-outside-toplevel
+    import sys  # pylint: disable=import-outside-toplevel
+
+    code = ("import sys; from llm_hosting import app; "
+            "print(any(m in sys.modules for m in ('llama_cpp', 'huggingface_hub')))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(llm_app.__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, check=True,
+                         capture_output=True, text=True)
+    assert out.stdout.strip() == "False"
+
+
+@pytest.mark.llm
+def test_local_gguf_skips_the_hub(tmp_path, monkeypatch):
+    """A GGUF already in MODELS_DIR is loaded directly, without hf_hub_download."""
+    (tmp_path / "model.gguf").write_bytes(b"")
+    monkeypatch.setattr(llm_app, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_app, "MODEL_FILE", "model.gguf")
+    with patch("llama_cpp.Llama") as mock_llama, \
+            patch("huggingface_hub.hf_hub_download") as mock_download:
+        llm_app._load_llama_cpp()
+    mock_download.assert_not_called()
+    assert mock_llama.call_args.kwargs["model_path"] == str(tmp_path / "model.gguf")
+
+    monkeypatch.setattr(llm_app, "MODEL_FILE", "missing.gguf")
+    with patch("llama_cpp.Llama"), \
+            patch("huggingface_hub.hf_hub_download", return_value="x.gguf") as mock_download:
+        llm_app._load_llama_cpp()
+    assert mock_download.call_args.kwargs["local_dir"] == str(tmp_path)
+
+
+@pytest.mark.llm
+def test_ready_endpoint_tracks_background_warmup(monkeypatch):
+    """/ready is 503 until the warm-up thread has loaded the model; / stays live."""
+    monkeypatch.setattr(llm_app, "READINESS", {"ready": False, "warming": False,
+                                               "error": None, "warmup_s": None})
+    monkeypatch.setattr(llm_app, "LLM_BACKEND", "stub")
+    monkeypatch.setattr(llm_app, "_LLM", None)
+    monkeypatch.setattr(llm_app, "_PREFIX_STATE", None)
+    client = llm_app.app.test_client()
+    assert client.get("/ready").status_code == 503
+    assert client.get("/").status_code == 200
+
+    with patch.object(llm_app, "_load_llm", side_effect=OSError("no model")):
+        llm_app.start_warmup().join(timeout=10)
+    failed = client.get("/ready")
+    assert failed.status_code == 503 and "no model" in failed.json["error"]
+
+    llm_app.start_warmup().join(timeout=10)
+    resp = client.get("/ready")
+    assert resp.status_code == 200 and resp.json["error"] is None
+    assert llm_app._PREFIX_STATE is not None
+
+
+@pytest.mark.llm
+def test_canonical_lists_load_from_any_working_directory(tmp_path):
+    """The packaged canon_*.txt files load even when cwd is elsewhere (e.g. src/)."""
+    import subprocess  # pylint: disable=import-outside-toplevel
+    import sys  # pylint: disable=import-outside-toplevel
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(llm_app.__file__)))
+    code = (f"import sys; sys.path.insert(0, {root!r}); from llm_hosting import app; "
+            "print(len(app.CANON_UNIS) > 0, len(app.CANON_PROGS) > 0)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, check=True,
+                         capture_output=True, text=True)
+    assert out.stdout.split() == ["True", "True"]
+
+
+@pytest.mark.llm
+def test_stats_do_not_wait_for_a_running_generation():
+    """GET /stats answers while _LLM_LOCK is held by an in-flight inference."""
+    with llm_app._LLM_LOCK:
+        resp = llm_app.app.test_client().get("/stats")
+    assert resp.status_code == 200 and "llm_tokens" in resp.json
+
+
+class _SlowPool:
+    """Pool stand-in whose single run() call takes 80 ms for the whole batch."""
+
+    def run(self, texts):
+        time.sleep(0.08)
+        return [{"standardized_program": t, "standardized_university": "U"} for t in texts]
+
+
+@pytest.mark.llm
+def test_pool_dispatch_charges_each_row_its_own_time(monkeypatch):
+    """Fast-path rows are timed individually; escalated rows split the pool call."""
+    monkeypatch.setattr(llm_app, "PATH_STATS", {
+        "fast_path": {"count": 0, "seconds": 0.0}, "llm": {"count": 0, "seconds": 0.0}})
+    rows = [{"program": text} for text in
+            ("Mathematics, UBC", "zzqx one", "zzqx two", "zzqx three", "zzqx four")]
+    with patch.object(llm_app, "_get_pool", return_value=_SlowPool()):
+        llm_app._wait_results(llm_app._submit_rows(rows))
+    stats = llm_app._path_stats()
+
+    assert stats["fast_path"]["count"] == 1 and stats["fast_path"]["avg_ms"] < 40
+    assert stats["llm"]["count"] == 4 and 15 <= stats["llm"]["avg_ms"] < 40
+
+
+@pytest.mark.llm
+def test_first_request_starts_warmup_under_any_server(monkeypatch):
+    """Without --serve, the first request starts warm-up exactly once."""
+    monkeypatch.setattr(llm_app, "_WARMUP_STARTED", threading.Event())
+    monkeypatch.setattr(llm_app, "READINESS", {"ready": False})
+    client = llm_app.app.test_client()
+    with patch.object(llm_app, "start_warmup") as mock_start:
+        client.get("/")
+        client.get("/ready")
+    mock_start.assert_called_once()
+
+    monkeypatch.setattr(llm_app, "_WARMUP_STARTED", threading.Event())
+    monkeypatch.setattr(llm_app, "WARMUP", False)
+    assert client.get("/ready").status_code == 200  # lazy mode is ready at once
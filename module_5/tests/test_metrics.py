@@ -0,0 +1,65 @@
+import logging
+
+import pytest
+import metrics
+import query_data
+from metrics import Histogram
+
+
+@pytest.mark.unit
+def test_histogram_renders_cumulative_prometheus_buckets():
+    """Buckets are cumulative, +Inf equals _count, and label values are escaped."""
+    hist = Histogram("demo_seconds", "Demo.", "query", (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        hist.observe('q"1', value)
+    assert hist.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{query="q\\"1",le="0.1"} 2',
+        'demo_seconds_bucket{query="q\\"1",le="1"} 3',
+        'demo_seconds_bucket{query="q\\"1",le="+Inf"} 4',
+        'demo_seconds_sum{query="q\\"1"} 3.65',
+        'demo_seconds_count{query="q\\"1"} 4',
+    ]
+    assert hist.snapshot() == {'q"1': {"count": 4, "sum": pytest.approx(3.65)}}
+
+
+@pytest.mark.web
+def test_metrics_endpoint_exposes_query_and_connection_histograms(client, db_cursor):
+    """Every get_qN is timed; SQL rows and connection acquire/hold times are recorded."""
+    before = metrics.QUERY_SECONDS.snapshot().get("q1", {"count": 0})["count"]
+    assert client.post("/update-analysis").status_code == 200
+    assert metrics.QUERY_SECONDS.snapshot()["q1"]["count"] == before + 1
+    assert metrics.QUERY_ROWS.snapshot()["q11"]["count"] >= 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.data.decode()
+    assert "# TYPE query_seconds histogram" in text
+    assert 'query_seconds_bucket{query="q11",le="+Inf"}' in text
+    assert 'query_rows_bucket{query="q2",le="1"}' in text
+    assert 'db_connection_acquire_seconds_count{pool="pooled"}' in text
+    assert 'db_cursor_seconds_count{pool="direct"}' in text  # ensure_schema in db_cursor
+
+
+@pytest.mark.analysis
+def test_slow_queries_are_logged_with_opt_in_explain(db_cursor, monkeypatch, caplog):
+    """Over SLOW_QUERY_MS a question is logged; EXPLAIN (ANALYZE, BUFFERS) only if enabled."""
+    monkeypatch.setattr(query_data, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="query_data"):
+        query_data.get_q1()
+    assert "Slow query q1:" in caplog.text
+    assert "Execution Time" not in caplog.text
+
+    caplog.clear()
+    monkeypatch.setattr(query_data, "SLOW_QUERY_EXPLAIN", True)
+    with caplog.at_level(logging.WARNING, logger="query_data"):
+        query_data.get_q1()
+        # EXPLAIN cannot wrap SHOW: the failure is logged, the answer still returned
+        rows, _ = query_data._fetch(query_data._compose("SHOW statement_timeout", 1))
+    assert "Buffers:" in caplog.text or "Execution Time" in caplog.text
+    assert "Slow query other:" in caplog.text
+    assert "EXPLAIN failed:" in caplog.text
+    assert rows
+    assert query_data.get_q1()["answer"] == "0 applications"
@@ -0,0 +1,71 @@
+"""
+tests/test_normalize_rows.py - batch (column-wise) normalizer vs. the per-row one
+"""
+import pytest
+
+import load_data
+from load_data import COLUMNS, normalize_row, normalize_rows
+
+RAW_ROWS = [
+    {"overview_url": "https://www.thegradcafe.com/result/101", "date_added": "20 Feb 2025",
+     "university": "JHU", "program": "CS", "gpa": "3.9", "gre_general": 330,
+     "gre_verbal": "", "gre_aw": None, "applicant_status": "Accepted",
+     "llm-generated-program": "Computer Science"},
+    {"overview_url": "", "date_added": "February 01, 2026", "gpa": "4.0"},
+    {"overview_url": "https://www.thegradcafe.com/result/102", "date_added": "February 01, 2026",
+     "gpa": "invalid", "gre_general": "  ", "gre_aw": "4.5", "citizenship": "International"},
+    {"overview_url": "https://www.thegradcafe.com/survey/abc", "date_added": "not-a-date"},
+    {"overview_url": "https://www.thegradcafe.com/result/103", "date_added": "not-a-date",
+     "gre_verbal": 165.0, "degree_level": "PhD"},
+    {"overview_url": "https://www.thegradcafe.com/result/104"},
+    {"overview_url": "https://www.thegradcafe.com/result/105", "gpa": {"value": 3.7},
+     "gre_general": [320]},
+]
+
+
+@pytest.mark.unit
+def test_normalize_rows_matches_normalize_row():
+    """Column arrays hold exactly the per-row results, minus rows without an ID.
+
+    Both paths share one coercion rule: dict/list scores become None, not an error.
+    """
+    columns = normalize_rows(RAW_ROWS)
+    expected = [normalize_row(r) for r in RAW_ROWS]
+    expected = [r for r in expected if r["p_id"] is not None]
+
+    assert tuple(columns) == COLUMNS
+    assert columns["p_id"] == [101, 102, 103, 104, 105]
+    assert [dict(zip(COLUMNS, values)) for values in zip(*columns.values())] == expected
+
+
+@pytest.mark.unit
+def test_normalize_rows_memoizes_dates_and_handles_empty_input():
+    """Repeated date strings are parsed once; an empty chunk gives empty columns."""
+    load_data._parse_date.cache_clear()
+    normalize_rows([{"overview_url": f"/result/{i}", "date_added": "20 Feb 2025"}
+                    for i in range(50)])
+    assert load_data._parse_date.cache_info().misses == 1
+
+    assert normalize_rows([]) == {column: [] for column in COLUMNS}
+
+
+@pytest.mark.unit
+def test_normalize_rows_parallel_matches_serial(monkeypatch):
+    """The process-pool normalizer returns the same columns in the same order."""
+    monkeypatch.setattr(load_data, "NORMALIZE_MIN_CHUNK_ROWS", 1)
+    assert load_data.normalize_rows_parallel(RAW_ROWS, workers=2) == normalize_rows(RAW_ROWS)
+
+
+@pytest.mark.unit
+def test_normalize_chunks_give_each_worker_a_share(monkeypatch):
+    """workers > 1 splits even small loads, down to the per-chunk floor."""
+    rows = [{"overview_url": f"/result/{i}"} for i in range(10)]
+
+    chunks = load_data._normalize_chunks(rows, workers=4)
+    assert len(chunks) == 1
+
+    monkeypatch.setattr(load_data, "NORMALIZE_MIN_CHUNK_ROWS", 1)
+    chunks = load_data._normalize_chunks(rows, workers=4)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert load_data._normalize_chunks([], workers=4) == []
@@ -0,0 +1,226 @@
+import itertools
+import threading
+import time
+
+import psycopg
+import pytest
+import load_data
+import pipeline
+from events import EventBus, PipelineProgress
+from load_data import StreamingLoad, load_rows
+
+URL = "https://www.thegradcafe.com/result/"
+
+
+def _scraped(*ids, status="Accepted"):
+    """Records in the scraper's own key layout."""
+    return [{"url": f"{URL}{i}", "program": "CS", "status": status, "term": "Fall 2026",
+             "Degree": "PhD", "GPA": "3.9", "date_added": "February 01, 2026"} for i in ids]
+
+
+def _clean(batches):
+    for rows in batches:
+        for row in rows:
+            row["llm-generated-program"] = "Computer Science"
+        yield rows
+
+
+def _progress():
+    bus = EventBus()
+    return PipelineProgress(bus), bus.subscribe()
+
+
+class SlowLoader:
+    """Loader double: each write takes `delay` seconds."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay, self.fail = delay, fail
+        self.loaded, self.finished, self.aborted = 0, False, False
+
+    def write(self, rows):
+        if self.fail:
+            raise RuntimeError("database went away")
+        time.sleep(self.delay)
+        self.loaded += len(rows)
+
+    def finish(self):
+        self.finished = True
+        return self.loaded
+
+    def abort(self):
+        self.aborted = True
+
+
+@pytest.mark.unit
+def test_to_raw_row_maps_scraper_keys_for_the_loader():
+    """Scraper keys become the raw keys load_data reads; loader-format rows pass through."""
+    row = pipeline.to_raw_row(_scraped(7)[0])
+    assert row["overview_url"] == f"{URL}7" and "url" not in row
+    assert (row["applicant_status"], row["start_term"], row["degree_level"], row["gpa"]) \
+        == ("Accepted", "Fall 2026", "PhD", "3.9")
+    already = {"overview_url": f"{URL}8", "url": "kept"}
+    assert pipeline.to_raw_row(already) == already
+
+
+@pytest.mark.db
+def test_streaming_upserts_in_batches(db_cursor, capsys):
+    """Rows reach the table batch by batch; counts match a one-shot load."""
+    load_rows([pipeline.to_raw_row(row) for row in next(_clean([_scraped(1, 2)]))])
+    progress, events = _progress()
+    source = [_scraped(1, 2), _scraped(3, 4, 5), [{"program": "no url"}], _scraped(2, status="Rejected")]
+    stats = pipeline.run_pipeline(source, _clean, StreamingLoad(), progress,
+                                  total=5, queue_batches=1, load_batch_rows=2)
+    assert (stats["scraped"], stats["cleaned"], stats["loaded"]) == (7, 7, 6)
+    assert set(stats["busy_s"]) == {"scrape", "clean", "load"}
+    assert "(3 inserted, 1 updated, 2 unchanged). Skipped 1 rows" in capsys.readouterr().out
+
+    db_cursor.execute("SELECT p_id, status, llm_generated_program FROM applicants ORDER BY p_id;")
+    rows = db_cursor.fetchall()
+    assert [row["p_id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[1]["status"] == "Rejected" and rows[0]["llm_generated_program"] == "Computer Science"
+    final = []
+    while not events.empty():
+        final = events.get_nowait()
+    assert final["rows_loaded"] == 6 and final["rows_cleaned"] == 7
+    db_cursor.connection.commit()
+
+
+@pytest.mark.db
+def test_streaming_reset_swaps_in_only_complete_loads(db_cursor, capsys):
+    """reset COPYs into the shadow table (repeats keep the last row); no rows keeps the table."""
+    load_rows([pipeline.to_raw_row(row) for row in _scraped(9)])
+    loader = StreamingLoad(reset=True)
+    for batch in (_scraped(1, 2), _scraped(2, status="Rejected"), _scraped(3, 3)):
+        loader.write([pipeline.to_raw_row(row) for row in batch])
+    loader.write([{"program": "no url"}])
+    assert loader.finish() == 5
+    assert "(3 inserted, 1 updated, 1 unchanged)" in capsys.readouterr().out
+    db_cursor.execute("SELECT p_id, status FROM applicants ORDER BY p_id;")
+    assert [(r["p_id"], r["status"]) for r in db_cursor.fetchall()] == \
+        [(1, "Accepted"), (2, "Rejected"), (3, "Accepted")]
+    db_cursor.connection.commit()
+
+    assert StreamingLoad(reset=True).finish() == 0
+    db_cursor.execute("SELECT count(*) AS n, to_regclass('applicants_new') AS shadow "
+                      "FROM applicants;")
+    assert db_cursor.fetchone() == {"n": 3, "shadow": None}
+    db_cursor.connection.commit()
+
+
+@pytest.mark.db
+def test_failed_reset_pipeline_drops_the_shadow_table(db_cursor, monkeypatch, capsys):
+    """A reset run that fails leaves no applicants_new behind and the live table as it was."""
+    load_rows([pipeline.to_raw_row(row) for row in _scraped(9)])
+
+    def broken_clean(batches):
+        yield from _clean(itertools.islice(batches, 1))
+        raise ValueError("LLM exploded")
+
+    progress, _ = _progress()
+    with pytest.raises(ValueError, match="LLM exploded"):
+        pipeline.run_pipeline([_scraped(1), _scraped(2)], broken_clean,
+                              StreamingLoad(reset=True), progress, load_batch_rows=1)
+    db_cursor.execute("SELECT array_agg(p_id) AS ids, to_regclass('applicants_new') AS shadow "
+                      "FROM applicants;")
+    assert db_cursor.fetchone() == {"ids": [9], "shadow": None}
+    db_cursor.connection.commit()
+
+    StreamingLoad().abort()  # nothing to drop without reset
+    loader = StreamingLoad(reset=True)
+
+    def no_database():
+        raise psycopg.OperationalError("connection refused")
+
+    monkeypatch.setattr(load_data, "get_cursor", no_database)
+    loader.abort()
+    assert "Could not drop applicants_new: connection refused" in capsys.readouterr().out
+    monkeypatch.undo()
+    loader.abort()
+
+
+@pytest.mark.unit
+def test_stages_overlap_so_wall_time_tracks_the_slowest_stage(monkeypatch):
+    """Stages of 0.24, 0.24 and 0.36 s finish well under their 0.84 s sum."""
+    monkeypatch.setattr(pipeline, "PUBLISH_INTERVAL_S", 0.01)  # full/idle queues poll
+    def source():
+        for i in range(6):
+            time.sleep(0.04)
+            yield _scraped(i)
+
+    def slow_clean(batches):
+        for rows in batches:
+            time.sleep(0.04)
+            yield rows
+
+    loader = SlowLoader(delay=0.06)
+    progress, _ = _progress()
+    stats = pipeline.run_pipeline(source(), slow_clean, loader, progress,
+                                  queue_batches=1, load_batch_rows=1)
+    assert stats["loaded"] == 6 and loader.finished
+    assert min(stats["busy_s"].values()) >= 0.2
+    assert stats["seconds"] < 0.75 * sum(stats["busy_s"].values())
+
+
+@pytest.mark.unit
+def test_a_failing_stage_stops_the_pipeline_before_finish():
+    """Errors upstream or in the loader propagate; nothing is finished; threads exit."""
+    def broken_clean(batches):
+        for _ in batches:
+            raise ValueError("LLM exploded")
+        yield []  # pragma: no cover - unreachable
+
+    progress, _ = _progress()
+    loader = SlowLoader()
+    with pytest.raises(ValueError, match="LLM exploded"):
+        pipeline.run_pipeline([_scraped(1)], broken_clean, loader, progress)
+    assert not loader.finished and loader.aborted
+
+    endless = (_scraped(i) for i in itertools.count())
+    before = threading.active_count()
+    with pytest.raises(RuntimeError, match="database went away"):
+        pipeline.run_pipeline(endless, _clean, SlowLoader(fail=True), progress,
+                              queue_batches=1, load_batch_rows=1)
+    assert threading.active_count() == before
+
+
+class FakeScraper:
+    saved, pages = _scraped(1), [_scraped(2), []]
+
+    def __init__(self):
+        self.results = list(self.saved)
+
+    def iter_pages(self, target):
+        assert target == 3
+        yield from self.pages
+
+
+class FakeCleaner:
+    saved = None
+
+    def clean_batches(self, batches):
+        return _clean(batches)
+
+    def save_output(self, data):
+        FakeCleaner.saved = data
+
+
+@pytest.mark.db
+def test_run_pull_pipeline_streams_saved_rows_then_new_pages(db_cursor, monkeypatch):
+    """Resumed rows and new pages are loaded; the cleaned rows are saved like clean.py."""
+    monkeypatch.setattr(pipeline, "GradCafeScraper", FakeScraper)
+    monkeypatch.setattr(pipeline, "DataCleaner", FakeCleaner)
+    progress, _ = _progress()
+    stats = pipeline.run_pull_pipeline(True, progress, target=3)
+    assert stats["loaded"] == 2
+    assert progress.counters["pages_fetched"] == 2
+    assert [row["url"] for row in FakeCleaner.saved] == [f"{URL}1", f"{URL}2"]
+    db_cursor.execute("SELECT count(*) AS n FROM applicants;")
+    assert db_cursor.fetchone()["n"] == 2
+    db_cursor.connection.commit()
+
+    # Offline: nothing saved or scraped, so nothing is loaded or saved
+    FakeCleaner.saved = None
+    monkeypatch.setattr(FakeScraper, "saved", [])
+    monkeypatch.setattr(FakeScraper, "pages", [[]])
+    assert pipeline.run_pull_pipeline(False, progress, target=3)["loaded"] == 0
+    assert FakeCleaner.saved is None
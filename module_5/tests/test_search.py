@@ -0,0 +1,84 @@
+import pytest
+import search_data
+from load_data import INDEX_NAMES, ensure_schema, load_rows
+
+COMMENTS = {
+    1: "Got an interview call last week, funding decision pending.",
+    2: "Rejected without an interview.",
+    3: "Full funding & a <b>fellowship</b>! Interviewed twice; interviews were friendly.",
+    4: None,
+    5: "Waitlisted, no word on funding yet.",
+}
+
+
+def _insert_comments(cur):
+    cur.executemany("""
+        INSERT INTO applicants (p_id, university, comments, date_added, term,
+                                llm_generated_university)
+        VALUES (%s, %s, %s, '2025-02-01', %s, %s)
+    """, [(p_id, f"U{p_id}", text, "Fall 2025" if p_id % 2 else "Spring 2026",
+           "MIT" if p_id % 2 else "Stanford University") for p_id, text in COMMENTS.items()])
+    cur.connection.commit()
+
+
+@pytest.mark.web
+def test_search_ranks_matches_and_highlights_escaped_snippets(client, db_cursor):
+    """Stemmed matches come back best first; snippets are escaped with <mark> around hits."""
+    _insert_comments(db_cursor)
+    body = client.get("/api/search?q=interview").get_json()
+    assert body["ok"] is True and body["q"] == "interview"
+    hits = body["data"]
+    assert [hit["p_id"] for hit in hits][0] == 3  # three forms of "interview"
+    assert sorted(hit["p_id"] for hit in hits) == [1, 2, 3]
+    assert hits[0]["rank"] >= hits[1]["rank"] >= hits[2]["rank"] > 0
+    assert "<mark>Interviewed</mark>" in hits[0]["snippet"]
+    assert "&amp;" in hits[0]["snippet"] and "<b>" not in hits[0]["snippet"]
+    assert hits[0]["date_added"] == "2025-02-01"
+
+    phrase = client.get('/api/search?q="funding decision"').get_json()["data"]
+    assert [hit["p_id"] for hit in phrase] == [1]
+    excluded = client.get("/api/search?q=funding -interview").get_json()["data"]
+    assert [hit["p_id"] for hit in excluded] == [5]
+    assert client.get("/api/search?q=or").get_json()["data"] == []  # stop word only
+
+
+@pytest.mark.web
+def test_search_filters_limit_and_bad_requests(client, db_cursor):
+    """Cohort filters and ?limit= narrow the hits; empty or oversized input is a 400."""
+    _insert_comments(db_cursor)
+    hits = client.get("/api/search?q=funding&university=MIT").get_json()["data"]
+    assert sorted(hit["p_id"] for hit in hits) == [1, 3, 5]
+    assert len(client.get("/api/search?q=funding&limit=1").get_json()["data"]) == 1
+    assert len(search_data.search("funding", limit=0)) == 1  # clamped up to 1
+
+    assert client.get("/api/search").status_code == 400
+    assert client.get("/api/search?q=%20").status_code == 400
+    assert client.get("/api/search?q=" + "x" * 201).status_code == 400
+    assert client.get("/api/search?q=x&term=" + "x" * 201).status_code == 400
+
+
+@pytest.mark.db
+def test_search_column_and_gin_index_are_kept_across_loads(db_cursor):
+    """Loads fill comments_tsv; old tables gain it; the GIN index survives a reset swap."""
+    url = "https://www.thegradcafe.com/result/"
+    load_rows([{"overview_url": f"{url}1", "comments": "Interview scheduled"}], reset=True)
+    load_rows([{"overview_url": f"{url}1", "comments": "Admitted with funding"}], workers=2)
+    db_cursor.execute("SELECT comments_tsv::text AS tsv FROM applicants;")
+    assert db_cursor.fetchone()["tsv"] == "'admit':1 'fund':3"
+    db_cursor.execute("SELECT to_regclass('applicants_search_idx')::text AS idx;")
+    assert db_cursor.fetchone()["idx"] == "applicants_search_idx"
+    assert "applicants_search_idx" in INDEX_NAMES
+
+    db_cursor.execute("ALTER TABLE applicants DROP COLUMN comments_tsv;")
+    db_cursor.connection.commit()
+    ensure_schema()
+    db_cursor.execute("SELECT comments_tsv::text AS tsv FROM applicants;")
+    assert db_cursor.fetchone()["tsv"] == "'admit':1 'fund':3"
+
+    db_cursor.execute("SET LOCAL enable_seqscan = off;")
+    everyone = search_data.ALL_APPLICANTS
+    query = search_data.search_query(everyone).as_bytes(db_cursor)
+    db_cursor.execute(b"EXPLAIN " + query, search_data.search_params("funding", everyone, 5))
+    plan = "\n".join(row["QUERY PLAN"] for row in db_cursor.fetchall())
+    assert "applicants_search_idx" in plan
+    db_cursor.connection.commit()